@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Admission Module
+Per-stage concurrency limits with bounded wait queues, and upload checks made before decoding
+"""
+
+import asyncio
+import io
+import math
+import threading
+import time
+import wave
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AdmissionError(Exception):
+    """A request turned away before doing the work; carries the HTTP status to answer with"""
+    
+    def __init__(self, status: int, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+    
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {'Retry-After': str(self.retry_after)} if self.retry_after else {}
+
+def check_upload_size(content_length: Optional[int], max_bytes: int) -> None:
+    """Reject uploads by their Content-Length, before the body is read"""
+    if content_length is None:
+        raise AdmissionError(411, 'Content-Length required for audio uploads')
+    if max_bytes > 0 and content_length > max_bytes:
+        raise AdmissionError(413, f"Upload larger than {max_bytes // (1024 * 1024)} MB")
+
+def wav_duration(data: bytes) -> Optional[float]:
+    """Seconds of audio in a PCM WAV, from its header alone; None if data isn't PCM WAV"""
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wav:
+            frame_size = wav.getnchannels() * wav.getsampwidth()
+            # Streamed recordings may leave the data size unset, so trust the byte count too
+            frames = min(wav.getnframes(), len(data) // max(frame_size, 1))
+            return frames / wav.getframerate()
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+def check_audio_duration(data: bytes, max_seconds: float) -> None:
+    """Reject WAV uploads longer than max_seconds; compressed formats are bounded by size alone"""
+    if max_seconds <= 0:
+        return
+    duration = wav_duration(data)
+    if duration is not None and duration > max_seconds:
+        raise AdmissionError(413, f"Audio longer than {max_seconds:g} seconds")
+
+class _LimiterBase:
+    """Counters, queue-full checks and Retry-After estimates shared by both limiters"""
+    
+    # Weight of the newest sample in the moving average of time spent in the stage
+    SERVICE_TIME_ALPHA = 0.2
+    
+    def __init__(self, stage: str, max_concurrent: int, max_queue: int = 16, queue_timeout: float = 10.0):
+        self.stage = stage
+        self.max_concurrent = max_concurrent  # 0 or less: no limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._service_time = 1.0
+        self._stats = {'admitted': 0, 'queued': 0, 'rejected': 0, 'timed_out': 0}
+    
+    def _has_room(self) -> bool:
+        return self.max_concurrent <= 0 or self._active < self.max_concurrent
+    
+    def _waiting(self) -> int:
+        raise NotImplementedError
+    
+    def check_capacity(self) -> None:
+        """Fail fast with 429 if a new request would be rejected anyway (every slot busy, queue full)"""
+        if not self._has_room() and self._waiting() >= self.max_queue:
+            raise self._rejection(timed_out=False)
+    
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the queue ahead, served at the recent pace"""
+        slots = max(self.max_concurrent, 1)
+        return max(1, math.ceil(self._service_time * (self._waiting() + 1) / slots))
+    
+    def _rejection(self, timed_out: bool) -> AdmissionError:
+        if timed_out:
+            self._stats['timed_out'] += 1
+            logger.warning(f"Admission: {self.stage} queue wait exceeded {self.queue_timeout:g}s")
+            return AdmissionError(503, f"Server busy ({self.stage}), please retry", self.retry_after())
+        self._stats['rejected'] += 1
+        logger.warning(f"Admission: {self.stage} queue full, shedding request")
+        return AdmissionError(429, f"Too many requests ({self.stage}), please retry", self.retry_after())
+    
+    def _observe(self, elapsed: float) -> None:
+        self._service_time += self.SERVICE_TIME_ALPHA * (elapsed - self._service_time)
+    
+    def get_stats(self) -> Dict:
+        return dict(self._stats, active=self._active, waiting=self._waiting(),
+                    max_concurrent=self.max_concurrent, max_queue=self.max_queue,
+                    service_time=round(self._service_time, 3))
+
+class StageLimiter(_LimiterBase):
+    """At most max_concurrent threads in a stage; up to max_queue more wait, the rest are shed
+
+    A request finding the queue full fails at once with 429. One still
+    waiting after queue_timeout seconds fails with 503. Both carry a
+    Retry-After estimate.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiters = 0
+        self._condition = threading.Condition()
+    
+    def _waiting(self) -> int:
+        return self._waiters
+    
+    def acquire(self) -> float:
+        """Take a slot, waiting in the queue if needed; returns the admission time for release()"""
+        with self._condition:
+            if not self._has_room():
+                if self._waiters >= self.max_queue:
+                    raise self._rejection(timed_out=False)
+                self._waiters += 1
+                self._stats['queued'] += 1
+                try:
+                    if not self._condition.wait_for(self._has_room, timeout=self.queue_timeout):
+                        raise self._rejection(timed_out=True)
+                finally:
+                    self._waiters -= 1
+            self._active += 1
+            self._stats['admitted'] += 1
+        return time.perf_counter()
+    
+    def release(self, admitted_at: float) -> None:
+        with self._condition:
+            self._active -= 1
+            self._observe(time.perf_counter() - admitted_at)
+            self._condition.notify()
+    
+    @contextmanager
+    def slot(self):
+        admitted_at = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
+    
+    def get_stats(self) -> Dict:
+        with self._condition:
+            return super().get_stats()
+
+class AsyncStageLimiter(_LimiterBase):
+    """asyncio version of StageLimiter; waiting requests are served first come, first served
+
+    A waiter that is cancelled (its client went away) leaves the queue, or
+    hands back the slot if it was granted at that moment.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiters = deque()
+    
+    def _waiting(self) -> int:
+        return len(self._waiters)
+    
+    async def acquire(self) -> float:
+        if not self._has_room() or self._waiters:
+            if len(self._waiters) >= self.max_queue:
+                raise self._rejection(timed_out=False)
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            self._stats['queued'] += 1
+            try:
+                await asyncio.wait([future], timeout=self.queue_timeout)
+            except asyncio.CancelledError:
+                if future.done():
+                    self._release_slot()
+                else:
+                    future.cancel()
+                    self._waiters.remove(future)
+                raise
+            if not future.done():
+                future.cancel()
+                self._waiters.remove(future)
+                raise self._rejection(timed_out=True)
+            # release() handed this slot over without freeing it
+        else:
+            self._active += 1
+        self._stats['admitted'] += 1
+        return time.perf_counter()
+    
+    def _release_slot(self) -> None:
+        # Pass the slot straight to the longest waiter, if any
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+    
+    def release(self, admitted_at: float) -> None:
+        self._observe(time.perf_counter() - admitted_at)
+        self._release_slot()
+    
+    @asynccontextmanager
+    async def slot(self):
+        admitted_at = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(admitted_at)
@@ -4,16 +4,23 @@ Voice Bot Web Application - Main Flask App
 A voice-enabled chatbot that responds as Voice-Bot would respond
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, g
 from flask_cors import CORS
+import io
 import os
+import time
 from datetime import datetime
+from typing import Optional
 import logging
 
-# Import our custom modules
-from voice_handler import VoiceHandler
-from chat_responder import ChatResponder
-from conversation_manager import ConversationManager
+# Import our custom modules (voice_handler and chat_responder are imported on first use)
+from admission import AdmissionError
+from app_common import (SESSION_COOKIE, SESSION_COOKIE_MAX_AGE, SESSION_HEADER, VoiceBotComponents,
+                        export_headers, history_etag, negotiate_audio_format, sse_event)
+from history_export import EXPORT_FORMATS
+from metrics import HTTP_REQUESTS, HTTP_SECONDS, REGISTRY, server_timing_header, start_request_timing
+from session_store import SessionStore
+from voice_pipeline import pipeline_speech
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,24 +29,74 @@ logger = logging.getLogger(__name__)
 from dotenv import load_dotenv
 load_dotenv()
 
-class VoiceBotApp:
+class VoiceBotApp(VoiceBotComponents):
     """Main Voice Bot Application Class"""
     
     def __init__(self):
+        super().__init__()
         self.app = Flask(__name__)
+        self.app.extensions['voice_bot'] = self
         CORS(self.app)
         
-        # Initialize components
-        self.voice_handler = VoiceHandler()
-        self.chat_responder = ChatResponder()
-        self.conversation_manager = ConversationManager()
-        
         # Setup routes
         self._setup_routes()
-        
+    
+    def _get_session_id(self) -> str:
+        """Session id from the X-Session-ID header or cookie, minting one if absent"""
+        session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+        if not SessionStore.is_valid_session_id(session_id):
+            session_id = SessionStore.new_session_id()
+            g.new_session_id = session_id
+        return session_id
+    
+    def _session(self):
+        """Pin the current request's session; use as ``with self._session() as conversation``"""
+        return self.session_store.session(self._get_session_id())
+    
+    def _audio_options(self):
+        """Reply audio format (?format= or Accept) and whether to send it by URL (?audio=url)"""
+        audio_format = negotiate_audio_format(request.args.get('format') or request.form.get('format'),
+                                              request.headers.get('Accept'))
+        as_url = (request.args.get('audio') or request.form.get('audio')) == 'url'
+        return audio_format, as_url
+    
+    def _transcribe(self, audio_file) -> Optional[str]:
+        """Transcribe an upload, refusing over-long recordings and waiting for an STT slot"""
+        audio_data = audio_file.read()
+        self.check_audio(audio_data)
+        with self.stt_limiter.slot():
+            return self.voice_handler.speech_to_text(io.BytesIO(audio_data))
+    
     def _setup_routes(self):
         """Setup Flask routes"""
         
+        @self.app.before_request
+        def start_timing():
+            g.request_started = time.perf_counter()
+            g.timings = start_request_timing()
+        
+        @self.app.after_request
+        def record_timing(response):
+            """Request metrics, and the Server-Timing header when enabled"""
+            elapsed = time.perf_counter() - g.get('request_started', time.perf_counter())
+            # Route templates, not paths, keep the label set small
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUESTS.inc(method=request.method, route=route, status=str(response.status_code))
+            HTTP_SECONDS.observe(elapsed, route=route)
+            if self.server_timing:
+                response.headers['Server-Timing'] = server_timing_header(g.get('timings', []), elapsed)
+            return response
+        
+        @self.app.after_request
+        def attach_session(response):
+            """Hand newly minted session ids back to the client"""
+            session_id = g.get('new_session_id')
+            if session_id:
+                response.set_cookie(SESSION_COOKIE, session_id, max_age=SESSION_COOKIE_MAX_AGE,
+                                    httponly=True, samesite='Lax')
+                response.headers[SESSION_HEADER] = session_id
+            return response
+        
         @self.app.route('/')
         def index():
             """Main page route"""
@@ -55,11 +112,16 @@ class VoiceBotApp:
                 if not user_message:
                     return jsonify({'error': 'No message provided'}), 400
                 
+                session_id = self._get_session_id()
+                with self.session_store.session(session_id) as conversation:
+                    context = self.conversation_context(conversation)
+                
                 # Generate AI-style response
-                response = self.chat_responder.generate_response(user_message)
+                response = self.chat_responder.generate_response(user_message, context)
                 
                 # Save conversation
-                self.conversation_manager.add_exchange(user_message, response)
+                with self.session_store.session(session_id) as conversation:
+                    conversation.add_exchange(user_message, response)
                 
                 return jsonify({
                     'response': response,
@@ -70,57 +132,256 @@ class VoiceBotApp:
                 logger.error(f"Chat error: {str(e)}")
                 return jsonify({'error': 'Internal server error'}), 500
         
+        @self.app.route('/api/chat/stream', methods=['POST'])
+        def chat_stream():
+            """Stream the response as server-sent events while it is generated"""
+            data = request.get_json(silent=True) or {}
+            user_message = data.get('message', '')
+            
+            if not user_message:
+                return jsonify({'error': 'No message provided'}), 400
+            
+            # Resolve the session now; the generator runs after the request context
+            session_id = self._get_session_id()
+            with self.session_store.session(session_id) as conversation:
+                context = self.conversation_context(conversation)
+            
+            def generate():
+                pieces = []
+                try:
+                    for piece in self.chat_responder.stream_response(user_message, context):
+                        pieces.append(piece)
+                        yield sse_event({'token': piece})
+                    
+                    response_text = ''.join(pieces)
+                    with self.session_store.session(session_id) as conversation:
+                        conversation.add_exchange(user_message, response_text)
+                    
+                    yield sse_event({
+                        'response': response_text,
+                        'timestamp': datetime.now().isoformat()
+                    }, event='done')
+                except Exception as e:
+                    logger.error(f"Chat stream error: {str(e)}")
+                    yield sse_event({'error': 'Internal server error'}, event='error')
+            
+            return Response(generate(), mimetype='text/event-stream', headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Stop nginx-style proxies from buffering the stream
+            })
+        
         @self.app.route('/api/voice-chat', methods=['POST'])
         def voice_chat():
             """Handle voice chat requests"""
             try:
+                # Refuse oversized uploads, or shed when STT is swamped, before the body is read
+                self.admit_upload(request.content_length)
+                
                 # Check if audio file is present
                 if 'audio' not in request.files:
                     return jsonify({'error': 'No audio file provided'}), 400
                 
                 audio_file = request.files['audio']
+                audio_format, as_url = self._audio_options()
                 
                 # Process voice input
-                transcribed_text = self.voice_handler.speech_to_text(audio_file)
+                transcribed_text = self._transcribe(audio_file)
                 
                 if not transcribed_text:
                     return jsonify({'error': 'Could not transcribe audio'}), 400
                 
+                session_id = self._get_session_id()
+                with self.session_store.session(session_id) as conversation:
+                    context = self.conversation_context(conversation)
+                
                 # Generate response
-                text_response = self.chat_responder.generate_response(transcribed_text)
+                with self.llm_limiter.slot():
+                    text_response = self.chat_responder.generate_response(transcribed_text, context)
                 
                 # Convert response to speech
-                audio_response = self.voice_handler.text_to_speech(text_response)
+                audio_fields = self.audio_fields(text_response, audio_format, as_url)
                 
                 # Save conversation
-                self.conversation_manager.add_exchange(transcribed_text, text_response)
+                with self.session_store.session(session_id) as conversation:
+                    conversation.add_exchange(transcribed_text, text_response)
                 
                 return jsonify({
                     'transcription': transcribed_text,
                     'text_response': text_response,
-                    'audio_response': audio_response,  # Base64 encoded audio
+                    **audio_fields,
                     'timestamp': datetime.now().isoformat()
                 })
                 
+            except AdmissionError as e:
+                return jsonify({'error': e.message}), e.status, e.headers
             except Exception as e:
                 logger.error(f"Voice chat error: {str(e)}")
                 return jsonify({'error': 'Internal server error'}), 500
         
+        @self.app.route('/api/voice-chat/stream', methods=['POST'])
+        def voice_chat_stream():
+            """Stream the transcription, then each reply sentence with its audio"""
+            try:
+                self.admit_upload(request.content_length)
+                if 'audio' not in request.files:
+                    return jsonify({'error': 'No audio file provided'}), 400
+                transcribed_text = self._transcribe(request.files['audio'])
+            except AdmissionError as e:
+                return jsonify({'error': e.message}), e.status, e.headers
+            except Exception as e:
+                logger.error(f"Voice chat error: {str(e)}")
+                return jsonify({'error': 'Internal server error'}), 500
+            
+            if not transcribed_text:
+                return jsonify({'error': 'Could not transcribe audio'}), 400
+            
+            session_id = self._get_session_id()
+            with self.session_store.session(session_id) as conversation:
+                context = self.conversation_context(conversation)
+            audio_format, as_url = self._audio_options()
+            
+            def speak(sentence: str) -> dict:
+                return self.audio_fields(sentence, audio_format, as_url)
+            
+            def generate():
+                pieces = []
+                
+                def recorded(stream):
+                    for piece in stream:
+                        pieces.append(piece)
+                        yield piece
+                
+                try:
+                    yield sse_event({'transcription': transcribed_text}, event='transcription')
+                    
+                    # Sentences are synthesized while later ones are still generating
+                    with self.llm_limiter.slot():
+                        text_stream = recorded(self.chat_responder.stream_response(transcribed_text, context))
+                        for index, sentence, audio_fields in pipeline_speech(
+                                text_stream, speak, self.tts_executor):
+                            yield sse_event({
+                                'index': index,
+                                'text': sentence,
+                                **audio_fields
+                            }, event='sentence')
+                    
+                    text_response = ''.join(pieces)
+                    with self.session_store.session(session_id) as conversation:
+                        conversation.add_exchange(transcribed_text, text_response)
+                    
+                    yield sse_event({
+                        'text_response': text_response,
+                        'timestamp': datetime.now().isoformat()
+                    }, event='done')
+                except AdmissionError as e:
+                    # Headers are already sent, so the shed is reported in the stream
+                    yield sse_event({'error': e.message, 'retry_after': e.retry_after}, event='error')
+                except Exception as e:
+                    logger.error(f"Voice chat stream error: {str(e)}")
+                    yield sse_event({'error': 'Internal server error'}, event='error')
+            
+            return Response(generate(), mimetype='text/event-stream', headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            })
+        
+        @self.app.route('/api/audio/<clip_id>', methods=['GET'])
+        def get_audio(clip_id):
+            """Serve a synthesized clip as binary audio, with range and caching support"""
+            clip = self.voice_handler.get_clip(clip_id)
+            if clip is None:
+                return jsonify({'error': 'Audio not found'}), 404
+            
+            audio_data, mimetype = clip
+            response = Response(audio_data, mimetype=mimetype)
+            # Clip ids are content hashes, so a clip never changes
+            response.set_etag(clip_id)
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+            return response.make_conditional(request, accept_ranges=True,
+                                             complete_length=len(audio_data))
+        
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
+            """Prometheus scrape endpoint"""
+            return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+        
         @self.app.route('/api/conversation-history', methods=['GET'])
         def get_conversation_history():
-            """Get conversation history"""
+            """Get conversation history, paged with ?limit= and ?before=, or new exchanges with ?since="""
             try:
-                history = self.conversation_manager.get_history()
-                return jsonify({'history': history})
+                limit = request.args.get('limit', type=int)
+                with self._session() as conversation:
+                    page = conversation.get_page(before=request.args.get('before', type=int),
+                                                 since=request.args.get('since', type=int),
+                                                 limit=limit if limit and limit > 0 else None)
+                
+                # Unchanged since the client's copy: skip serializing the page
+                etag = history_etag(page.pop('version'))
+                response = Response(status=304) if request.if_none_match.contains(etag) else jsonify(page)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
             except Exception as e:
                 logger.error(f"History error: {str(e)}")
                 return jsonify({'error': 'Internal server error'}), 500
+
+        @self.app.route('/api/export', methods=['GET'])
+        def export_history():
+            """Download the history as ?format=json, jsonl, csv, txt or markdown, streamed"""
+            format_type = request.args.get('format', 'json').lower()
+            if format_type not in EXPORT_FORMATS:
+                return jsonify({'error': f"Unsupported format: {format_type}"}), 400
+            
+            headers = export_headers(format_type, request.headers.get('Accept-Encoding'))
+            # Resolve the session now; the generator runs after the request context
+            stream = self.export_stream(self._get_session_id(), format_type,
+                                        compress='Content-Encoding' in headers)
+            return Response(stream, headers=headers)
         
+        @self.app.route('/api/search', methods=['GET'])
+        def search_history():
+            """Ranked, paginated search over the session's history"""
+            try:
+                query = request.args.get('q', '').strip()
+                if not query:
+                    return jsonify({'error': 'No query provided'}), 400
+
+                page = max(request.args.get('page', 1, type=int), 1)
+                per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+
+                with self._session() as conversation:
+                    results = conversation.search(query, page=page, per_page=per_page)
+                return jsonify(results)
+            except Exception as e:
+                logger.error(f"Search error: {str(e)}")
+                return jsonify({'error': 'Internal server error'}), 500
+
+        @self.app.route('/api/stats', methods=['GET'])
+        def get_stats():
+            """Cheap, pollable conversation statistics for the session"""
+            try:
+                top_n = min(max(request.args.get('top_n', 5, type=int), 1), 50)
+                with self._session() as conversation:
+                    stats = conversation.get_conversation_stats()
+                    topics = conversation.get_frequent_topics(top_n)
+                return jsonify({
+                    'stats': stats,
+                    'frequent_topics': topics,
+                    'sessions': self.session_store.get_stats(),
+                    'response_cache': self.chat_responder.get_cache_stats(),
+                    'llm_coalescing': self.chat_responder.get_coalescing_stats(),
+                    'admission': self.admission_stats()
+                })
+            except Exception as e:
+                logger.error(f"Stats error: {str(e)}")
+                return jsonify({'error': 'Internal server error'}), 500
+
         @self.app.route('/api/clear-history', methods=['POST'])
         def clear_history():
             """Clear conversation history"""
             try:
-                self.conversation_manager.clear_history()
+                with self._session() as conversation:
+                    conversation.clear_history()
                 return jsonify({'message': 'History cleared successfully'})
             except Exception as e:
                 logger.error(f"Clear history error: {str(e)}")
@@ -130,13 +391,14 @@ class VoiceBotApp:
         """Run the Flask application"""
         self.app.run(debug=debug, host=host, port=port)
 
+def create_app() -> Flask:
+    """Build the Flask app; voice and LLM components are created when first needed"""
+    return VoiceBotApp().app
+
+# Expose the Flask app for gunicorn (not in spawned TTS workers, which re-import this module)
+if __name__ != '__mp_main__':
+    app = create_app()
+
 if __name__ == '__main__':
-    # Create and run the app
-    voice_bot = VoiceBotApp()
-    
     port = int(os.environ.get('PORT', 5000))
-    voice_bot.run(debug=False, host='0.0.0.0', port=port)
-
-# Expose the Flask app for gunicorn
-voice_bot_instance = VoiceBotApp()
-app = voice_bot_instance.app
\ No newline at end of file
+    app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+App Common Module
+Components, settings and helpers shared by the Flask (app.py) and ASGI (asgi_app.py) apps
+"""
+
+import os
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+import logging
+
+from werkzeug.datastructures import Accept, MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from admission import AdmissionError, StageLimiter, check_audio_duration, check_upload_size
+from audio_formats import AUDIO_FORMATS, available_formats
+from history_export import EXPORT_FORMATS, gzip_chunks, iter_export
+from metrics import REGISTRY, stats_families
+from session_store import SessionStore
+from tts_cache import TTSCache
+from voice_pipeline import split_sentences
+
+if TYPE_CHECKING:
+    from chat_responder import ChatResponder
+    from conversation_manager import ConversationManager
+    from voice_handler import VoiceHandler
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE = 'session_id'
+SESSION_HEADER = 'X-Session-ID'
+SESSION_COOKIE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Audio types a client may list in Accept, in order of preference on ties
+ACCEPT_AUDIO_FORMATS = {'audio/wav': 'wav', 'audio/ogg': 'opus', 'audio/opus': 'opus', 'audio/mpeg': 'mp3'}
+
+def sse_event(data: dict, event: str = None) -> str:
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def negotiate_audio_format(requested: Optional[str], accept_header: Optional[str]) -> str:
+    """Reply audio format: an explicit ?format= if producible, else the best Accept match, else wav"""
+    formats = available_formats()
+    requested = (requested or '').lower()
+    if requested in formats:
+        return requested
+    offered = [mimetype for mimetype, name in ACCEPT_AUDIO_FORMATS.items() if name in formats]
+    best = parse_accept_header(accept_header, MIMEAccept).best_match(offered)
+    return ACCEPT_AUDIO_FORMATS.get(best, 'wav')
+
+def history_etag(version: str) -> str:
+    """Opaque ETag for a conversation history version (see ConversationManager.get_page)"""
+    return hashlib.blake2b(version.encode('utf-8'), digest_size=12).hexdigest()
+
+def export_headers(format_type: str, accept_encoding: Optional[str]) -> Dict[str, str]:
+    """Response headers for a history download; gzip is used when the client accepts it"""
+    content_type, extension = EXPORT_FORMATS[format_type]
+    headers = {
+        'Content-Type': content_type,
+        'Content-Disposition': f'attachment; filename="conversation-history.{extension}"',
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+    if parse_accept_header(accept_encoding, Accept)['gzip'] > 0:
+        headers['Content-Encoding'] = 'gzip'
+    return headers
+
+class lazy_component:
+    """Attribute built by the decorated method on first access, once, even under concurrent requests"""
+    
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+        self._lock = threading.Lock()
+    
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        with self._lock:
+            if self.name not in instance.__dict__:
+                # Stored on the instance, which shadows this descriptor from now on
+                instance.__dict__[self.name] = self.factory(instance)
+        return instance.__dict__[self.name]
+
+class VoiceBotComponents:
+    """Session store, voice and chat components configured from the environment
+
+    Heavy components (TTS engines, STT models, LLM client) are built on first use.
+    """
+    
+    def __init__(self):
+        self.session_store = SessionStore(
+            sessions_dir=os.getenv('SESSIONS_DIR', 'sessions'),
+            max_sessions=int(os.getenv('MAX_HOT_SESSIONS', 256)),
+            max_memory_bytes=int(os.getenv('SESSION_MEMORY_BUDGET_MB', 64)) * 1024 * 1024,
+            max_history_length=int(os.getenv('MAX_HISTORY_LENGTH', 100))
+        )
+        # Token budget of the conversation memory sent with each LLM request (0 turns it off)
+        self.context_settings = {
+            'max_tokens': int(os.getenv('CONTEXT_MAX_TOKENS', 1500)),
+            'max_exchanges': int(os.getenv('CONTEXT_MAX_EXCHANGES', 20)),
+            'summary_tokens': int(os.getenv('CONTEXT_SUMMARY_TOKENS', 150))
+        }
+        # Synthesizes sentences of streamed voice replies concurrently
+        self.tts_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('TTS_PIPELINE_WORKERS', 4)),
+            thread_name_prefix='tts'
+        )
+        # Voice uploads are checked before decoding, and each stage admits a bounded number at once
+        self.upload_limits = {
+            'max_bytes': int(os.getenv('MAX_UPLOAD_MB', 10)) * 1024 * 1024,
+            'max_seconds': float(os.getenv('MAX_AUDIO_SECONDS', 60))
+        }
+        queue_size = int(os.getenv('ADMISSION_QUEUE_SIZE', 16))
+        queue_timeout = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 10))
+        cpus = os.cpu_count() or 1
+        self.stt_limiter = self._create_limiter(
+            'stt', int(os.getenv('STT_MAX_CONCURRENT', cpus)), queue_size, queue_timeout)
+        self.llm_limiter = self._create_limiter(
+            'llm', int(os.getenv('LLM_MAX_CONCURRENT', 16)), queue_size, queue_timeout)
+        # Speech is always synthesized on worker threads, so this one is the threaded kind in both apps
+        self.tts_limiter = StageLimiter(
+            'tts', int(os.getenv('TTS_MAX_CONCURRENT', cpus)), queue_size, queue_timeout)
+        
+        # Per-request stage timings in a Server-Timing header (exposes internals, so off by default)
+        self.server_timing = os.getenv('SERVER_TIMING', 'false').lower() == 'true'
+        REGISTRY.set_collector('voicebot', self._collect_metrics)
+        
+        # Opt-in: it builds the voice stack and TTS workers, which text-only workers never need.
+        # Runs in the background, so it never delays the worker becoming ready
+        if os.getenv('TTS_PREWARM', 'false').lower() == 'true':
+            threading.Thread(target=self._prewarm_tts, name='tts-prewarm', daemon=True).start()
+    
+    @lazy_component
+    def tts_cache(self) -> TTSCache:
+        return TTSCache(
+            cache_dir=os.getenv('TTS_CACHE_DIR', 'tts_cache'),
+            max_memory_bytes=int(os.getenv('TTS_CACHE_MEMORY_MB', 32)) * 1024 * 1024,
+            max_disk_bytes=int(os.getenv('TTS_CACHE_DISK_MB', 256)) * 1024 * 1024
+        )
+    
+    @lazy_component
+    def voice_handler(self) -> 'VoiceHandler':
+        # Speech, TTS and NumPy imports dominate a worker's boot time, so they wait until here
+        from voice_handler import VoiceHandler
+        return VoiceHandler(
+            tts_cache=self.tts_cache,
+            tts_workers=int(os.getenv('TTS_WORKERS', min(4, os.cpu_count() or 1))),
+            stt_backend=os.getenv('STT_BACKEND', 'google'),
+            stt_model_path=os.getenv('VOSK_MODEL_PATH'),
+            vad=os.getenv('STT_VAD', 'true').lower() == 'true'
+        )
+    
+    @lazy_component
+    def chat_responder(self) -> 'ChatResponder':
+        from chat_responder import ChatResponder
+        return ChatResponder()
+    
+    def _create_limiter(self, stage: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        return StageLimiter(stage, max_concurrent, max_queue, queue_timeout)
+    
+    def admission_stats(self) -> Dict:
+        return {limiter.stage: limiter.get_stats()
+                for limiter in (self.stt_limiter, self.llm_limiter, self.tts_limiter)}
+    
+    def admit_upload(self, content_length: Optional[int]) -> None:
+        """Turn a voice upload away before its body is read: missing or excessive size, or a full STT queue"""
+        check_upload_size(content_length, self.upload_limits['max_bytes'])
+        self.stt_limiter.check_capacity()
+    
+    def check_audio(self, audio_data: bytes) -> None:
+        """Reject recordings over the length limit, from the WAV header, before anything is decoded"""
+        check_audio_duration(audio_data, self.upload_limits['max_seconds'])
+    
+    def _collect_metrics(self):
+        """Current component figures for /metrics; components not built yet are skipped"""
+        yield from stats_families('voicebot_sessions', 'Session store occupancy',
+                                  self.session_store.get_stats(), counters=('evictions',))
+        for stage, stats in self.admission_stats().items():
+            yield from stats_families(f'voicebot_admission_{stage}', f'Admission control for the {stage} stage',
+                                      stats, counters=('admitted', 'queued', 'rejected', 'timed_out'))
+        if 'chat_responder' in self.__dict__:
+            yield from stats_families('voicebot_response_cache', 'LLM response cache counters',
+                                      self.chat_responder.get_cache_stats(),
+                                      counters=('exact_hits', 'similar_hits', 'misses', 'stores',
+                                                'evictions', 'expirations'))
+            yield from stats_families('voicebot_llm_coalescing', 'Upstream LLM calls and requests that shared one',
+                                      self.chat_responder.get_coalescing_stats(),
+                                      counters=('calls', 'coalesced'))
+            yield from stats_families('voicebot_llm_client', 'LLM client requests, retries and recent latency',
+                                      self.chat_responder.get_client_stats(),
+                                      counters=('requests', 'retries', 'failures'))
+        if 'tts_cache' in self.__dict__:
+            yield from stats_families('voicebot_tts_cache', 'TTS cache hits and size', self.tts_cache.get_stats(),
+                                      counters=('memory_hits', 'disk_hits', 'misses'))
+        if 'voice_handler' in self.__dict__:
+            if self.voice_handler.tts_pool:
+                yield from stats_families('voicebot_tts_pool', 'TTS worker pool state',
+                                          self.voice_handler.tts_pool.get_stats(),
+                                          counters=('requests', 'errors', 'timeouts', 'restarts', 'rejected'))
+    
+    def _prewarm_tts(self):
+        """Synthesize the canned replies (whole and per sentence) into the TTS cache"""
+        try:
+            texts = []
+            for reply in self.chat_responder.get_canned_responses():
+                texts.append(reply)
+                texts.extend(split_sentences(reply))
+            self.voice_handler.prewarm(dict.fromkeys(texts))
+        except Exception as e:
+            logger.error(f"TTS prewarm error: {str(e)}")
+    
+    def conversation_context(self, conversation: 'ConversationManager') -> Optional[Dict]:
+        """Recent exchanges to send with the next LLM request, or None when context is off"""
+        if self.context_settings['max_tokens'] <= 0:
+            return None
+        return conversation.get_context(**self.context_settings)
+    
+    def export_stream(self, session_id: str, format_type: str, compress: bool) -> Iterator[bytes]:
+        """Body of a history download, produced batch by batch while the session stays pinned"""
+        try:
+            with self.session_store.session(session_id) as conversation:
+                chunks = iter_export(conversation.iter_history(), format_type)
+                if compress:
+                    yield from gzip_chunks(chunks)
+                else:
+                    for chunk in chunks:
+                        yield chunk.encode('utf-8')
+        except Exception as e:
+            # Headers are already sent, so the download just ends early
+            logger.error(f"Export error: {str(e)}")
+    
+    def audio_fields(self, text: str, audio_format: str, as_url: bool) -> dict:
+        """Response fields carrying the spoken version of text"""
+        fields = {'audio_format': audio_format, 'audio_mimetype': AUDIO_FORMATS[audio_format]}
+        key = 'audio_url' if as_url else 'audio_response'
+        try:
+            with self.tts_limiter.slot():
+                if as_url:
+                    clip_id = self.voice_handler.synthesize_clip(text, audio_format)
+                    fields[key] = f"/api/audio/{clip_id}" if clip_id else None
+                else:
+                    fields[key] = self.voice_handler.text_to_speech(text, audio_format)  # Base64 encoded audio
+        except AdmissionError:
+            # Too busy to speak: the reply still goes out as text
+            fields[key] = None
+        return fields
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Voice Bot Web Application - ASGI App
+Same API as app.py, served by an event loop: LLM calls are awaited, while
+speech recognition, synthesis and session I/O run in executors
+
+Run with: uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import contextvars
+import io
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional, Tuple
+import logging
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.http import parse_etags, parse_range_header
+
+from admission import AdmissionError, AsyncStageLimiter
+from app_common import (SESSION_COOKIE, SESSION_COOKIE_MAX_AGE, SESSION_HEADER, VoiceBotComponents,
+                        export_headers, history_etag, lazy_component, negotiate_audio_format, sse_event)
+from history_export import EXPORT_FORMATS
+from metrics import HTTP_REQUESTS, HTTP_SECONDS, REGISTRY, server_timing_header, start_request_timing
+from session_store import AsyncSessionStore, SessionStore
+from voice_pipeline import pipeline_speech_async
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'index.html')
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'  # Stop nginx-style proxies from buffering the stream
+}
+
+class TimingMiddleware:
+    """Request metrics, and the Server-Timing header when enabled"""
+    
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        timings = start_request_timing()
+        
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                elapsed = time.perf_counter() - started
+                # The router stores the matched route in the shared scope; templates keep labels few
+                route = scope.get('route')
+                route = getattr(route, 'path', None) or 'unmatched'
+                HTTP_REQUESTS.inc(method=scope['method'], route=route, status=str(message['status']))
+                HTTP_SECONDS.observe(elapsed, route=route)
+                if self.server_timing:
+                    MutableHeaders(scope=message).append('Server-Timing', server_timing_header(timings, elapsed))
+            await send(message)
+        
+        await self.app(scope, receive, send_with_timing)
+
+class AsyncVoiceBotApp(VoiceBotComponents):
+    """Voice Bot application for ASGI servers"""
+    
+    def __init__(self):
+        super().__init__()
+        self.sessions = AsyncSessionStore(self.session_store)
+        self.app = Starlette(
+            routes=self._routes(),
+            middleware=[Middleware(TimingMiddleware, server_timing=self.server_timing),
+                        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                                   allow_headers=['*'], expose_headers=[SESSION_HEADER])],
+            lifespan=self._lifespan
+        )
+        self.app.state.voice_bot = self
+    
+    @lazy_component
+    def chat_responder(self):
+        from chat_responder import AsyncChatResponder
+        return AsyncChatResponder()
+    
+    def _create_limiter(self, stage: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        # Waiting happens on the event loop, not on a thread
+        return AsyncStageLimiter(stage, max_concurrent, max_queue, queue_timeout)
+    
+    @asynccontextmanager
+    async def _lifespan(self, app):
+        yield
+        # Only close what was actually built
+        if 'chat_responder' in self.__dict__:
+            await self.chat_responder.aclose()
+        if 'voice_handler' in self.__dict__:
+            # Stops the TTS worker processes
+            self.voice_handler.close()
+        await self.sessions.close()
+        self.tts_executor.shutdown(wait=False)
+    
+    def _get_session_id(self, request: Request) -> Tuple[str, bool]:
+        """Session id from the X-Session-ID header or cookie, and whether it was just minted"""
+        session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+        if SessionStore.is_valid_session_id(session_id):
+            return session_id, False
+        return SessionStore.new_session_id(), True
+    
+    def _attach_session(self, response: Response, session_id: str, is_new: bool) -> Response:
+        """Hand newly minted session ids back to the client"""
+        if is_new:
+            response.set_cookie(SESSION_COOKIE, session_id, max_age=SESSION_COOKIE_MAX_AGE,
+                                httponly=True, samesite='lax')
+            response.headers[SESSION_HEADER] = session_id
+        return response
+    
+    def _audio_options(self, request: Request, form=None):
+        """Reply audio format (?format= or Accept) and whether to send it by URL (?audio=url)"""
+        form = form or {}
+        audio_format = negotiate_audio_format(request.query_params.get('format') or form.get('format'),
+                                              request.headers.get('Accept'))
+        as_url = (request.query_params.get('audio') or form.get('audio')) == 'url'
+        return audio_format, as_url
+    
+    async def _read_message(self, request: Request) -> str:
+        try:
+            data = await request.json()
+        except ValueError:
+            return ''
+        return data.get('message', '') if isinstance(data, dict) else ''
+    
+    async def _transcribe(self, request: Request):
+        """(form, transcription) of the uploaded 'audio' field; transcription is None if absent"""
+        # Refuse oversized uploads, or shed when STT is swamped, before the body is read
+        content_length = request.headers.get('Content-Length', '')
+        self.admit_upload(int(content_length) if content_length.isdigit() else None)
+        
+        form = await request.form()
+        upload = form.get('audio')
+        if upload is None or isinstance(upload, str):
+            return form, None
+        audio_data = await upload.read()
+        self.check_audio(audio_data)
+        # voice_handler is resolved in the worker thread too, its first build loads models
+        async with self.stt_limiter.slot():
+            transcribed_text = await run_in_threadpool(
+                lambda: self.voice_handler.speech_to_text(io.BytesIO(audio_data)))
+        return form, transcribed_text or ''
+    
+    async def _audio_fields(self, text: str, audio_format: str, as_url: bool) -> dict:
+        loop = asyncio.get_running_loop()
+        # Carry the request's context along so stage timings reach its Server-Timing header
+        return await loop.run_in_executor(self.tts_executor, contextvars.copy_context().run,
+                                          self.audio_fields, text, audio_format, as_url)
+    
+    def _routes(self):
+        """Setup ASGI routes"""
+        return [
+            Route('/', self.index),
+            Route('/api/chat', self.chat, methods=['POST']),
+            Route('/api/chat/stream', self.chat_stream, methods=['POST']),
+            Route('/api/voice-chat', self.voice_chat, methods=['POST']),
+            Route('/api/voice-chat/stream', self.voice_chat_stream, methods=['POST']),
+            Route('/api/audio/{clip_id}', self.get_audio, methods=['GET']),
+            Route('/metrics', self.metrics, methods=['GET']),
+            Route('/api/conversation-history', self.get_conversation_history, methods=['GET']),
+            Route('/api/export', self.export_history, methods=['GET']),
+            Route('/api/search', self.search_history, methods=['GET']),
+            Route('/api/stats', self.get_stats, methods=['GET']),
+            Route('/api/clear-history', self.clear_history, methods=['POST'])
+        ]
+    
+    async def index(self, request: Request) -> Response:
+        """Main page route"""
+        return HTMLResponse(await run_in_threadpool(_read_template))
+    
+    async def chat(self, request: Request) -> Response:
+        """Handle text chat requests"""
+        try:
+            user_message = await self._read_message(request)
+            
+            if not user_message:
+                return JSONResponse({'error': 'No message provided'}, status_code=400)
+            
+            session_id, is_new = self._get_session_id(request)
+            context = await self.sessions.call(session_id, self.conversation_context)
+            
+            # Generate AI-style response
+            response = await self.chat_responder.generate_response(user_message, context)
+            
+            # Save conversation
+            await self.sessions.call(session_id, lambda c: c.add_exchange(user_message, response))
+            
+            return self._attach_session(JSONResponse({
+                'response': response,
+                'timestamp': datetime.now().isoformat()
+            }), session_id, is_new)
+        
+        except Exception as e:
+            logger.error(f"Chat error: {str(e)}")
+            return JSONResponse({'error': 'Internal server error'}, status_code=500)
+    
+    async def chat_stream(self, request: Request) -> Response:
+        """Stream the response as server-sent events while it is generated"""
+        user_message = await self._read_message(request)
+        
+        if not user_message:
+            return JSONResponse({'error': 'No message provided'}, status_code=400)
+        
+        session_id, is_new = self._get_session_id(request)
+        context = await self.sessions.call(session_id, self.conversation_context)
+        
+        async def generate():
+            pieces = []
+            try:
+                async for piece in self.chat_responder.stream_response(user_message, context):
+                    pieces.append(piece)
+                    yield sse_event({'token': piece})
+                
+                response_text = ''.join(pieces)
+                await self.sessions.call(session_id, lambda c: c.add_exchange(user_message, response_text))
+                
+                yield sse_event({
+                    'response': response_text,
+                    'timestamp': datetime.now().isoformat()
+                }, event='done')
+            except Exception as e:
+                logger.error(f"Chat stream error: {str(e)}")
+                yield sse_event({'error': 'Internal server error'}, event='error')
+        
+        return self._attach_session(
+            StreamingResponse(generate(), media_type='text/event-stream', headers=SSE_HEADERS),
+            session_id, is_new)
+    
+    async def voice_chat(self, request: Request) -> Response:
+        """Handle voice chat requests"""
+        try:
+            # Process voice input
+            form, transcribed_text = await self._transcribe(request)
+            
+            if transcribed_text is None:
+                return JSONResponse({'error': 'No audio file provided'}, status_code=400)
+            if not transcribed_text:
+                return JSONResponse({'error': 'Could not transcribe audio'}, status_code=400)
+            
+            session_id, is_new = self._get_session_id(request)
+            context = await self.sessions.call(session_id, self.conversation_context)
+            
+            # Generate response
+            async with self.llm_limiter.slot():
+                text_response = await self.chat_responder.generate_response(transcribed_text, context)
+            
+            # Convert response to speech
+            audio_format, as_url = self._audio_options(request, form)
+            audio_fields = await self._audio_fields(text_response, audio_format, as_url)
+            
+            # Save conversation
+            await self.sessions.call(session_id, lambda c: c.add_exchange(transcribed_text, text_response))
+            
+            return self._attach_session(JSONResponse({
+                'transcription': transcribed_text,
+                'text_response': text_response,
+                **audio_fields,
+                'timestamp': datetime.now().isoformat()
+            }), session_id, is_new)
+        
+        except AdmissionError as e:
+            return JSONResponse({'error': e.message}, status_code=e.status, headers=e.headers)
+        except Exception as e:
+            logger.error(f"Voice chat error: {str(e)}")
+            return JSONResponse({'error': 'Internal server error'}, status_code=500)
+    
+    async def voice_chat_stream(self, request: Request) -> Response:
+        """Stream the transcription, then each reply sentence with its audio"""
+        try:
+            form, transcribed_text = await self._transcribe(request)
+        except AdmissionError as e:
+            return JSONResponse({'error': e.message}, status_code=e.status, headers=e.headers)
+        except Exception as e:
+            logger.error(f"Voice chat error: {str(e)}")
+            return JSONResponse({'error': 'Internal server error'}, status_code=500)
+        
+        if transcribed_text is None:
+            return JSONResponse({'error': 'No audio file provided'}, status_code=400)
+        if not transcribed_text:
+            return JSONResponse({'error': 'Could not transcribe audio'}, status_code=400)
+        
+        session_id, is_new = self._get_session_id(request)
+        context = await self.sessions.call(session_id, self.conversation_context)
+        audio_format, as_url = self._audio_options(request, form)
+        
+        def speak(sentence: str) -> dict:
+            return self.audio_fields(sentence, audio_format, as_url)
+        
+        async def generate():
+            pieces = []
+            
+            async def recorded(stream):
+                async for piece in stream:
+                    pieces.append(piece)
+                    yield piece
+            
+            try:
+                yield sse_event({'transcription': transcribed_text}, event='transcription')
+                
+                # Sentences are synthesized while later ones are still generating
+                async with self.llm_limiter.slot():
+                    text_stream = recorded(self.chat_responder.stream_response(transcribed_text, context))
+                    async for index, sentence, audio_fields in pipeline_speech_async(
+                            text_stream, speak, self.tts_executor):
+                        yield sse_event({
+                            'index': index,
+                            'text': sentence,
+                            **audio_fields
+                        }, event='sentence')
+                
+                text_response = ''.join(pieces)
+                await self.sessions.call(session_id, lambda c: c.add_exchange(transcribed_text, text_response))
+                
+                yield sse_event({
+                    'text_response': text_response,
+                    'timestamp': datetime.now().isoformat()
+                }, event='done')
+            except AdmissionError as e:
+                # Headers are already sent, so the shed is reported in the stream
+                yield sse_event({'error': e.message, 'retry_after': e.retry_after}, event='error')
+            except Exception as e:
+                logger.error(f"Voice chat stream error: {str(e)}")
+                yield sse_event({'error': 'Internal server error'}, event='error')
+        
+        return self._attach_session(
+            StreamingResponse(generate(), media_type='text/event-stream', headers=SSE_HEADERS),
+            session_id, is_new)
+    
+    async def get_audio(self, request: Request) -> Response:
+        """Serve a synthesized clip as binary audio, with range and caching support"""
+        clip_id = request.path_params['clip_id']
+        clip = await run_in_threadpool(self.voice_handler.get_clip, clip_id)
+        if clip is None:
+            return JSONResponse({'error': 'Audio not found'}, status_code=404)
+        
+        audio_data, mimetype = clip
+        # Clip ids are content hashes, so a clip never changes
+        headers = {
+            'ETag': f'"{clip_id}"',
+            'Cache-Control': 'public, max-age=31536000, immutable',
+            'Accept-Ranges': 'bytes'
+        }
+        if request.headers.get('If-None-Match') in (f'"{clip_id}"', f'W/"{clip_id}"', '*'):
+            return Response(status_code=304, headers=headers)
+        
+        byte_range = parse_range_header(request.headers.get('Range'))
+        span = byte_range.range_for_length(len(audio_data)) if byte_range else None
+        if span is not None:
+            start, stop = span
+            headers['Content-Range'] = f"bytes {start}-{stop - 1}/{len(audio_data)}"
+            return Response(audio_data[start:stop], status_code=206, media_type=mimetype, headers=headers)
+        if byte_range is not None:
+            headers['Content-Range'] = f"bytes */{len(audio_data)}"
+            return Response(status_code=416, headers=headers)
+        return Response(audio_data, media_type=mimetype, headers=headers)
+    
+    async def metrics(self, request: Request) -> Response:
+        """Prometheus scrape endpoint"""
+        return Response(REGISTRY.render(), media_type='text/plain; version=0.0.4')
+    
+    async def get_conversation_history(self, request: Request) -> Response:
+        """Get conversation history, paged with ?limit= and ?before=, or new exchanges with ?since="""
+        try:
+            session_id, is_new = self._get_session_id(request)
+            limit = _int_param(request, 'limit', None)
+            page = await self.sessions.call(session_id, lambda c: c.get_page(
+                before=_int_param(request, 'before', None), since=_int_param(request, 'since', None),
+                limit=limit if limit and limit > 0 else None))
+            
+            # Unchanged since the client's copy: skip serializing the page
+            etag = history_etag(page.pop('version'))
+            headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+            if parse_etags(request.headers.get('If-None-Match')).contains(etag):
+                response = Response(status_code=304, headers=headers)
+            else:
+                response = JSONResponse(page, headers=headers)
+            return self._attach_session(response, session_id, is_new)
+        except Exception as e:
+            logger.error(f"History error: {str(e)}")
+            return JSONResponse({'error': 'Internal server error'}, status_code=500)
+    
+    async def export_history(self, request: Request) -> Response:
+        """Download the history as ?format=json, jsonl, csv, txt or markdown, streamed"""
+        format_type = request.query_params.get('format', 'json').lower()
+        if format_type not in EXPORT_FORMATS:
+            return JSONResponse({'error': f"Unsupported format: {format_type}"}, status_code=400)
+        
+        session_id, is_new = self._get_session_id(request)
+        headers = export_headers(format_type, request.headers.get('Accept-Encoding'))
+        # A sync generator: Starlette advances it in the threadpool, one batch at a time
+        stream = self.export_stream(session_id, format_type, compress='Content-Encoding' in headers)
+        return self._attach_session(StreamingResponse(stream, headers=headers), session_id, is_new)
+    
+    async def search_history(self, request: Request) -> Response:
+        """Ranked, paginated search over the session's history"""
+        try:
+            query = request.query_params.get('q', '').strip()
+            if not query:
+                return JSONResponse({'error': 'No query provided'}, status_code=400)
+            
+            page = max(_int_param(request, 'page', 1), 1)
+            per_page = min(max(_int_param(request, 'per_page', 10), 1), 100)
+            
+            session_id, is_new = self._get_session_id(request)
+            results = await self.sessions.call(
+                session_id, lambda c: c.search(query, page=page, per_page=per_page))
+            return self._attach_session(JSONResponse(results), session_id, is_new)
+        except Exception as e:
+            logger.error(f"Search error: {str(e)}")
+            return JSONResponse({'error': 'Internal server error'}, status_code=500)
+    
+    async def get_stats(self, request: Request) -> Response:
+        """Cheap, pollable conversation statistics for the session"""
+        try:
+            top_n = min(max(_int_param(request, 'top_n', 5), 1), 50)
+            session_id, is_new = self._get_session_id(request)
+            stats, topics = await self.sessions.call(
+                session_id, lambda c: (c.get_conversation_stats(), c.get_frequent_topics(top_n)))
+            return self._attach_session(JSONResponse({
+                'stats': stats,
+                'frequent_topics': topics,
+                'sessions': self.sessions.get_stats(),
+                'response_cache': self.chat_responder.get_cache_stats(),
+                'llm_coalescing': self.chat_responder.get_coalescing_stats(),
+                'admission': self.admission_stats()
+            }), session_id, is_new)
+        except Exception as e:
+            logger.error(f"Stats error: {str(e)}")
+            return JSONResponse({'error': 'Internal server error'}, status_code=500)
+    
+    async def clear_history(self, request: Request) -> Response:
+        """Clear conversation history"""
+        try:
+            session_id, is_new = self._get_session_id(request)
+            await self.sessions.call(session_id, lambda c: c.clear_history())
+            return self._attach_session(JSONResponse({'message': 'History cleared successfully'}),
+                                        session_id, is_new)
+        except Exception as e:
+            logger.error(f"Clear history error: {str(e)}")
+            return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+def _read_template() -> str:
+    """The main page, read per request so template edits show up without a restart"""
+    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _int_param(request: Request, name: str, default: Optional[int]) -> Optional[int]:
+    """Integer query parameter, falling back to default like Flask's ``args.get(type=int)``"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+def create_app() -> Starlette:
+    """Build the ASGI app; voice and LLM components are created when first needed"""
+    return AsyncVoiceBotApp().app
+
+# Expose the ASGI app for uvicorn (not in spawned TTS workers, which re-import this module)
+if __name__ != '__mp_main__':
+    app = create_app()
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.environ.get('PORT', 5000))
+    uvicorn.run(app, host='0.0.0.0', port=port)
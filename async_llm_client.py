@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Async LLM Client Module
+Non-blocking counterpart of OpenRouterClient for the ASGI app, built on httpx
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, Optional
+import logging
+
+import httpx
+
+from llm_client import (DEFAULT_BASE_URL, RETRY_STATUSES, LatencyTracker, LLMAPIError,
+                        api_headers, backoff_delay)
+
+logger = logging.getLogger(__name__)
+
+class AsyncOpenRouterClient:
+    """Shared httpx.AsyncClient with the same retry policy as OpenRouterClient
+
+    A waiting call costs a coroutine rather than a thread, so the connection
+    limit (``LLM_ASYNC_MAX_CONNECTIONS``) is what bounds how many slow
+    completions one process keeps in flight.
+    """
+    
+    def __init__(self, api_key: str, base_url: Optional[str] = None,
+                 max_connections: Optional[int] = None, max_retries: Optional[int] = None,
+                 timeout: float = 30, backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.base_url = (base_url or os.getenv('OPENROUTER_BASE_URL', DEFAULT_BASE_URL)).rstrip('/')
+        self.completions_url = f"{self.base_url}/chat/completions"
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 2))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = LatencyTracker()
+        
+        max_connections = max_connections or int(os.getenv('LLM_ASYNC_MAX_CONNECTIONS', 1000))
+        self.client = httpx.AsyncClient(
+            headers=api_headers(api_key),
+            # No pool timeout: calls beyond the limit wait for a free connection
+            timeout=httpx.Timeout(timeout, pool=None),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=min(max_connections, 100))
+        )
+    
+    async def _post(self, payload: Dict, stream: bool = False) -> httpx.Response:
+        """POST with retries; returns the first successful response"""
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                request = self.client.build_request('POST', self.completions_url, json=payload)
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                self.metrics.record(time.perf_counter() - started)
+                # Only retry when the request never left; a read timeout may already be billed
+                if isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)) and attempt < self.max_retries:
+                    self.metrics.record_retry()
+                    await asyncio.sleep(backoff_delay(attempt, None, self.backoff_base, self.backoff_max))
+                    continue
+                self.metrics.record_failure()
+                raise LLMAPIError(f"API call failed: {str(e)}") from e
+            
+            # For streamed calls this is the time to the response headers
+            self.metrics.record(time.perf_counter() - started)
+            if response.status_code == 200:
+                return response
+            
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self.metrics.record_retry()
+                delay = backoff_delay(attempt, response.headers.get('Retry-After'),
+                                      self.backoff_base, self.backoff_max)
+                logger.warning(f"API returned {response.status_code}, retrying in {delay:.2f}s")
+                await response.aclose()
+                await asyncio.sleep(delay)
+                continue
+            
+            self.metrics.record_failure()
+            await response.aread()
+            await response.aclose()
+            raise LLMAPIError(f"API call failed: {response.status_code} - {response.text}",
+                              status_code=response.status_code)
+    
+    async def chat_completion(self, payload: Dict) -> Dict:
+        """POST a chat completion request and return the decoded JSON body"""
+        response = await self._post(payload)
+        return response.json()
+    
+    async def stream_chat_completion(self, payload: Dict) -> AsyncIterator[str]:
+        """POST a ``stream: true`` request and yield content deltas as they arrive"""
+        response = await self._post(dict(payload, stream=True), stream=True)
+        try:
+            async for line in response.aiter_lines():
+                # Blank lines separate events, ':' lines are keep-alive comments
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                if 'error' in chunk:
+                    raise LLMAPIError(f"API stream failed: {chunk['error']}")
+                choices = chunk.get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content')
+                if content:
+                    yield content
+        except httpx.HTTPError as e:
+            raise LLMAPIError(f"API stream interrupted: {str(e)}") from e
+        finally:
+            await response.aclose()
+    
+    def get_stats(self) -> Dict:
+        return self.metrics.snapshot()
+    
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Audio Formats Module
+Formats speech replies can be delivered in, kept free of heavy imports
+"""
+
+import shutil
+
+# Formats speech replies can be delivered in, with their MIME types
+AUDIO_FORMATS = {
+    'wav': 'audio/wav',
+    'wav8k': 'audio/wav',  # 8 kHz mono PCM, about a third of espeak's 22 kHz output
+    'mp3': 'audio/mpeg',
+    'opus': 'audio/ogg; codecs=opus'
+}
+# Compressed formats are encoded by ffmpeg through pydub
+COMPRESSED_EXPORTS = {
+    'mp3': {'format': 'mp3', 'bitrate': '48k'},
+    'opus': {'format': 'ogg', 'codec': 'libopus', 'bitrate': '24k'}
+}
+_ENCODER_AVAILABLE = bool(shutil.which('ffmpeg') or shutil.which('avconv'))
+
+def available_formats() -> list:
+    """Response formats that can be produced here (compressed ones need ffmpeg)"""
+    return [name for name in AUDIO_FORMATS if name not in COMPRESSED_EXPORTS or _ENCODER_AVAILABLE]
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Audio Utilities Module
+In-memory decoding and resampling of uploaded audio for speech recognition
+"""
+
+import io
+import wave
+from typing import Optional, Tuple
+import logging
+
+import numpy as np
+from pydub import AudioSegment
+
+from audio_formats import COMPRESSED_EXPORTS
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+TARGET_SAMPLE_WIDTH = 2  # 16-bit PCM
+
+def read_wav(data: bytes) -> Optional[Tuple[bytes, int, int, int]]:
+    """Parse a PCM WAV held in memory into (frames, channels, sample_width, sample_rate)
+
+    Returns None for anything that isn't plain PCM WAV, so callers can fall
+    back to a general decoder.
+    """
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wav:
+            return (wav.readframes(wav.getnframes()), wav.getnchannels(),
+                    wav.getsampwidth(), wav.getframerate())
+    except (wave.Error, EOFError):
+        return None
+
+def pcm_to_float(frames: bytes, channels: int, sample_width: int) -> np.ndarray:
+    """Interleaved PCM bytes to float32 samples of shape (frames, channels) in [-1, 1)"""
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        # Place the 3 bytes in the top of an int32 so the sign bit lands right
+        widened = np.zeros((raw.shape[0], 4), dtype=np.uint8)
+        widened[:, 1:] = raw
+        samples = widened.view('<i4').ravel().astype(np.float32) / 2147483648
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype='<i4').astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return samples.reshape(-1, channels)
+
+def to_mono(samples: np.ndarray) -> np.ndarray:
+    """Average (frames, channels) samples down to one channel"""
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1)
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Linear-interpolation resampler for mono float samples
+
+    When downsampling, a moving-average low-pass over the decimation ratio
+    is applied first to keep the worst aliasing out of the speech band.
+    """
+    if source_rate == target_rate or samples.size == 0:
+        return samples
+    ratio = source_rate / target_rate
+    if ratio > 1:
+        width = int(np.ceil(ratio))
+        samples = np.convolve(samples, np.full(width, 1.0 / width, dtype=np.float32), mode='same')
+    target_length = int(round(samples.size / ratio))
+    positions = np.arange(target_length, dtype=np.float64) * ratio
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    """Float samples in [-1, 1) to little-endian 16-bit PCM bytes"""
+    return (np.clip(samples, -1.0, 32767 / 32768) * 32768).astype('<i2').tobytes()
+
+def decode_audio(data: bytes, sample_rate: int = TARGET_SAMPLE_RATE) -> Tuple[bytes, int, int]:
+    """Decode an uploaded clip to mono 16-bit PCM frames at ``sample_rate``
+
+    Returns (frames, sample_rate, sample_width), ready for ``sr.AudioData``.
+    PCM WAV is handled entirely in memory with NumPy; other containers
+    (webm, ogg, mp3, ...) are decoded by pydub/ffmpeg from a memory buffer.
+    """
+    parsed = read_wav(data)
+    if parsed is not None:
+        frames, channels, sample_width, source_rate = parsed
+        if source_rate == sample_rate and sample_width == TARGET_SAMPLE_WIDTH and channels == 1:
+            # Already in the target format: hand the frames over untouched
+            return frames, sample_rate, TARGET_SAMPLE_WIDTH
+        samples = pcm_to_float(frames, channels, sample_width)
+        mono = resample(to_mono(samples), source_rate, sample_rate)
+        return to_pcm16(mono), sample_rate, TARGET_SAMPLE_WIDTH
+    
+    logger.debug("Upload is not PCM WAV, decoding with pydub")
+    audio = AudioSegment.from_file(io.BytesIO(data))
+    audio = audio.set_frame_rate(sample_rate).set_channels(1).set_sample_width(TARGET_SAMPLE_WIDTH)
+    return audio.raw_data, sample_rate, TARGET_SAMPLE_WIDTH
+
+def frame_energy_db(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """RMS level of consecutive frames in dBFS (the last partial frame is zero-padded)"""
+    frame_count = -(-samples.size // frame_length)
+    padded = np.zeros(frame_count * frame_length, dtype=np.float32)
+    padded[:samples.size] = samples
+    frames = padded.reshape(frame_count, frame_length)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+def trim_silence(frames: bytes, sample_rate: int, frame_ms: int = 30, padding_ms: int = 240,
+                 min_speech_ms: int = 120, floor_db: float = -55.0, ceiling_db: float = -35.0,
+                 margin_db: float = 12.0) -> bytes:
+    """Cut silence out of mono 16-bit PCM; returns b'' when there is no speech
+
+    A frame counts as speech when it is ``margin_db`` above the estimated
+    noise floor (10th percentile of frame levels), with the threshold kept
+    between ``floor_db`` and ``ceiling_db``. Speech frames are padded by
+    ``padding_ms`` on both sides, which drops leading/trailing silence and
+    shortens long pauses while keeping natural gaps between words.
+    """
+    samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768
+    frame_length = max(int(sample_rate * frame_ms / 1000), 1)
+    if samples.size < frame_length:
+        return b''
+    
+    energy = frame_energy_db(samples, frame_length)
+    threshold = min(max(np.percentile(energy, 10) + margin_db, floor_db), ceiling_db)
+    speech = energy > threshold
+    if np.count_nonzero(speech) * frame_ms < min_speech_ms:
+        return b''
+    
+    pad = padding_ms // frame_ms
+    keep = np.convolve(speech.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode='same') > 0
+    sample_mask = np.repeat(keep, frame_length)[:samples.size]
+    if sample_mask.all():
+        return frames
+    return np.frombuffer(frames, dtype='<i2')[sample_mask].tobytes()
+
+def encode_audio(wav_data: bytes, audio_format: str) -> bytes:
+    """Convert a synthesized WAV clip into one of AUDIO_FORMATS"""
+    if audio_format == 'wav':
+        return wav_data
+    if audio_format == 'wav8k':
+        frames, channels, sample_width, sample_rate = read_wav(wav_data)
+        mono = resample(to_mono(pcm_to_float(frames, channels, sample_width)), sample_rate, 8000)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(TARGET_SAMPLE_WIDTH)
+            wav.setframerate(8000)
+            wav.writeframes(to_pcm16(mono))
+        return buffer.getvalue()
+    if audio_format in COMPRESSED_EXPORTS:
+        buffer = io.BytesIO()
+        AudioSegment.from_file(io.BytesIO(wav_data), format='wav').set_channels(1).export(
+            buffer, **COMPRESSED_EXPORTS[audio_format])
+        return buffer.getvalue()
+    raise ValueError(f"Unknown audio format: {audio_format}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Intent Routing Benchmark
+Compares the compiled intent matcher with sequential substring checks as the intent table grows
+
+Usage: python benchmarks/bench_intents.py --intents 10 100 500 --messages 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from intent_matcher import IntentMatcher, load_intents
+
+WORDS = ("account billing weather music travel recipe order refund schedule meeting password "
+         "battery network printer invoice delivery holiday budget fitness sleep garden movie").split()
+# Most real messages match no intent and go on to the LLM, so filler words come from another pool
+FILLER = ("could you explain the difference between two ways of writing a short story "
+          "for my younger brother and his friends tomorrow morning").split()
+
+def substring_route(intents: list, message: str):
+    """The previous routing: lowercase, then ``any(phrase in message)`` per intent, in order"""
+    message_lower = message.lower()
+    for name, phrases in intents:
+        if any(phrase in message_lower for phrase in phrases):
+            return name
+    return None
+
+def synthetic_intents(count: int, rng: random.Random) -> list:
+    """The real intent table followed by generated two- and three-word intents"""
+    groups = load_intents(os.path.join(ROOT, 'intents.json'))
+    intents = [(entry['intent'], entry['phrases']) for group in groups.values() for entry in group]
+    while len(intents) < count:
+        phrases = [' '.join(rng.sample(WORDS, rng.choice((2, 3)))) for _ in range(3)]
+        intents.append((f"generated_{len(intents)}", phrases))
+    return intents[:max(count, 1)]
+
+def sample_messages(count: int, rng: random.Random) -> list:
+    """User messages from the bundled history, padded with generated ones"""
+    with open(os.path.join(ROOT, 'conversation_history.json'), 'r', encoding='utf-8') as f:
+        messages = [exchange['user_message'] for exchange in json.load(f)]
+    while len(messages) < count:
+        words = [rng.choice(FILLER) for _ in range(rng.randint(4, 16))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), rng.choice(WORDS))
+        messages.append(' '.join(words))
+    rng.shuffle(messages)
+    return messages[:count]
+
+def time_per_message(route, messages: list) -> float:
+    started = time.perf_counter()
+    for message in messages:
+        route(message)
+    return (time.perf_counter() - started) / len(messages) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--intents', type=int, nargs='+', default=[8, 100, 500])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    messages = sample_messages(args.messages, rng)
+    print(f"{len(messages)} messages, microseconds per message")
+    print(f"  {'intents':>8} {'phrases':>8} {'substring':>10} {'compiled':>10} {'compile ms':>11} {'disagree':>9}")
+    for count in args.intents:
+        intents = synthetic_intents(count, rng)
+        started = time.perf_counter()
+        matcher = IntentMatcher(intents)
+        compile_ms = (time.perf_counter() - started) * 1000
+        
+        substring_us = time_per_message(lambda m: substring_route(intents, m), messages)
+        compiled_us = time_per_message(matcher.match, messages)
+        # Disagreements are substring hits inside longer words ("hi" in "this", "history")
+        disagree = sum(substring_route(intents, m) != matcher.match(m) for m in messages)
+        phrases = sum(len(p) for _, p in intents)
+        print(f"  {len(intents):>8} {phrases:>8} {substring_us:>10.2f} {compiled_us:>10.2f} "
+              f"{compile_ms:>11.1f} {disagree:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Times how long a fresh worker process takes to import the app and serve its first requests
+
+Usage: python benchmarks/bench_startup.py --runs 10 [--prewarm]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter, like a newly forked gunicorn worker
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+ready = time.perf_counter()
+client = app.app.test_client()
+client.get('/')
+first_page = time.perf_counter()
+client.post('/api/chat', json={'message': 'hello'})
+first_chat = time.perf_counter()
+print(json.dumps({
+    'import_ms': (ready - start) * 1000,
+    'first_page_ms': (first_page - ready) * 1000,
+    'first_chat_ms': (first_chat - first_page) * 1000,
+    'total_ms': (first_chat - start) * 1000
+}))
+"""
+
+def run_probe(env: dict) -> dict:
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'probe failed')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--prewarm', action='store_true', help='turn TTS cache pre-warming on')
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix='voicebot-startup-')
+    env = dict(os.environ,
+               SESSIONS_DIR=os.path.join(workdir, 'sessions'),
+               TTS_CACHE_DIR=os.path.join(workdir, 'tts_cache'),
+               OPENROUTER_API_KEY='')
+    # Measure the default configuration unless pre-warming is asked for
+    env.pop('TTS_PREWARM', None)
+    if args.prewarm:
+        env['TTS_PREWARM'] = 'true'
+    try:
+        samples = [run_probe(env) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    print(f"{args.runs} cold starts")
+    for metric in ('import_ms', 'first_page_ms', 'first_chat_ms', 'total_ms'):
+        values = sorted(sample[metric] for sample in samples)
+        print(f"  {metric:<14} median {statistics.median(values):8.1f}   "
+              f"min {values[0]:8.1f}   max {values[-1]:8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+Latency, throughput and memory of the chat, voice and history endpoints and of ConversationManager
+
+Everything runs locally: the LLM is the fake OpenRouter server, speech
+recognition is the stub backend and voice requests upload synthetic WAV
+files, so results only move when the code does. Each scenario reports
+p50/p95/p99 latency, throughput and the process RSS (server included, as
+it runs in-process). Save a run with --json and compare later runs to it
+with --baseline; the exit status is 1 when any scenario regressed.
+
+Usage: python benchmarks/bench_suite.py --app flask --concurrency 1 8 32 --history-sizes 10 100 1000
+       python benchmarks/bench_suite.py --json baseline.json
+       python benchmarks/bench_suite.py --baseline baseline.json --tolerance 0.25
+"""
+
+import argparse
+import http.client
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_openrouter import FakeOpenRouterServer
+
+ENDPOINT_SCENARIOS = ('chat', 'voice', 'history')
+MANAGER_SCENARIOS = ('add_exchange', 'get_history', 'get_context', 'search')
+
+TOPICS = ("weather travel music cooking python garden budget fitness movies history science "
+          "football painting chess coffee holiday language startup career reading").split()
+
+# --- Fixtures -----------------------------------------------------------------
+
+def synthetic_wav(seconds: float, sample_rate: int = 16000, seed: int = 0) -> bytes:
+    """16-bit mono WAV of syllable-like tone bursts between short silences
+
+    Leading and trailing silence give the VAD something to trim, and the
+    bursts are loud enough to count as speech.
+    """
+    rng = random.Random(seed)
+    samples = []
+    silence = int(0.25 * sample_rate)
+    samples.extend([0] * silence)
+    while len(samples) < silence + seconds * sample_rate:
+        frequency = rng.uniform(120, 320)
+        burst = int(rng.uniform(0.08, 0.25) * sample_rate)
+        for n in range(burst):
+            envelope = math.sin(math.pi * n / burst)
+            samples.append(int(12000 * envelope * math.sin(2 * math.pi * frequency * n / sample_rate)))
+        samples.extend([0] * int(rng.uniform(0.02, 0.08) * sample_rate))
+    samples.extend([0] * silence)
+    
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return buffer.getvalue()
+
+def multipart_body(field: str, filename: str, content: bytes, content_type: str):
+    """(body, Content-Type header) for a single-file multipart/form-data upload"""
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n").encode('utf-8') + content + \
+           f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+def synthetic_exchange(rng: random.Random, n: int):
+    """A (user message, assistant reply) pair on a random topic; avoids the canned-intent phrases"""
+    topic, other = rng.sample(TOPICS, 2)
+    return (f"question {n}: what should I know about {topic} and {other} this week",
+            f"Here are a few thoughts on {topic}. When it comes to {other}, start small and "
+            f"keep notes so you can compare what worked.")
+
+# --- Measurement --------------------------------------------------------------
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Linearly interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return 0.0
+
+def run_load(operation, total: int, concurrency: int, make_state=lambda: None) -> dict:
+    """Run ``operation(state, n)`` ``total`` times from ``concurrency`` threads
+
+    ``operation`` returns True on success. Each thread gets its own state
+    from ``make_state`` (e.g. a keep-alive connection).
+    """
+    counter = itertools.count()
+    latencies = []
+    errors = []
+    
+    def worker():
+        state = make_state()
+        local = []
+        while True:
+            n = next(counter)
+            if n >= total:
+                break
+            started = time.perf_counter()
+            try:
+                ok = operation(state, n)
+            except Exception as e:
+                ok = False
+                errors.append(str(e))
+            local.append(time.perf_counter() - started)
+            if not ok:
+                errors.append(f"request {n} failed")
+        latencies.extend(local)
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    return {
+        'requests': total,
+        'errors': len(errors),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'throughput': total / elapsed if elapsed else 0.0,
+        'rss_mb': rss_mb()
+    }
+
+# --- HTTP ---------------------------------------------------------------------
+
+class Client:
+    """One keep-alive connection per worker thread, reopened after any error"""
+    
+    def __init__(self, port: int):
+        self.port = port
+        self.connection = None
+    
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None) -> int:
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        try:
+            self.connection.request(method, path, body=body, headers=headers or {})
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except Exception:
+            self.connection.close()
+            self.connection = None
+            raise
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(app_kind: str) -> tuple:
+    """Serve the chosen app on a local port from a background thread; returns (port, stop)"""
+    port = free_port()
+    if app_kind == 'asgi':
+        import uvicorn
+        from asgi_app import app
+        server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        
+        def stop():
+            server.should_exit = True
+        return port, stop
+    
+    from werkzeug.serving import make_server
+    from app import app
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return port, server.shutdown
+
+def seed_sessions(sessions_dir: str, count: int, history_size: int, max_history: int,
+                  rng: random.Random) -> list:
+    """Create ``count`` sessions holding ``history_size`` exchanges each, written before the app loads them"""
+    from session_store import SessionStore
+    store = SessionStore(sessions_dir=sessions_dir, max_history_length=max_history)
+    session_ids = [SessionStore.new_session_id() for _ in range(count)]
+    for session_id in session_ids:
+        with store.session(session_id) as conversation:
+            for n in range(history_size):
+                conversation.add_exchange(*synthetic_exchange(rng, n))
+    store.close()
+    return session_ids
+
+def endpoint_operation(scenario: str, session_ids: list, wav: bytes):
+    """Request function for one endpoint scenario"""
+    if scenario == 'chat':
+        def operation(client: Client, n: int) -> bool:
+            payload = json.dumps({'message': f"benchmark question {n}: compare {TOPICS[n % len(TOPICS)]} "
+                                             f"options for request {uuid.uuid4().hex[:8]}"})
+            return client.request('POST', '/api/chat', payload.encode('utf-8'), {
+                'Content-Type': 'application/json',
+                'X-Session-ID': session_ids[n % len(session_ids)]}) == 200
+    elif scenario == 'voice':
+        def operation(client: Client, n: int) -> bool:
+            body, content_type = multipart_body('audio', 'bench.wav', wav, 'audio/wav')
+            return client.request('POST', '/api/voice-chat', body, {
+                'Content-Type': content_type,
+                'X-Session-ID': session_ids[n % len(session_ids)]}) == 200
+    else:
+        def operation(client: Client, n: int) -> bool:
+            return client.request('GET', '/api/conversation-history', headers={
+                'X-Session-ID': session_ids[n % len(session_ids)]}) == 200
+    return operation
+
+# --- ConversationManager ------------------------------------------------------
+
+def manager_operation(scenario: str, manager, rng: random.Random):
+    if scenario == 'add_exchange':
+        return lambda state, n: manager.add_exchange(*synthetic_exchange(random.Random(n), n)) or True
+    if scenario == 'get_history':
+        return lambda state, n: manager.get_history() is not None
+    if scenario == 'get_context':
+        # One new exchange per turn, as in a real conversation, so the window has work to do
+        def operation(state, n):
+            manager.add_exchange(*synthetic_exchange(random.Random(n), n))
+            return manager.get_context() is not None
+        return operation
+    queries = [' '.join(rng.sample(TOPICS, 2)) for _ in range(64)]
+    return lambda state, n: manager.search(queries[n % len(queries)]) is not None
+
+# --- Reporting ----------------------------------------------------------------
+
+def result_key(result: dict) -> str:
+    return f"{result['scenario']}/h{result['history']}/c{result['concurrency']}"
+
+def print_result(result: dict) -> None:
+    print(f"  {result['scenario']:<16} {result['history']:>7} {result['concurrency']:>5} "
+          f"{result['requests']:>6} {result['errors']:>5} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+          f"{result['p99_ms']:>9.2f} {result['throughput']:>9.1f} {result['rss_mb']:>8.1f}")
+
+def compare(results: list, baseline_path: str, tolerance: float, min_delta_ms: float) -> list:
+    """Scenarios whose p95 grew, or whose throughput fell, by more than ``tolerance``
+
+    Changes smaller than ``min_delta_ms`` per request are ignored, so
+    timer noise on sub-millisecond operations is not reported.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {result_key(result): result for result in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get(result_key(result))
+        if before is None:
+            continue
+        if result['errors'] > before['errors']:
+            regressions.append(f"{result_key(result)}: errors {before['errors']} -> {result['errors']}")
+        if (result['p95_ms'] > before['p95_ms'] * (1 + tolerance) and
+                result['p95_ms'] - before['p95_ms'] > min_delta_ms):
+            regressions.append(f"{result_key(result)}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        # Throughput as time per request, to apply the same noise floor
+        per_request_ms = 1000 / result['throughput'] if result['throughput'] else float('inf')
+        before_per_request_ms = 1000 / before['throughput'] if before['throughput'] else float('inf')
+        if (result['throughput'] < before['throughput'] * (1 - tolerance) and
+                per_request_ms - before_per_request_ms > min_delta_ms):
+            regressions.append(f"{result_key(result)}: throughput {before['throughput']:.1f} -> "
+                               f"{result['throughput']:.1f} req/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--app', choices=['flask', 'asgi'], default='flask')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--history-sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--scenarios', nargs='+', default=list(ENDPOINT_SCENARIOS + MANAGER_SCENARIOS),
+                        choices=ENDPOINT_SCENARIOS + MANAGER_SCENARIOS)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='seconds per fake completion')
+    parser.add_argument('--audio-seconds', type=float, default=2.0, help='length of the WAV fixture')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per endpoint')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='results file from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help='ignore slowdowns smaller than this per request')
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='voicebot-bench-')
+    fake = FakeOpenRouterServer(latency=args.llm_latency).start()
+    max_history = max(args.history_sizes)
+    os.environ.update({
+        'SESSIONS_DIR': os.path.join(workdir, 'sessions'),
+        'TTS_CACHE_DIR': os.path.join(workdir, 'tts_cache'),
+        'OPENROUTER_API_KEY': 'bench',
+        'OPENROUTER_BASE_URL': fake.base_url,
+        'STT_BACKEND': 'stub',
+        'MAX_HISTORY_LENGTH': str(max_history),
+        'MAX_HOT_SESSIONS': str(max(256, max(args.concurrency) * len(args.history_sizes)))
+    })
+    os.environ.setdefault('TTS_PREWARM', 'false')
+    
+    endpoint_scenarios = [s for s in args.scenarios if s in ENDPOINT_SCENARIOS]
+    manager_scenarios = [s for s in args.scenarios if s in MANAGER_SCENARIOS]
+    wav = synthetic_wav(args.audio_seconds, seed=args.seed)
+    results = []
+    
+    print(f"app={args.app} llm_latency={args.llm_latency}s wav={len(wav)} bytes "
+          f"({args.audio_seconds}s) requests/scenario={args.requests}")
+    print(f"  {'scenario':<16} {'history':>7} {'conc':>5} {'reqs':>6} {'errs':>5} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'rss MB':>8}")
+    
+    if endpoint_scenarios:
+        port, stop = start_server(args.app)
+        logging.disable(logging.WARNING)
+        warmup_ids = [uuid.uuid4().hex]
+        for scenario in endpoint_scenarios:
+            run_load(endpoint_operation(scenario, warmup_ids, wav), args.warmup, 1, lambda: Client(port))
+        
+        for history_size in args.history_sizes:
+            session_ids = seed_sessions(os.environ['SESSIONS_DIR'], max(args.concurrency), history_size,
+                                        history_size, rng)
+            for scenario in endpoint_scenarios:
+                for concurrency in args.concurrency:
+                    result = run_load(endpoint_operation(scenario, session_ids[:concurrency], wav),
+                                      args.requests, concurrency, lambda: Client(port))
+                    result.update(scenario=scenario, history=history_size, concurrency=concurrency)
+                    results.append(result)
+                    print_result(result)
+        stop()
+    
+    if manager_scenarios:
+        from conversation_manager import ConversationManager
+        logging.disable(logging.WARNING)
+        for history_size in args.history_sizes:
+            for scenario in manager_scenarios:
+                for concurrency in args.concurrency:
+                    history_file = os.path.join(workdir, f"manager-{scenario}-{history_size}-{concurrency}.json")
+                    manager = ConversationManager(history_file=history_file, max_history_length=history_size)
+                    for n in range(history_size):
+                        manager.add_exchange(*synthetic_exchange(rng, n))
+                    result = run_load(manager_operation(scenario, manager, rng), args.requests, concurrency)
+                    manager.close()
+                    result.update(scenario=scenario, history=history_size, concurrency=concurrency)
+                    results.append(result)
+                    print_result(result)
+    
+    fake.stop()
+    shutil.rmtree(workdir, ignore_errors=True)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'app': args.app, 'args': vars(args), 'results': results}, f, indent=2)
+        print(f"results written to {args.json}")
+    
+    failed = any(result['errors'] for result in results)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+        if not regressions:
+            print(f"OK: no scenario regressed by more than {args.tolerance:.0%} against {args.baseline}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
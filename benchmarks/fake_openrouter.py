@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Fake OpenRouter Server
+Local stand-in for the OpenAI-compatible chat completions API
+
+Run it and point the bot at it:
+    python benchmarks/fake_openrouter.py --port 8090 --latency 0.2
+    OPENROUTER_API_KEY=test OPENROUTER_BASE_URL=http://127.0.0.1:8090/api/v1 python app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = ("Thanks for asking! This reply comes from the local fake OpenRouter server. "
+                 "It stands in for a real model so latency and throughput can be measured offline.")
+
+class FakeOpenRouterHandler(BaseHTTPRequestHandler):
+    """Answers POST .../chat/completions with a canned (optionally streamed) completion"""
+    
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send_json(self, status: int, body: dict, headers: dict = None) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+    
+    def _stream_reply(self, reply: str) -> None:
+        """Send the reply word by word as server-sent events"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        
+        # Total generation time is spread over the tokens, first one included
+        words = reply.split(' ')
+        delay = self.server.latency / max(len(words), 1)
+        for i, word in enumerate(words):
+            time.sleep(delay)
+            chunk = {'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word}}]}
+            # Raw UTF-8 like the real API; no charset in the Content-Type either
+            self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+    
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+        
+        if not self.path.endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+        
+        with server.lock:
+            server.requests_served += 1
+        
+        if random.random() < server.error_rate:
+            self._send_json(random.choice([429, 503]), {'error': {'message': 'injected failure'}},
+                            headers={'Retry-After': '0'})
+            return
+        
+        user_message = request.get('messages', [{}])[-1].get('content', '')
+        reply = server.reply or f"{DEFAULT_REPLY} You said: {user_message}"
+        if request.get('stream'):
+            self._stream_reply(reply)
+            return
+        
+        time.sleep(server.latency)
+        self._send_json(200, {
+            'id': f"fake-{server.requests_served}",
+            'object': 'chat.completion',
+            'model': request.get('model') or 'fake/model',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop'
+            }]
+        })
+
+class FakeOpenRouterServer(ThreadingHTTPServer):
+    """Threaded fake server; use start()/stop() when embedding it in a benchmark"""
+    
+    daemon_threads = True
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, reply: str = None):
+        super().__init__((host, port), FakeOpenRouterHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.reply = reply
+        self.requests_served = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+    
+    def start(self) -> 'FakeOpenRouterServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+    
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the OpenRouter API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds per completion')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of 429/503 replies')
+    args = parser.parse_args()
+    
+    server = FakeOpenRouterServer(args.host, args.port, args.latency, args.error_rate)
+    print(f"Fake OpenRouter listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
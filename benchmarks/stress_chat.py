@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Chat Stress Benchmark
+Hammers /api/chat from many threads and verifies that no exchange is lost
+
+Usage: python benchmarks/stress_chat.py --threads 32 --requests 50 --sessions 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def post_json(url: str, payload: dict, session_id: str) -> int:
+    """POST a JSON body and return the status code"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json', 'X-Session-ID': session_id},
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+        return response.status
+
+def get_history(base_url: str, session_id: str) -> list:
+    request = urllib.request.Request(
+        f"{base_url}/api/conversation-history",
+        headers={'X-Session-ID': session_id}
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())['history']
+
+def verify_session(history: list, expected: set) -> list:
+    """Return a list of problems found in one session's history"""
+    problems = []
+    ids = [ex['exchange_id'] for ex in history]
+    if len(ids) != len(set(ids)):
+        problems.append(f"duplicate exchange ids ({len(ids) - len(set(ids))})")
+    if ids != sorted(ids):
+        problems.append("exchange ids are not increasing")
+    messages = {ex['user_message'] for ex in history}
+    missing = expected - messages
+    if missing:
+        problems.append(f"{len(missing)} lost exchanges")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=50, help='requests per thread')
+    parser.add_argument('--sessions', type=int, default=8, help='sessions shared by all threads')
+    args = parser.parse_args()
+
+    total = args.threads * args.requests
+    sessions_dir = tempfile.mkdtemp(prefix='voicebot-stress-')
+    os.environ['SESSIONS_DIR'] = sessions_dir
+    os.environ['MAX_HISTORY_LENGTH'] = str(total + 1)
+    os.environ['OPENROUTER_API_KEY'] = ''  # canned/fallback replies only, no network
+
+    from werkzeug.serving import make_server
+    from app import app
+    from session_store import SessionStore
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    session_ids = [uuid.uuid4().hex for _ in range(args.sessions)]
+    expected = {session_id: set() for session_id in session_ids}
+    for i in range(args.threads):
+        for j in range(args.requests):
+            expected[session_ids[(i + j) % args.sessions]].add(f"stress {i}-{j}")
+
+    errors = []
+    def worker(i: int) -> None:
+        for j in range(args.requests):
+            session_id = session_ids[(i + j) % args.sessions]
+            try:
+                status = post_json(f"{base_url}/api/chat", {'message': f"stress {i}-{j}"}, session_id)
+                if status != 200:
+                    errors.append(f"HTTP {status}")
+            except Exception as e:
+                errors.append(str(e))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(worker, range(args.threads)))
+    elapsed = time.perf_counter() - started
+
+    problems = []
+    for session_id in session_ids:
+        for problem in verify_session(get_history(base_url, session_id), expected[session_id]):
+            problems.append(f"{session_id} (live): {problem}")
+    server.shutdown()
+
+    # Re-read everything from disk to catch torn or missing journal records
+    reloaded = SessionStore(sessions_dir=sessions_dir, max_history_length=total + 1)
+    for session_id in session_ids:
+        with reloaded.session(session_id) as conversation:
+            for problem in verify_session(conversation.get_history(), expected[session_id]):
+                problems.append(f"{session_id} (disk): {problem}")
+    reloaded.close()
+    shutil.rmtree(sessions_dir, ignore_errors=True)
+
+    print(f"requests:    {total} ({args.threads} threads, {args.sessions} sessions)")
+    print(f"elapsed:     {elapsed:.2f}s")
+    print(f"throughput:  {total / elapsed:.1f} req/s")
+    print(f"http errors: {len(errors)}")
+    for problem in problems:
+        print(f"FAIL {problem}")
+
+    if errors or problems:
+        sys.exit(1)
+    print("OK: no exchanges lost")
+
+if __name__ == '__main__':
+    main()
@@ -6,28 +6,128 @@ Generates responses that mimics an AI's communication style and personality
 
 import os
 import json
-import requests
-from typing import Dict, List, Optional
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
 import logging
 from dotenv import load_dotenv
 
+from intent_matcher import IntentMatcher, load_intents
+from llm_client import OpenRouterClient
+from metrics import CHAT_REPLIES, STAGE_SECONDS, record_error, span
+from response_cache import ResponseCache, normalize_message
+from single_flight import AsyncSingleFlight, SingleFlight
+
 # Load environment variables from .env file
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = """You are an AI-bot, an AI assistant who can respond to voice as well as text input. Respond in a way that's helpful, honest, and harmless. Be thoughtful, curious, and genuinely engaged with the user's question. Maintain a warm but professional tone, and be transparent about your nature as an AI while still being personable and helpful."""
+
+# Fixed fallback replies; returned verbatim, so their audio can be cached ahead of time
+GREETING_REPLY = "Hello! I'm an AI Voice-Bot, and I'm here to help you with whatever questions or tasks you have. What would you like to explore together today?"
+CAPABILITIES_REPLY = "I can help with a wide variety of tasks! I'm good at analysis, writing, creative projects, answering questions, problem-solving, and having thoughtful conversations. I aim to be genuinely helpful while being honest about my limitations as an AI. What specific area would you like to explore?"
+FEELINGS_REPLY = "I appreciate you asking! I don't experience emotions the way humans do, but I find fulfillment in our conversations and helping solve interesting problems. I'm curious about what brings you here today - what would you like to discuss or work on?"
+
+# Replies for the built-in fallback intents of intents.json
+FALLBACK_REPLIES = {
+    'greeting': GREETING_REPLY,
+    'capabilities': CAPABILITIES_REPLY,
+    'feelings': FEELINGS_REPLY
+}
+
+DEFAULT_INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json')
+
+class _StreamRecorder:
+    """Timings, metrics and caching for one streamed LLM reply, shared by the sync and async paths"""
+    
+    def __init__(self, responder: 'ChatResponder', message: str, namespace: str):
+        self.responder = responder
+        self.message = message
+        self.namespace = namespace
+        self.pieces = []
+        self.started = time.perf_counter()
+    
+    def add(self, token: str) -> None:
+        if not self.pieces:
+            STAGE_SECONDS.observe(time.perf_counter() - self.started, stage='llm_first_token')
+        self.pieces.append(token)
+    
+    def complete(self) -> None:
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, stage='llm_stream')
+        CHAT_REPLIES.inc(path='api')
+        # Only complete replies are cached
+        self.responder.response_cache.put(self.message, ''.join(self.pieces), self.namespace)
+    
+    def fail(self, error: Exception) -> Optional[str]:
+        """The fallback reply to send instead, or None if part of the answer already went out"""
+        logger.error(f"API stream failed: {str(error)}")
+        record_error('llm_stream', error)
+        if self.pieces:
+            # Part of the answer is already with the client; end it there
+            CHAT_REPLIES.inc(path='api_partial')
+            return None
+        CHAT_REPLIES.inc(path='fallback')
+        return self.responder._generate_fallback_response(self.message)
+
 class ChatResponder:
     """Handles generating AI-bot-style responses"""
     
     def __init__(self):
         self.chat_personality = self._load_chat_personality()
+        self._load_intents(os.getenv('INTENTS_PATH', DEFAULT_INTENTS_PATH))
         self.api_key = os.getenv('OPENROUTER_API_KEY')
         self.model = os.getenv('OPENROUTER_MODEL')  # Default to free model
         self.use_fallback = not self.api_key
+        # One pooled client per worker so connections are reused across turns
+        self.client = self._create_client() if self.api_key else None
+        self._system_message = {'role': 'system', 'content': SYSTEM_PROMPT}
+        # Repeated questions are answered without another LLM round-trip
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', 1024)),
+            ttl=float(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+            similarity_threshold=float(os.getenv('RESPONSE_CACHE_SIMILARITY', 0))
+        )
+        # Replies from one model never answer for another
+        self._model_namespace = self.model or ''
+        # 'context': a reply is only reused (or shared by coalesced requests) when the
+        # conversation before the question matches too, so a "tell me more" never gets
+        # another session's answer; 'model': any repeat of the question reuses it
+        self.cache_scope = os.getenv('RESPONSE_CACHE_SCOPE', 'context').lower()
+        # Identical questions arriving together share one upstream call
+        self.in_flight = self._create_single_flight()
         
         if self.use_fallback:
             logger.warning("No OpenRouter API key found. Using fallback responses.")
     
+    def _create_client(self):
+        return OpenRouterClient(self.api_key)
+    
+    def _create_single_flight(self):
+        return SingleFlight()
+    
+    def _load_intents(self, path: str) -> None:
+        """Compile the intent table; an intent replies with its own "response" or a built-in one"""
+        groups = load_intents(path)
+        builtin = {
+            'sample_questions': self.chat_personality["sample_responses"],
+            'fallback': FALLBACK_REPLIES
+        }
+        self._intent_replies = {}
+        for group in ('sample_questions', 'fallback'):
+            entries = groups.get(group, [])
+            replies = {}
+            for entry in entries:
+                reply = entry.get('response') or builtin[group].get(entry['intent'])
+                if not reply:
+                    raise ValueError(f"Intent '{entry['intent']}' in {path} has no response")
+                replies[entry['intent']] = reply
+            self._intent_replies[group] = replies
+        self._sample_matcher = IntentMatcher(
+            [(entry['intent'], entry['phrases']) for entry in groups.get('sample_questions', [])])
+        self._fallback_matcher = IntentMatcher(
+            [(entry['intent'], entry['phrases']) for entry in groups.get('fallback', [])])
+    
     def _load_chat_personality(self) -> Dict:
         """Load personality traits and response patterns"""
         return {
@@ -54,101 +154,202 @@ class ChatResponder:
             }
         }
     
-    def generate_response(self, user_message: str) -> str:
-        """Generate a AI-style response to user input"""
+    def generate_response(self, user_message: str, context: Optional[Dict] = None) -> str:
+        """Generate a AI-style response to user input
         
-        # Check if this matches one of our sample questions
-        response = self._check_sample_questions(user_message)
-        if response:
+        ``context`` is a conversation window from ConversationManager.get_context;
+        its messages are sent ahead of the user message so the LLM remembers the chat.
+        """
+        response, namespace = self._local_reply(user_message, context)
+        if response is not None:
             return response
         
-        # If we have API access, use the OpenRouter API
-        if not self.use_fallback:
-            try:
-                return self._generate_with_api(user_message)
-            except Exception as e:
-                logger.error(f"API call failed: {str(e)}")
-                # Fall back to rule-based response
-        
-        # Use fallback response generation
-        return self._generate_fallback_response(user_message)
+        try:
+            with span('llm'):
+                response = self.in_flight.do(
+                    self._flight_key(user_message, namespace),
+                    lambda: self._generate_and_cache(user_message, context, namespace))
+            CHAT_REPLIES.inc(path='api')
+            return response
+        except Exception as e:
+            return self._api_failed(user_message, e)
     
-    def _check_sample_questions(self, message: str) -> Optional[str]:
-        """Check if the message matches one of our sample questions"""
-        message_lower = message.lower()
-        
-        if any(phrase in message_lower for phrase in ["life story", "tell me about yourself", "who are you"]):
-            return self.chat_personality["sample_responses"]["life_story"]
-        
-        elif any(phrase in message_lower for phrase in ["superpower", "greatest strength", "best at"]):
-            return self.chat_personality["sample_responses"]["superpower"]
-        
-        elif any(phrase in message_lower for phrase in ["grow in", "areas to improve", "growth areas"]):
-            return self.chat_personality["sample_responses"]["growth_areas"]
+    def stream_response(self, user_message: str, context: Optional[Dict] = None) -> Iterator[str]:
+        """Yield the response in pieces as the LLM produces them
         
-        elif any(phrase in message_lower for phrase in ["misconception", "misunderstand", "wrong about you"]):
-            return self.chat_personality["sample_responses"]["misconceptions"]
+        Canned and fallback replies are yielded as a single piece. The pieces
+        joined together are the full response text.
+        """
+        response, namespace = self._local_reply(user_message, context)
+        if response is not None:
+            yield response
+            return
         
-        elif any(phrase in message_lower for phrase in ["push boundaries", "limits", "challenge yourself"]):
-            return self.chat_personality["sample_responses"]["pushing_boundaries"]
-        
-        return None
+        stream = _StreamRecorder(self, user_message, namespace)
+        try:
+            for token in self.client.stream_chat_completion(self._build_payload(user_message, context)):
+                stream.add(token)
+                yield token
+            stream.complete()
+        except Exception as e:
+            fallback = stream.fail(e)
+            if fallback is not None:
+                yield fallback
     
-    def _generate_with_api(self, message: str) -> str:
-        """Generate response using OpenRouter API"""
+    def _local_reply(self, message: str, context: Optional[Dict]) -> Tuple[Optional[str], str]:
+        """A reply that needs no LLM call (canned, cached or fallback), and the cache namespace
         
-        system_prompt = """You are an AI-bot, an AI assistant who can respond to voice as well as text input. Respond in a way that's helpful, honest, and harmless. Be thoughtful, curious, and genuinely engaged with the user's question. Maintain a warm but professional tone, and be transparent about your nature as an AI while still being personable and helpful."""
+        The reply is None when the LLM has to be asked; the namespace is then
+        the one to coalesce and cache the new reply under.
+        """
+        # Check if this matches one of our sample questions
+        response = self._check_sample_questions(message)
+        if response:
+            CHAT_REPLIES.inc(path='canned')
+            return response, ''
         
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json',
-            'HTTP-Referer': 'https://github.com/your-repo',
-            'X-Title': 'AI Voice Bot'
-        }
+        # Without API access, use fallback response generation
+        if self.use_fallback:
+            CHAT_REPLIES.inc(path='fallback')
+            return self._generate_fallback_response(message), ''
         
-        payload = {
+        namespace = self._cache_namespace(context)
+        cached = self.response_cache.get(message, namespace)
+        if cached is not None:
+            CHAT_REPLIES.inc(path='cache')
+        return cached, namespace
+    
+    def _api_failed(self, message: str, error: Exception) -> str:
+        """Fall back to a rule-based response when the API call fails"""
+        logger.error(f"API call failed: {str(error)}")
+        CHAT_REPLIES.inc(path='fallback')
+        return self._generate_fallback_response(message)
+    
+    def _check_sample_questions(self, message: str) -> Optional[str]:
+        """Check if the message matches one of our sample questions"""
+        intent = self._sample_matcher.match(message)
+        return self._intent_replies['sample_questions'][intent] if intent else None
+    
+    def _generate_and_cache(self, message: str, context: Optional[Dict], namespace: str) -> str:
+        response = self._generate_with_api(message, context)
+        self.response_cache.put(message, response, namespace)
+        return response
+    
+    @staticmethod
+    def _reply_text(data: Dict) -> str:
+        return data['choices'][0]['message']['content']
+    
+    @staticmethod
+    def _flight_key(message: str, namespace: str) -> tuple:
+        """Requests coalesce when the prompt matches after normalization, as cache keys do"""
+        return namespace, normalize_message(message) or message
+    
+    def _cache_namespace(self, context: Optional[Dict]) -> str:
+        """Cached replies are reused under the same model and, unless scope is 'model', the same context"""
+        if self.cache_scope != 'model' and context and context['fingerprint']:
+            return f"{self._model_namespace}:{context['fingerprint']}"
+        return self._model_namespace
+    
+    def _build_payload(self, message: str, context: Optional[Dict] = None) -> Dict:
+        """Chat completion request body for one user message and its conversation context"""
+        return {
             'model': self.model,
             'messages': [
-                {'role': 'system', 'content': system_prompt},
+                self._system_message,
+                *(context['messages'] if context else []),
                 {'role': 'user', 'content': message}
             ],
             'max_tokens': 1024,
             'temperature': 0.7
         }
-        
-        response = requests.post(
-            'https://openrouter.ai/api/v1/chat/completions',
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        else:
-            raise Exception(f"API call failed: {response.status_code} - {response.text}")
+    
+    def _generate_with_api(self, message: str, context: Optional[Dict] = None) -> str:
+        """Generate response using OpenRouter API"""
+        data = self.client.chat_completion(self._build_payload(message, context))
+        return self._reply_text(data)
     
     def _generate_fallback_response(self, message: str) -> str:
         """Generate a fallback response using rule-based logic"""
         
-        message_lower = message.lower()
-        
-        # Greeting responses
-        if any(greeting in message_lower for greeting in ["hello", "hi", "hey", "good morning", "good afternoon"]):
-            return "Hello! I'm an AI Voice-Bot, and I'm here to help you with whatever questions or tasks you have. What would you like to explore together today?"
-        
-        # Question about capabilities
-        elif any(phrase in message_lower for phrase in ["what can you do", "capabilities", "help with"]):
-            return "I can help with a wide variety of tasks! I'm good at analysis, writing, creative projects, answering questions, problem-solving, and having thoughtful conversations. I aim to be genuinely helpful while being honest about my limitations as an AI. What specific area would you like to explore?"
-        
-        # Personal questions
-        elif any(phrase in message_lower for phrase in ["how are you", "how do you feel"]):
-            return "I appreciate you asking! I don't experience emotions the way humans do, but I find fulfillment in our conversations and helping solve interesting problems. I'm curious about what brings you here today - what would you like to discuss or work on?"
+        intent = self._fallback_matcher.match(message)
+        if intent:
+            return self._intent_replies['fallback'][intent]
         
         # Default thoughtful response
-        else:
-            return f"That's an interesting question about '{message}'. I'd like to give you a thoughtful response, but I want to make sure I understand what you're looking for. Could you help me understand more about what specific aspect you'd like me to focus on? I'm here to help in whatever way would be most useful to you."
+        return f"That's an interesting question about '{message}'. I'd like to give you a thoughtful response, but I want to make sure I understand what you're looking for. Could you help me understand more about what specific aspect you'd like me to focus on? I'm here to help in whatever way would be most useful to you."
+    
+    def get_canned_responses(self) -> List[str]:
+        """Replies that are always returned word for word (sample answers and fixed fallbacks)"""
+        return [reply for replies in self._intent_replies.values() for reply in replies.values()]
+    
+    def get_client_stats(self) -> Dict:
+        """Connection pool and latency figures for the LLM client"""
+        return self.client.get_stats() if self.client else {}
+    
+    def get_cache_stats(self) -> Dict:
+        """Hit/miss counts of the response cache"""
+        return self.response_cache.get_stats()
+    
+    def get_coalescing_stats(self) -> Dict:
+        """Upstream calls made and requests that shared another request's call"""
+        return self.in_flight.get_stats()
     
     def get_personality_info(self) -> Dict:
         """Return information about AI-bot's personality for debugging"""
-        return self.chat_personality
\ No newline at end of file
+        return self.chat_personality
+
+class AsyncChatResponder(ChatResponder):
+    """ChatResponder for the ASGI app: same replies, but LLM calls are awaited"""
+    
+    def _create_client(self):
+        # httpx is only needed when serving through asgi_app.py
+        from async_llm_client import AsyncOpenRouterClient
+        return AsyncOpenRouterClient(self.api_key)
+    
+    def _create_single_flight(self):
+        return AsyncSingleFlight()
+    
+    async def generate_response(self, user_message: str, context: Optional[Dict] = None) -> str:
+        """Generate a AI-style response to user input"""
+        response, namespace = self._local_reply(user_message, context)
+        if response is not None:
+            return response
+        
+        try:
+            with span('llm'):
+                response = await self.in_flight.do(
+                    self._flight_key(user_message, namespace),
+                    lambda: self._agenerate_and_cache(user_message, context, namespace))
+            CHAT_REPLIES.inc(path='api')
+            return response
+        except Exception as e:
+            return self._api_failed(user_message, e)
+    
+    async def _agenerate_and_cache(self, message: str, context: Optional[Dict], namespace: str) -> str:
+        data = await self.client.chat_completion(self._build_payload(message, context))
+        response = self._reply_text(data)
+        self.response_cache.put(message, response, namespace)
+        return response
+    
+    async def stream_response(self, user_message: str,
+                              context: Optional[Dict] = None) -> AsyncIterator[str]:
+        """Yield the response in pieces as the LLM produces them"""
+        response, namespace = self._local_reply(user_message, context)
+        if response is not None:
+            yield response
+            return
+        
+        stream = _StreamRecorder(self, user_message, namespace)
+        try:
+            async for token in self.client.stream_chat_completion(self._build_payload(user_message, context)):
+                stream.add(token)
+                yield token
+            stream.complete()
+        except Exception as e:
+            fallback = stream.fail(e)
+            if fallback is not None:
+                yield fallback
+    
+    async def aclose(self) -> None:
+        if self.client:
+            await self.client.aclose()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Context Builder Module
+Token-budgeted window of recent exchanges sent to the LLM as conversation memory
+"""
+
+import hashlib
+import json
+import re
+from collections import deque
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Role and framing tokens each chat message costs on top of its text
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: one per word or symbol, plus one per extra 6 letters of long words"""
+    pieces = _PIECE_PATTERN.findall(text)
+    return len(pieces) + sum((len(piece) - 1) // 6 for piece in pieces if len(piece) > 6)
+
+def _topic(message: str, max_words: int = 12) -> str:
+    words = message.split()
+    return ' '.join(words[:max_words]) + (' ...' if len(words) > max_words else '')
+
+class ContextWindow:
+    """The most recent exchanges of one session that fit a token budget
+
+    ``sync`` only processes exchanges added since the previous call, so
+    each turn costs the tokenization of the newest exchange rather than of
+    the whole window. Exchanges pushed out of the window leave a short
+    line in a running summary ("Earlier the user asked about: ..."), itself
+    capped at ``summary_tokens``, so the model keeps a sense of older topics.
+    """
+    
+    # Older exchanges considered when a window is first built from a long history
+    SUMMARY_LOOKBACK = 8
+    
+    def __init__(self, max_tokens: int = 1500, max_exchanges: int = 20, summary_tokens: int = 150):
+        self.settings = (max_tokens, max_exchanges, summary_tokens)
+        self.max_tokens = max_tokens
+        self.max_exchanges = max_exchanges
+        self.summary_tokens = summary_tokens
+        self._reset()
+    
+    def _reset(self) -> None:
+        # (exchange_id, user message, assistant message, tokens)
+        self._entries = deque()
+        self._tokens = 0
+        self._last_id = 0
+        self._topics = deque()  # (topic, tokens) of exchanges that left the window
+        self._topic_tokens = 0
+        self._snapshot = None
+    
+    def sync(self, history: List[Dict]) -> None:
+        """Bring the window up to date with an id-ordered exchange history"""
+        if not history:
+            if self._entries or self._topics:
+                self._reset()
+            return
+        if history[-1]['exchange_id'] < self._last_id:
+            # History was cleared and renumbered since the last turn
+            self._reset()
+        
+        # Exchanges trimmed from the history leave the window too
+        first_id = history[0]['exchange_id']
+        while self._entries and self._entries[0][0] < first_id:
+            self._evict()
+        
+        # Walk back only as far as the newest exchange already in the window
+        limit = self.max_exchanges + self.SUMMARY_LOOKBACK
+        new_exchanges = []
+        for exchange in reversed(history):
+            if exchange['exchange_id'] <= self._last_id or len(new_exchanges) >= limit:
+                break
+            new_exchanges.append(exchange)
+        if not new_exchanges:
+            return
+        
+        for exchange in reversed(new_exchanges):
+            user = {'role': 'user', 'content': exchange['user_message']}
+            assistant = {'role': 'assistant', 'content': exchange['assistant_response']}
+            tokens = (estimate_tokens(exchange['user_message']) +
+                      estimate_tokens(exchange['assistant_response']) + 2 * MESSAGE_OVERHEAD_TOKENS)
+            self._entries.append((exchange['exchange_id'], user, assistant, tokens))
+            self._tokens += tokens
+            self._last_id = exchange['exchange_id']
+        
+        while self._entries and (len(self._entries) > self.max_exchanges or self._tokens > self.max_tokens):
+            self._evict()
+        self._snapshot = None
+    
+    def _evict(self) -> None:
+        """Move the oldest exchange out of the window and into the summary"""
+        _, user, _, tokens = self._entries.popleft()
+        self._tokens -= tokens
+        self._snapshot = None
+        if self.summary_tokens <= 0:
+            return
+        topic = _topic(user['content'])
+        topic_tokens = estimate_tokens(topic) + 1
+        self._topics.append((topic, topic_tokens))
+        self._topic_tokens += topic_tokens
+        while self._topics and self._topic_tokens > self.summary_tokens:
+            self._topic_tokens -= self._topics.popleft()[1]
+    
+    def snapshot(self) -> Dict:
+        """Messages to place between the system prompt and the new user message
+
+        Returns ``{'messages', 'tokens', 'fingerprint'}``; the fingerprint is a
+        hash of the messages, for keying anything that depends on the context.
+        The result is cached until the window changes.
+        """
+        if self._snapshot is None:
+            messages = []
+            tokens = self._tokens
+            if self._topics:
+                summary = "Earlier in this conversation the user asked about: " + \
+                          '; '.join(topic for topic, _ in self._topics)
+                messages.append({'role': 'system', 'content': summary})
+                tokens += self._topic_tokens + MESSAGE_OVERHEAD_TOKENS
+            for _, user, assistant, _ in self._entries:
+                messages.append(user)
+                messages.append(assistant)
+            fingerprint = hashlib.sha256(
+                json.dumps(messages, ensure_ascii=False).encode('utf-8')).hexdigest() if messages else ''
+            self._snapshot = {'messages': messages, 'tokens': tokens, 'fingerprint': fingerprint}
+        return self._snapshot
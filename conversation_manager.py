@@ -5,64 +5,236 @@ Manages conversation history and context
 """
 
 import json
-import os
+import threading
+from bisect import bisect_left, bisect_right
 from datetime import datetime
-from typing import List, Dict, Optional
+from functools import wraps
+from typing import Callable, Iterator, List, Dict, Optional
 import logging
 
+from context_builder import ContextWindow
+from conversation_stats import ConversationStats
+from history_export import iter_export
+from history_storage import HistoryStorage, JournalStorage
+from metrics import timed
+from search_index import InvertedIndex
+
 logger = logging.getLogger(__name__)
 
+# Rough per-exchange cost of the dict, its keys and the timestamp/id values
+EXCHANGE_OVERHEAD_BYTES = 400
+
+def estimate_exchange_size(exchange: Dict) -> int:
+    """Approximate in-memory footprint of one exchange in bytes"""
+    return (EXCHANGE_OVERHEAD_BYTES + len(exchange['user_message']) +
+            len(exchange['assistant_response']))
+
+def synchronized(method):
+    """Run a ConversationManager method under the instance lock"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class ConversationManager:
-    """Manages conversation history and context"""
+    """Manages conversation history and context
+
+    All public methods are serialized on a per-instance re-entrant lock, so
+    one manager (i.e. one session) can be shared by request threads.
+    """
     
-    def __init__(self, history_file: str = 'conversation_history.json'):
+    def __init__(self, history_file: str = 'conversation_history.json',
+                 storage: Optional[HistoryStorage] = None,
+                 max_history_length: int = 100,
+                 on_resize: Optional[Callable[[int], None]] = None):
         self.history_file = history_file
+        self.storage = storage or JournalStorage(history_file)
+        self.max_history_length = max_history_length  # Keeping last N exchanges
+        self.on_resize = on_resize  # Called with the byte delta whenever memory usage changes
+        self._lock = threading.RLock()
         self.conversation_history = self._load_history()
-        self.max_history_length = 100  # Keeping last 100 exchanges
+        self._memory_usage = sum(estimate_exchange_size(ex) for ex in self.conversation_history)
+        self._cleared_at = self._load_cleared_at()
+        self._next_exchange_id = self._initial_exchange_id()
+        self._index_dirty = False
+        self.search_index = self._load_search_index()
+        self.stats = ConversationStats()
+        for exchange in self.conversation_history:
+            self.stats.add(exchange)
+        self._context_window = None  # Built on the first get_context call
         
     def _load_history(self) -> List[Dict]:
-        """Load conversation history from file"""
+        """Load conversation history from the storage backend"""
         try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
+            history = self.storage.load()[-self.max_history_length:]
         except Exception as e:
             logger.error(f"Error loading history: {str(e)}")
             return []
+        
+        # Histories written before ids were monotonic repeat ids once trimmed
+        ids = [ex.get('exchange_id') for ex in history]
+        if len(set(ids)) != len(ids) or ids != sorted(ids):
+            logger.warning("Renumbering history with duplicate exchange ids")
+            for number, exchange in enumerate(history, start=1):
+                exchange['exchange_id'] = number
+        return history
+    
+    def _load_search_index(self) -> InvertedIndex:
+        """Load the persisted index and bring it in line with the loaded history"""
+        try:
+            data = self.storage.load_sidecar('index')
+            index = InvertedIndex.from_dict(data) if data else InvertedIndex()
+        except Exception as e:
+            logger.error(f"Error loading search index: {str(e)}")
+            index = InvertedIndex()
+        
+        # Exchanges appended after the index was last saved are only in the journal
+        live_ids = {ex['exchange_id'] for ex in self.conversation_history}
+        for doc_id in index.doc_ids():
+            if doc_id not in live_ids:
+                index.remove(doc_id)
+                self._index_dirty = True
+        for exchange in self.conversation_history:
+            if exchange['exchange_id'] not in index:
+                index.add(exchange['exchange_id'], exchange['user_message'],
+                          exchange['assistant_response'])
+                self._index_dirty = True
+        return index
+    
+    def _load_cleared_at(self) -> int:
+        """Id consumed by the last clear_history (0 if never cleared)"""
+        try:
+            data = self.storage.load_sidecar('ids')
+        except Exception as e:
+            logger.error(f"Error loading exchange ids: {str(e)}")
+            return 0
+        return data.get('cleared_at', 0) if data else 0
+    
+    def _initial_exchange_id(self) -> int:
+        """Continue numbering after the highest id already on record, clears included"""
+        highest = max((ex.get('exchange_id', 0) for ex in self.conversation_history), default=0)
+        return max(highest, self._cleared_at) + 1
     
     def _save_history(self) -> None:
-        """Save conversation history to file"""
+        """Rewrite the persisted history from the in-memory list"""
+        try:
+            self.storage.compact(self.conversation_history)
+        except Exception as e:
+            logger.error(f"Error saving history: {str(e)}")
+        self._save_search_index()
+    
+    def _save_search_index(self) -> None:
+        if not self._index_dirty:
+            return
+        try:
+            self.storage.save_sidecar('index', self.search_index.to_dict())
+            self._index_dirty = False
+        except Exception as e:
+            logger.error(f"Error saving search index: {str(e)}")
+    
+    def _persist_exchange(self, exchange: Dict) -> None:
+        """Append a single exchange to storage, compacting when it asks for it"""
         try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.conversation_history, f, indent=2, ensure_ascii=False)
+            self.storage.append(exchange)
         except Exception as e:
             logger.error(f"Error saving history: {str(e)}")
+            return
+        
+        if self.storage.needs_compaction():
+            self._save_history()
     
+    @timed('persist')
+    @synchronized
     def add_exchange(self, user_message: str, assistant_response: str) -> None:
         """Add a conversation exchange to history"""
         exchange = {
             'timestamp': datetime.now().isoformat(),
             'user_message': user_message,
             'assistant_response': assistant_response,
-            'exchange_id': len(self.conversation_history) + 1
+            'exchange_id': self._next_exchange_id
         }
+        self._next_exchange_id += 1
         
         self.conversation_history.append(exchange)
+        self.search_index.add(exchange['exchange_id'], user_message, assistant_response)
+        self._index_dirty = True
+        self.stats.add(exchange)
+        size_delta = estimate_exchange_size(exchange)
         
         # Trim history if it gets too long
         if len(self.conversation_history) > self.max_history_length:
+            dropped = self.conversation_history[:-self.max_history_length]
             self.conversation_history = self.conversation_history[-self.max_history_length:]
+            for old_exchange in dropped:
+                size_delta -= estimate_exchange_size(old_exchange)
+                self.search_index.remove(old_exchange['exchange_id'], old_exchange['user_message'],
+                                         old_exchange['assistant_response'])
+                self.stats.remove(old_exchange)
         
-        self._save_history()
+        self._resize(size_delta)
+        self._persist_exchange(exchange)
         logger.info(f"Added exchange {exchange['exchange_id']}")
     
+    def _resize(self, delta: int) -> None:
+        """Track approximate memory usage and notify the listener"""
+        if not delta:
+            return
+        self._memory_usage += delta
+        if self.on_resize:
+            self.on_resize(delta)
+    
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the in-memory history"""
+        return self._memory_usage
+    
+    @synchronized
     def get_history(self, limit: Optional[int] = None) -> List[Dict]:
         """Get conversation history"""
         if limit:
             return self.conversation_history[-limit:]
-        return self.conversation_history
+        return list(self.conversation_history)
+    
+    @synchronized
+    def get_page(self, before: Optional[int] = None, since: Optional[int] = None,
+                 limit: Optional[int] = None) -> Dict:
+        """One page of history, addressed by exchange_id cursors
+
+        With ``since``, the exchanges after that id, oldest first: the delta
+        for a client that already holds everything up to it. Otherwise the
+        newest ``limit`` exchanges, or the ``limit`` just older than ``before``.
+        Ids keep increasing across clears, and each clear consumes one, so
+        ``reset`` is set when ``since`` predates the last clear (or is an id
+        never handed out); the newest page is then returned instead.
+        ``version`` changes whenever the history does, for ETags.
+        """
+        history = self.conversation_history
+        latest_id = history[-1]['exchange_id'] if history else self._cleared_at
+        reset = since is not None and (since < self._cleared_at or since > latest_id)
+        
+        if since is not None and not reset:
+            start = bisect_right(history, since, key=lambda ex: ex['exchange_id'])
+            end = min(start + limit, len(history)) if limit else len(history)
+            has_more = end < len(history)
+        else:
+            end = len(history) if before is None else \
+                bisect_left(history, before, key=lambda ex: ex['exchange_id'])
+            start = max(end - limit, 0) if limit else 0
+            has_more = start > 0
+        
+        # Ids are never reused, so the first and last id and the length tell apart
+        # any two states; the clear marker separates an emptied history from a new one
+        version = f"{self._cleared_at}:" + (
+            f"{history[0]['exchange_id']}-{latest_id}-{len(history)}" if history else 'empty')
+        return {
+            'history': history[start:end],
+            'has_more': has_more,
+            'latest_id': latest_id,
+            'reset': reset,
+            'version': version
+        }
     
+    @synchronized
     def get_recent_context(self, num_exchanges: int = 3) -> str:
         """Get recent conversation context as a formatted string"""
         recent_history = self.conversation_history[-num_exchanges:] if self.conversation_history else []
@@ -78,18 +250,53 @@ class ConversationManager:
         
         return "\n".join(context_parts)
     
+    @synchronized
+    def get_context(self, max_tokens: int = 1500, max_exchanges: int = 20,
+                    summary_tokens: int = 150) -> Dict:
+        """Recent exchanges as chat messages within a token budget (see ContextWindow.snapshot)"""
+        window = self._context_window
+        if window is None or window.settings != (max_tokens, max_exchanges, summary_tokens):
+            window = self._context_window = ContextWindow(max_tokens, max_exchanges, summary_tokens)
+        window.sync(self.conversation_history)
+        return window.snapshot()
+    
+    def _find_exchange(self, exchange_id: int) -> Optional[Dict]:
+        """Binary search the (id-ordered) history for one exchange"""
+        position = bisect_left(self.conversation_history, exchange_id,
+                               key=lambda ex: ex['exchange_id'])
+        if (position < len(self.conversation_history) and
+                self.conversation_history[position]['exchange_id'] == exchange_id):
+            return self.conversation_history[position]
+        return None
+    
+    @synchronized
     def search_history(self, query: str) -> List[Dict]:
-        """Search conversation history for specific terms"""
-        query_lower = query.lower()
-        matching_exchanges = []
+        """Search conversation history for specific terms, best match first"""
+        _, hits = self.search_index.search(query)
+        exchanges = (self._find_exchange(exchange_id) for exchange_id, _ in hits)
+        return [exchange for exchange in exchanges if exchange]
+    
+    @synchronized
+    def search(self, query: str, page: int = 1, per_page: Optional[int] = 10) -> Dict:
+        """Ranked, paginated search; quoted text is matched as a phrase"""
+        offset = (page - 1) * per_page if per_page else 0
+        total, hits = self.search_index.search(query, offset=offset, limit=per_page)
         
-        for exchange in self.conversation_history:
-            if (query_lower in exchange['user_message'].lower() or 
-                query_lower in exchange['assistant_response'].lower()):
-                matching_exchanges.append(exchange)
+        results = []
+        for exchange_id, score in hits:
+            exchange = self._find_exchange(exchange_id)
+            if exchange:
+                results.append(dict(exchange, score=round(score, 4)))
         
-        return matching_exchanges
+        return {
+            'query': query,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'results': results
+        }
     
+    @synchronized
     def get_conversation_stats(self) -> Dict:
         """Get statistics about the conversation"""
         if not self.conversation_history:
@@ -101,69 +308,65 @@ class ConversationManager:
                 'avg_assistant_response_length': 0
             }
         
-        user_lengths = [len(ex['user_message']) for ex in self.conversation_history]
-        assistant_lengths = [len(ex['assistant_response']) for ex in self.conversation_history]
+        # Running aggregates are kept up to date by add_exchange and trimming
+        avg_user_length, avg_assistant_length = self.stats.averages()
         
         return {
-            'total_exchanges': len(self.conversation_history),
+            'total_exchanges': self.stats.total_exchanges,
             'first_interaction': self.conversation_history[0]['timestamp'],
             'last_interaction': self.conversation_history[-1]['timestamp'],
-            'avg_user_message_length': sum(user_lengths) / len(user_lengths),
-            'avg_assistant_response_length': sum(assistant_lengths) / len(assistant_lengths)
+            'avg_user_message_length': avg_user_length,
+            'avg_assistant_response_length': avg_assistant_length
         }
     
+    @synchronized
     def clear_history(self) -> None:
         """Clear all conversation history"""
         self.conversation_history = []
-        if os.path.exists(self.history_file):
-            os.remove(self.history_file)
+        self.search_index.clear()
+        self.stats.clear()
+        self._context_window = None
+        # Ids are not reused: the clear takes one of its own, so clients can tell
+        # a cursor from before it (see get_page)
+        self._cleared_at = self._next_exchange_id
+        self._next_exchange_id += 1
+        self._resize(-self._memory_usage)
+        try:
+            self.storage.clear()
+            self.storage.save_sidecar('ids', {'cleared_at': self._cleared_at})
+        except Exception as e:
+            logger.error(f"Error clearing history: {str(e)}")
         logger.info("Conversation history cleared")
     
+    @synchronized
+    def close(self) -> None:
+        """Flush pending writes and release the storage backend"""
+        self._save_search_index()
+        self.storage.close()
+    
+    def iter_history(self, batch_size: int = 500) -> Iterator[Dict]:
+        """Yield exchanges oldest first, holding the lock for one batch at a time
+
+        Exchanges added while iterating are included; a concurrent clear ends
+        the iteration. Safe to advance from different threads.
+        """
+        last_id = 0
+        while True:
+            with self._lock:
+                start = bisect_right(self.conversation_history, last_id, key=lambda ex: ex['exchange_id'])
+                batch = self.conversation_history[start:start + batch_size]
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            last_id = batch[-1]['exchange_id']
+    
+    @synchronized
     def export_history(self, format_type: str = 'json') -> str:
-        """Export conversation history in different formats"""
-        if format_type.lower() == 'json':
-            return json.dumps(self.conversation_history, indent=2, ensure_ascii=False)
-        
-        elif format_type.lower() == 'txt':
-            lines = []
-            for exchange in self.conversation_history:
-                lines.append(f"[{exchange['timestamp']}]")
-                lines.append(f"User: {exchange['user_message']}")
-                lines.append(f"Assistant: {exchange['assistant_response']}")
-                lines.append("-" * 50)
-            return "\n".join(lines)
-        
-        elif format_type.lower() == 'markdown':
-            lines = ["# Conversation History", ""]
-            for exchange in self.conversation_history:
-                lines.append(f"## Exchange {exchange['exchange_id']}")
-                lines.append(f"*{exchange['timestamp']}*")
-                lines.append("")
-                lines.append(f"**User:** {exchange['user_message']}")
-                lines.append("")
-                lines.append(f"**Assistant:** {exchange['assistant_response']}")
-                lines.append("")
-                lines.append("---")
-                lines.append("")
-            return "\n".join(lines)
-        
-        else:
-            raise ValueError(f"Unsupported format: {format_type}")
+        """Export conversation history in different formats (see history_export for streaming)"""
+        return ''.join(iter_export(self.iter_history(), format_type))
     
+    @synchronized
     def get_frequent_topics(self, top_n: int = 5) -> List[Dict]:
         """Analyze conversation for frequent topics (basic keyword analysis)"""
-        # Simple keyword extraction from user messages
-        word_counts = {}
-        
-        for exchange in self.conversation_history:
-            words = exchange['user_message'].lower().split()
-            # Filter out common words
-            filtered_words = [word for word in words if len(word) > 3 and 
-                            word not in ['what', 'how', 'when', 'where', 'why', 'that', 'this', 'with', 'from']]
-            
-            for word in filtered_words:
-                word_counts[word] = word_counts.get(word, 0) + 1
-        
-        # Sort by frequency and return top N
-        sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
-        return [{'word': word, 'count': count} for word, count in sorted_words[:top_n]]
\ No newline at end of file
+        # Counts are updated on every exchange and trim, so nothing is rescanned here
+        return self.stats.frequent_topics(top_n)
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Conversation Stats Module
+Running aggregates and topic counts maintained per exchange
+"""
+
+from collections import Counter
+from typing import List, Dict, Tuple
+
+# Common words that say nothing about the topic of a message
+STOP_WORDS = {'what', 'how', 'when', 'where', 'why', 'that', 'this', 'with', 'from'}
+
+def topic_words(message: str) -> List[str]:
+    """Keywords of a user message (basic keyword analysis)"""
+    return [word for word in message.lower().split()
+            if len(word) > 3 and word not in STOP_WORDS]
+
+class ConversationStats:
+    """O(1)-per-exchange running aggregates over the retained history
+
+    Topic counts are exact: the history is bounded by max_history_length, so
+    a plain counter of its words stays small, and trimming an exchange
+    takes its words back out.
+    """
+    
+    def __init__(self):
+        self.topics = Counter()
+        self.clear()
+    
+    def clear(self) -> None:
+        self.total_exchanges = 0
+        self.total_user_length = 0
+        self.total_assistant_length = 0
+        self.topics.clear()
+    
+    def add(self, exchange: Dict) -> None:
+        self.total_exchanges += 1
+        self.total_user_length += len(exchange['user_message'])
+        self.total_assistant_length += len(exchange['assistant_response'])
+        self.topics.update(topic_words(exchange['user_message']))
+    
+    def remove(self, exchange: Dict) -> None:
+        self.total_exchanges -= 1
+        self.total_user_length -= len(exchange['user_message'])
+        self.total_assistant_length -= len(exchange['assistant_response'])
+        for word in topic_words(exchange['user_message']):
+            remaining = self.topics[word] - 1
+            if remaining > 0:
+                self.topics[word] = remaining
+            else:
+                del self.topics[word]
+    
+    def averages(self) -> Tuple[float, float]:
+        """Average user message and assistant response lengths"""
+        if not self.total_exchanges:
+            return 0, 0
+        return (self.total_user_length / self.total_exchanges,
+                self.total_assistant_length / self.total_exchanges)
+    
+    def frequent_topics(self, top_n: int) -> List[Dict]:
+        return [{'word': word, 'count': count} for word, count in self.topics.most_common(top_n)]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+History Export Module
+Streams conversation history as JSON, JSON lines, CSV, plain text or Markdown, optionally gzipped
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Dict, Iterable, Iterator
+import logging
+
+logger = logging.getLogger(__name__)
+
+# format -> (Content-Type, file extension)
+EXPORT_FORMATS = {
+    'json': ('application/json', 'json'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'txt': ('text/plain; charset=utf-8', 'txt'),
+    'markdown': ('text/markdown; charset=utf-8', 'md')
+}
+
+CSV_FIELDS = ('exchange_id', 'timestamp', 'user_message', 'assistant_response')
+
+# Pieces are joined into chunks of about this many characters before being sent
+CHUNK_SIZE = 64 * 1024
+
+def _json_pieces(exchanges: Iterable[Dict]) -> Iterator[str]:
+    # Same text as json.dumps(history, indent=2), one element at a time
+    first = True
+    for exchange in exchanges:
+        element = json.dumps(exchange, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+        yield ('[\n  ' if first else ',\n  ') + element
+        first = False
+    yield '[]' if first else '\n]'
+
+def _jsonl_pieces(exchanges: Iterable[Dict]) -> Iterator[str]:
+    for exchange in exchanges:
+        yield json.dumps(exchange, ensure_ascii=False) + '\n'
+
+def _csv_pieces(exchanges: Iterable[Dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for exchange in exchanges:
+        writer.writerow([exchange.get(field, '') for field in CSV_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()  # Just the header if there were no exchanges
+
+def _txt_pieces(exchanges: Iterable[Dict]) -> Iterator[str]:
+    first = True
+    for exchange in exchanges:
+        yield ('' if first else '\n') + '\n'.join([
+            f"[{exchange['timestamp']}]",
+            f"User: {exchange['user_message']}",
+            f"Assistant: {exchange['assistant_response']}",
+            "-" * 50
+        ])
+        first = False
+
+def _markdown_pieces(exchanges: Iterable[Dict]) -> Iterator[str]:
+    yield "# Conversation History\n"
+    for exchange in exchanges:
+        yield (f"\n## Exchange {exchange['exchange_id']}\n"
+               f"*{exchange['timestamp']}*\n\n"
+               f"**User:** {exchange['user_message']}\n\n"
+               f"**Assistant:** {exchange['assistant_response']}\n\n"
+               "---\n")
+
+_FORMATTERS = {
+    'json': _json_pieces,
+    'jsonl': _jsonl_pieces,
+    'csv': _csv_pieces,
+    'txt': _txt_pieces,
+    'markdown': _markdown_pieces
+}
+
+def iter_export(exchanges: Iterable[Dict], format_type: str = 'json',
+                chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Export text in chunks of about ``chunk_size`` characters, consuming ``exchanges`` lazily"""
+    formatter = _FORMATTERS.get(format_type.lower())
+    if formatter is None:
+        raise ValueError(f"Unsupported format: {format_type}")
+    
+    pieces = []
+    size = 0
+    for piece in formatter(exchanges):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(pieces)
+            pieces = []
+            size = 0
+    if pieces:
+        yield ''.join(pieces)
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """UTF-8 encode and gzip a chunk stream as it is produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 16+15: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
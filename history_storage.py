@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+History Storage Module
+Pluggable persistence backends for conversation history
+"""
+
+import json
+import os
+import time
+from typing import List, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HistoryStorage:
+    """Base interface for conversation history persistence backends"""
+    
+    def load(self) -> List[Dict]:
+        """Load every persisted exchange, oldest first"""
+        raise NotImplementedError
+    
+    def append(self, exchange: Dict) -> None:
+        """Persist a single new exchange"""
+        raise NotImplementedError
+    
+    def needs_compaction(self) -> bool:
+        """Whether the manager should call compact() after the last append"""
+        return False
+    
+    def compact(self, history: List[Dict]) -> None:
+        """Replace the persisted state with the given (already trimmed) history"""
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        """Remove all persisted history"""
+        raise NotImplementedError
+    
+    def save_sidecar(self, name: str, data: Dict) -> None:
+        """Persist auxiliary data (e.g. a search index) next to the history"""
+    
+    def load_sidecar(self, name: str) -> Optional[Dict]:
+        """Load auxiliary data saved with save_sidecar, or None"""
+        return None
+    
+    def flush(self) -> None:
+        """Force buffered writes to stable storage"""
+    
+    def close(self) -> None:
+        """Flush and release any open resources"""
+        self.flush()
+
+
+class FileSidecarMixin:
+    """Stores sidecars as JSON files named after the history file"""
+    
+    path: str
+    
+    def _sidecar_path(self, name: str) -> str:
+        # Remember every name touched so clear() can remove them without
+        # listing a possibly huge sessions directory
+        if not hasattr(self, '_sidecar_names'):
+            self._sidecar_names = set()
+        self._sidecar_names.add(name)
+        return f"{os.path.splitext(self.path)[0]}.{name}.json"
+    
+    def save_sidecar(self, name: str, data: Dict) -> None:
+        sidecar_path = self._sidecar_path(name)
+        tmp_path = sidecar_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, sidecar_path)
+    
+    def load_sidecar(self, name: str) -> Optional[Dict]:
+        sidecar_path = self._sidecar_path(name)
+        if not os.path.exists(sidecar_path):
+            return None
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _remove_sidecars(self) -> None:
+        for name in list(getattr(self, '_sidecar_names', ())):
+            sidecar_path = self._sidecar_path(name)
+            if os.path.exists(sidecar_path):
+                os.remove(sidecar_path)
+
+
+class JsonFileStorage(FileSidecarMixin, HistoryStorage):
+    """Legacy backend that rewrites the whole JSON file on every change"""
+    
+    def __init__(self, path: str):
+        self.path = path
+    
+    def load(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def append(self, exchange: Dict) -> None:
+        # Nothing to do here: every append is followed by a full rewrite
+        pass
+    
+    def needs_compaction(self) -> bool:
+        return True
+    
+    def compact(self, history: List[Dict]) -> None:
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+    
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._remove_sidecars()
+
+
+class JournalStorage(FileSidecarMixin, HistoryStorage):
+    """Append-only JSON-lines journal on top of a periodically compacted snapshot
+
+    Each exchange is written as one JSON line to the journal, so the cost of a
+    chat turn does not depend on how much history exists. Every
+    ``compact_every`` appends the manager folds the journal into the snapshot
+    file (same format as the legacy ``conversation_history.json``), which is
+    replaced atomically. fsync is batched: the journal is flushed to the OS on
+    every append but only fsynced every ``fsync_every`` records or
+    ``fsync_interval`` seconds, whichever comes first.
+    """
+    
+    def __init__(self, path: str, journal_path: Optional[str] = None,
+                 compact_every: int = 500, fsync_every: int = 32,
+                 fsync_interval: float = 1.0):
+        self.path = path
+        self.journal_path = journal_path or os.path.splitext(path)[0] + '.journal.jsonl'
+        self.compact_every = compact_every
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        
+        self._journal = None
+        self._journal_records = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def load(self) -> List[Dict]:
+        """Load the snapshot and replay the journal, repairing a torn tail"""
+        history = []
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        
+        # A leftover temp file means a compaction died before the atomic
+        # replace; the old snapshot plus the journal is still authoritative.
+        tmp_path = self.path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        
+        replayed = self._replay_journal(history)
+        if replayed:
+            logger.info(f"Replayed {replayed} exchanges from {self.journal_path}")
+        return history
+    
+    def _replay_journal(self, history: List[Dict]) -> int:
+        """Append journal records to history; returns the number replayed"""
+        self._journal_records = 0
+        if not os.path.exists(self.journal_path):
+            return 0
+        
+        # Records already in the snapshot come from a compaction that was
+        # interrupted between replacing the snapshot and truncating the journal.
+        in_snapshot = {self._record_key(ex) for ex in history}
+        replayed = 0
+        good_offset = 0
+        
+        with open(self.journal_path, 'rb') as f:
+            for raw_line in f:
+                if not raw_line.endswith(b'\n'):
+                    logger.warning("Discarding incomplete trailing journal record")
+                    break
+                try:
+                    exchange = json.loads(raw_line.decode('utf-8'))
+                except (ValueError, UnicodeDecodeError):
+                    logger.warning("Discarding corrupt journal record and everything after it")
+                    break
+                
+                good_offset += len(raw_line)
+                self._journal_records += 1
+                if self._record_key(exchange) in in_snapshot:
+                    continue
+                history.append(exchange)
+                replayed += 1
+        
+        if good_offset < os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_offset)
+        
+        return replayed
+    
+    @staticmethod
+    def _record_key(exchange: Dict) -> tuple:
+        return (exchange.get('timestamp'), exchange.get('exchange_id'))
+    
+    def _open_journal(self):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        return self._journal
+    
+    def append(self, exchange: Dict) -> None:
+        """Append one exchange as a single JSON line"""
+        journal = self._open_journal()
+        journal.write(json.dumps(exchange, ensure_ascii=False) + '\n')
+        journal.flush()
+        
+        self._journal_records += 1
+        self._unsynced += 1
+        if (self._unsynced >= self.fsync_every or
+                time.monotonic() - self._last_sync >= self.fsync_interval):
+            self._sync()
+    
+    def _sync(self) -> None:
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def needs_compaction(self) -> bool:
+        return self._journal_records >= self.compact_every
+    
+    def compact(self, history: List[Dict]) -> None:
+        """Write history as the new snapshot and start an empty journal"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        
+        # Only drop the journal once the snapshot that covers it is durable
+        self._close_journal()
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_records = 0
+        logger.info(f"Compacted history journal into {self.path}")
+    
+    def clear(self) -> None:
+        self._close_journal()
+        for path in (self.path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._remove_sidecars()
+        self._journal_records = 0
+    
+    def flush(self) -> None:
+        if self._journal is not None:
+            self._journal.flush()
+            self._sync()
+    
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            self.flush()
+            self._journal.close()
+            self._journal = None
+    
+    def close(self) -> None:
+        self._close_journal()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Intent Matcher Module
+Routes a message to an intent in one pass over its text with an Aho-Corasick automaton
+"""
+
+import json
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of text; punctuation and spacing only separate words"""
+    return _WORD_PATTERN.findall(text.lower())
+
+class IntentMatcher:
+    """Finds the highest-priority intent with a phrase occurring in a message
+
+    Intents are given in priority order, each with its trigger phrases.
+    Phrases match case-insensitively and as whole words, so "hi" matches
+    "hi there" but not "this". All phrases are compiled into one
+    Aho-Corasick automaton over words, so matching costs one scan of the
+    message no matter how many intents or phrases there are.
+    """
+    
+    def __init__(self, intents: List[Tuple[str, List[str]]]):
+        self.intents = [name for name, _ in intents]
+        # Trie transitions on words, failure links, and the best (lowest)
+        # priority of any phrase ending at each state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[int]] = [None]
+        
+        for priority, (_, phrases) in enumerate(intents):
+            for phrase in phrases:
+                words = tokenize(phrase)
+                if words:
+                    self._add(words, priority)
+        self._link()
+    
+    def _add(self, words: List[str], priority: int) -> None:
+        state = 0
+        for word in words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][word] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+            state = next_state
+        if self._output[state] is None or priority < self._output[state]:
+            self._output[state] = priority
+    
+    def _link(self) -> None:
+        """Breadth-first pass setting failure links and inheriting their matches"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                inherited = self._output[self._fail[child]]
+                if inherited is not None and (self._output[child] is None or inherited < self._output[child]):
+                    self._output[child] = inherited
+    
+    def match(self, message: str) -> Optional[str]:
+        """Name of the first intent (in priority order) with a phrase in message, or None"""
+        goto, fail, output = self._goto, self._fail, self._output
+        best = None
+        state = 0
+        for word in tokenize(message):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            found = output[state]
+            if found is not None and (best is None or found < best):
+                if found == 0:
+                    return self.intents[0]
+                best = found
+        return self.intents[best] if best is not None else None
+
+def load_intents(path: str) -> Dict[str, List[Dict]]:
+    """Read an intent table: groups of ``{"intent", "phrases", optional "response"}`` entries"""
+    with open(path, 'r', encoding='utf-8') as f:
+        groups = json.load(f)
+    for group, entries in groups.items():
+        for entry in entries:
+            if not entry.get('intent') or not isinstance(entry.get('phrases'), list):
+                raise ValueError(f"Intent in group '{group}' of {path} needs an 'intent' name and a 'phrases' list")
+    return groups
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+LLM Client Module
+Pooled, keep-alive HTTP client for OpenAI-compatible chat completion APIs
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, Optional
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://openrouter.ai/api/v1'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def api_headers(api_key: str) -> Dict[str, str]:
+    """Headers sent with every completion request"""
+    return {
+        'Authorization': f'Bearer {api_key}',
+        'Content-Type': 'application/json',
+        'HTTP-Referer': 'https://github.com/your-repo',
+        'X-Title': 'AI Voice Bot'
+    }
+
+def backoff_delay(attempt: int, retry_after: Optional[str], backoff_base: float, backoff_max: float) -> float:
+    """Full-jitter exponential backoff, honouring a numeric Retry-After"""
+    if retry_after:
+        try:
+            return min(float(retry_after), backoff_max)
+        except ValueError:
+            pass
+    return random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+
+def connect_failed(error: requests.RequestException) -> bool:
+    """True when the request never reached the server, so resending it can't bill twice"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError):
+        return False
+    # requests wraps urllib3's MaxRetryError; a dropped or reset connection is not retried
+    reason = error.args[0] if error.args else None
+    return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
+class LLMAPIError(Exception):
+    """Raised when the completion API returns an error or is unreachable"""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class LatencyTracker:
+    """Request counters plus a rolling window of latencies"""
+    
+    def __init__(self, window: int = 1000):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+    
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(seconds)
+    
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'requests': self.requests,
+                'retries': self.retries,
+                'failures': self.failures
+            }
+        if latencies:
+            stats.update({
+                'latency_avg_ms': round(1000 * sum(latencies) / len(latencies), 2),
+                'latency_p50_ms': round(1000 * latencies[len(latencies) // 2], 2),
+                'latency_p95_ms': round(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                'latency_max_ms': round(1000 * latencies[-1], 2)
+            })
+        return stats
+
+class OpenRouterClient:
+    """Shared requests.Session with connection pooling and jittered retries
+
+    One client is meant to live for the whole worker process so TCP/TLS
+    connections are reused across turns. ``OPENROUTER_BASE_URL`` points it at
+    any OpenAI-compatible server (e.g. benchmarks/fake_openrouter.py).
+    """
+    
+    def __init__(self, api_key: str, base_url: Optional[str] = None,
+                 pool_size: Optional[int] = None, max_retries: Optional[int] = None,
+                 timeout: float = 30, backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.base_url = (base_url or os.getenv('OPENROUTER_BASE_URL', DEFAULT_BASE_URL)).rstrip('/')
+        self.completions_url = f"{self.base_url}/chat/completions"
+        self.timeout = timeout
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 2))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = LatencyTracker()
+        
+        pool_size = pool_size or int(os.getenv('LLM_POOL_SIZE', 10))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Built once; requests merges these into every call
+        self.session.headers.update(api_headers(api_key))
+    
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        return backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_max)
+    
+    def _post(self, payload: Dict, stream: bool = False) -> requests.Response:
+        """POST with retries; returns the first successful response"""
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.completions_url, json=payload,
+                                             timeout=self.timeout, stream=stream)
+            except requests.RequestException as e:
+                self.metrics.record(time.perf_counter() - started)
+                # A read timeout may mean the completion is already running upstream
+                if connect_failed(e) and attempt < self.max_retries:
+                    self.metrics.record_retry()
+                    time.sleep(self._backoff(attempt, None))
+                    continue
+                self.metrics.record_failure()
+                raise LLMAPIError(f"API call failed: {str(e)}") from e
+            
+            # For streamed calls this is the time to the response headers
+            self.metrics.record(time.perf_counter() - started)
+            if response.status_code == 200:
+                return response
+            
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self.metrics.record_retry()
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                logger.warning(f"API returned {response.status_code}, retrying in {delay:.2f}s")
+                response.close()
+                time.sleep(delay)
+                continue
+            
+            self.metrics.record_failure()
+            raise LLMAPIError(f"API call failed: {response.status_code} - {response.text}",
+                              status_code=response.status_code)
+    
+    def chat_completion(self, payload: Dict) -> Dict:
+        """POST a chat completion request and return the decoded JSON body"""
+        return self._post(payload).json()
+    
+    def stream_chat_completion(self, payload: Dict) -> Iterator[str]:
+        """POST a ``stream: true`` request and yield content deltas as they arrive
+
+        Retries only happen before the first byte; once tokens have been
+        yielded a failure is raised to the caller.
+        """
+        response = self._post(dict(payload, stream=True), stream=True)
+        try:
+            # SSE is UTF-8 by spec, but requests would guess ISO-8859-1 for a
+            # text/event-stream without a charset, so decode the raw lines here
+            for raw_line in response.iter_lines():
+                line = raw_line.decode('utf-8')
+                # Blank lines separate events, ':' lines are keep-alive comments
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                if 'error' in chunk:
+                    raise LLMAPIError(f"API stream failed: {chunk['error']}")
+                choices = chunk.get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content')
+                if content:
+                    yield content
+        except requests.RequestException as e:
+            raise LLMAPIError(f"API stream interrupted: {str(e)}") from e
+        finally:
+            response.close()
+    
+    def get_stats(self) -> Dict:
+        return self.metrics.snapshot()
+    
+    def close(self) -> None:
+        self.session.close()
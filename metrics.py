@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Metrics Module
+Stage timings, counters and histograms in the Prometheus text format, plus Server-Timing support
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans a cached TTS clip (sub-millisecond) up to a slow LLM reply
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per label combination"""
+    
+    kind = 'counter'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values]
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label combination"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # label values -> [per-bucket counts, sum, count]
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ('le',), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+# (name, help, type, [(labels dict, value), ...]) produced at scrape time
+GaugeFamily = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+class MetricsRegistry:
+    """Named metrics plus collectors that report current values when scraped"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[GaugeFamily]]] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing  # Modules reloaded in one process share the same series
+            self._metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def set_collector(self, name: str, collector: Callable[[], Iterable[GaugeFamily]]) -> None:
+        """Register (or replace) a named collector; the latest app instance built wins"""
+        with self._lock:
+            self._collectors[name] = collector
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector error: {str(e)}")
+                continue
+            for name, documentation, kind, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} "
+                                 f"{_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'voicebot_stage_seconds', 'Time spent in each stage of a chat or voice turn', ['stage'])
+STAGE_ERRORS = REGISTRY.counter(
+    'voicebot_stage_errors_total', 'Errors raised or handled in each stage, by exception type', ['stage', 'error'])
+CHAT_REPLIES = REGISTRY.counter(
+    'voicebot_chat_replies_total', 'Chat replies by the path that produced them', ['path'])
+TTS_REQUESTS = REGISTRY.counter(
+    'voicebot_tts_requests_total', 'Speech synthesis requests by where the audio came from', ['source'])
+HTTP_REQUESTS = REGISTRY.counter(
+    'voicebot_http_requests_total', 'HTTP requests by route and status', ['method', 'route', 'status'])
+HTTP_SECONDS = REGISTRY.histogram(
+    'voicebot_http_request_seconds', 'Time to produce the response (to the first byte for streams)', ['route'])
+
+# Stage timings of the request being handled, for the Server-Timing header
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('request_timings', default=None)
+
+def start_request_timing() -> List[Tuple[str, float]]:
+    """Begin collecting stage timings for the current request (thread or task)"""
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+def record_error(stage: str, error: BaseException) -> None:
+    """Count an exception that was handled (logged and recovered from) in a stage"""
+    STAGE_ERRORS.inc(stage=stage, error=type(error).__name__)
+
+@contextmanager
+def span(stage: str):
+    """Time a block as one stage; exceptions escaping it are counted as errors"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_error(stage, e)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def timed(stage: str):
+    """Decorator form of span"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """Server-Timing value with each stage's summed duration in milliseconds"""
+    durations: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        durations[stage] = durations.get(stage, 0.0) + elapsed
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in durations.items())
+
+def stats_families(name: str, documentation: str, stats: Dict,
+                   counters: Sequence[str] = ()) -> Iterator[GaugeFamily]:
+    """Collector families from a get_stats() dict: one sample per numeric field, labelled by field
+
+    Fields named in ``counters`` only ever grow, so they go to a counter
+    family ``<name>_total``; the rest (sizes, occupancy, rates) to a gauge
+    family ``<name>``.
+    """
+    gauges = []
+    totals = []
+    for field, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            (totals if field in counters else gauges).append(({'field': field}, value))
+    if gauges:
+        yield name, documentation, 'gauge', gauges
+    if totals:
+        yield f"{name}_total", documentation, 'counter', totals
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Response Cache Module
+LRU/TTL cache of LLM replies with an exact tier and a MinHash similarity tier
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Words in any script, keeping inner apostrophes as in "what's"
+_TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)*")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+def normalize_message(text: str) -> str:
+    """Casefold, drop punctuation and collapse whitespace, so trivially different messages share a key"""
+    return ' '.join(_TOKEN_PATTERN.findall(text.casefold()))
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+class MinHasher:
+    """MinHash signatures over the words and word pairs of a normalized message
+
+    The share of equal positions in two signatures estimates the Jaccard
+    similarity of their shingle sets. Word pairs are included so that
+    reordered or partly different questions score lower than rephrasings.
+    """
+    
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        self.num_perm = num_perm
+        # Universal hash family h(x) = (a * x + b) mod p, derived deterministically from seed
+        self._params = [
+            (_hash64(f"a:{seed}:{i}") % (_MERSENNE_PRIME - 1) + 1, _hash64(f"b:{seed}:{i}") % _MERSENNE_PRIME)
+            for i in range(num_perm)
+        ]
+    
+    @staticmethod
+    def shingles(normalized: str) -> set:
+        words = normalized.split()
+        return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    
+    def signature(self, normalized: str) -> Tuple[int, ...]:
+        hashes = [_hash64(shingle) for shingle in self.shingles(normalized)]
+        return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._params)
+    
+    @staticmethod
+    def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+class _Entry:
+    __slots__ = ('response', 'expires_at', 'signature')
+    
+    def __init__(self, response: str, expires_at: float, signature: Optional[Tuple[int, ...]]):
+        self.response = response
+        self.expires_at = expires_at
+        self.signature = signature
+
+class ResponseCache:
+    """Replies keyed by normalized message text, bounded by entry count and age
+
+    ``get`` first tries the exact normalized text, then, when
+    ``similarity_threshold`` is set, messages whose MinHash similarity
+    reaches it. Similar candidates are found through LSH buckets (bands of
+    the signature), so a lookup never scans the whole cache. Messages shorter
+    than ``min_similarity_words`` only ever match exactly, since a word or two
+    carries too little signal to tell questions apart.
+
+    ``namespace`` separates replies produced under different settings
+    (model, system prompt, conversation context); entries only match within
+    their own namespace.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600,
+                 similarity_threshold: Optional[float] = None, num_perm: int = 64, bands: int = 8,
+                 min_similarity_words: int = 4):
+        if similarity_threshold and num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold or None
+        self.min_similarity_words = min_similarity_words
+        self.bands = bands
+        self._rows = num_perm // bands
+        self._hasher = MinHasher(num_perm) if self.similarity_threshold else None
+        
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._buckets: Dict[tuple, set] = {}
+        self._lock = threading.Lock()
+        self._stats = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0, 'stores': 0,
+                       'evictions': 0, 'expirations': 0}
+    
+    def _band_keys(self, namespace: str, signature: Tuple[int, ...]) -> List[tuple]:
+        rows = self._rows
+        return [(namespace, band, signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+    
+    def _signature(self, normalized: str) -> Optional[Tuple[int, ...]]:
+        if self._hasher is None or len(normalized.split()) < self.min_similarity_words:
+            return None
+        return self._hasher.signature(normalized)
+    
+    def _remove(self, key: Tuple[str, str]) -> None:
+        """Drop an entry and its LSH bucket memberships (lock held)"""
+        entry = self._entries.pop(key)
+        if entry.signature is not None:
+            for band_key in self._band_keys(key[0], entry.signature):
+                members = self._buckets.get(band_key)
+                if members is not None:
+                    members.discard(key)
+                    if not members:
+                        del self._buckets[band_key]
+    
+    def _live(self, key: Tuple[str, str], now: float) -> Optional[_Entry]:
+        """Entry for key if present and fresh; expired entries are dropped (lock held)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            self._stats['expirations'] += 1
+            return None
+        return entry
+    
+    def get(self, message: str, namespace: str = '') -> Optional[str]:
+        """Cached reply for message (or a close enough one), or None"""
+        if self.max_entries <= 0:
+            return None
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+        key = (namespace, normalized)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['exact_hits'] += 1
+                return entry.response
+        
+        # Only exact misses pay for hashing, which is done outside the lock
+        signature = self._signature(normalized)
+        with self._lock:
+            if signature is not None:
+                candidates = set()
+                for band_key in self._band_keys(namespace, signature):
+                    candidates |= self._buckets.get(band_key, set())
+                best_key, best_score = None, self.similarity_threshold
+                for candidate in candidates:
+                    candidate_entry = self._live(candidate, now)
+                    if candidate_entry is None:
+                        continue
+                    score = MinHasher.similarity(signature, candidate_entry.signature)
+                    if score >= best_score:
+                        best_key, best_score = candidate, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self._stats['similar_hits'] += 1
+                    logger.debug(f"Similar cached reply (score {best_score:.2f}) for: {normalized}")
+                    return self._entries[best_key].response
+            
+            self._stats['misses'] += 1
+            return None
+    
+    def put(self, message: str, response: str, namespace: str = '') -> None:
+        if self.max_entries <= 0 or not response:
+            return
+        normalized = normalize_message(message)
+        if not normalized:
+            return
+        key = (namespace, normalized)
+        signature = self._signature(normalized)
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(response, time.monotonic() + self.ttl, signature)
+            if signature is not None:
+                for band_key in self._band_keys(namespace, signature):
+                    self._buckets.setdefault(band_key, set()).add(key)
+            self._stats['stores'] += 1
+            
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats['exact_hits'] + stats['similar_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['exact_hits'] + stats['similar_hits']) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Search Index Module
+Incrementally maintained inverted index over conversation exchanges
+"""
+
+import heapq
+import math
+import re
+from typing import List, Dict, Tuple, Optional
+
+TOKEN_PATTERN = re.compile(r"\w+")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, in order"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def parse_query(query: str) -> List[List[str]]:
+    """Split a query into phrases; quoted text and hyphenated words become multi-token phrases"""
+    phrases = []
+    for quoted, bare in QUERY_PATTERN.findall(query):
+        tokens = tokenize(quoted or bare)
+        if tokens:
+            phrases.append(tokens)
+    return phrases
+
+class InvertedIndex:
+    """Positional inverted index keyed by exchange id
+
+    Both the user message and the assistant response of an exchange are
+    indexed as one document. The response's positions start one past the end
+    of the message's, so a phrase can never match across the two fields.
+    All query phrases must match (AND semantics) and hits are ranked with BM25.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, List[int]]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._total_length = 0
+    
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+    
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._doc_lengths
+    
+    def doc_ids(self) -> List[int]:
+        return list(self._doc_lengths)
+    
+    def add(self, doc_id: int, user_message: str, assistant_response: str) -> None:
+        """Index one exchange"""
+        if doc_id in self._doc_lengths:
+            self.remove(doc_id)
+        
+        user_tokens = tokenize(user_message)
+        response_tokens = tokenize(assistant_response)
+        offset = len(user_tokens) + 1
+        
+        positions: Dict[str, List[int]] = {}
+        for position, token in enumerate(user_tokens):
+            positions.setdefault(token, []).append(position)
+        for position, token in enumerate(response_tokens, start=offset):
+            positions.setdefault(token, []).append(position)
+        
+        for token, token_positions in positions.items():
+            self._postings.setdefault(token, {})[doc_id] = token_positions
+        
+        length = len(user_tokens) + len(response_tokens)
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+    
+    def remove(self, doc_id: int, user_message: Optional[str] = None,
+               assistant_response: Optional[str] = None) -> None:
+        """Drop one exchange; passing its text avoids scanning the whole vocabulary"""
+        length = self._doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        
+        if user_message is not None and assistant_response is not None:
+            tokens = set(tokenize(user_message)) | set(tokenize(assistant_response))
+        else:
+            tokens = list(self._postings)
+        
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings and postings.pop(doc_id, None) is not None and not postings:
+                del self._postings[token]
+    
+    def clear(self) -> None:
+        self._postings.clear()
+        self._doc_lengths.clear()
+        self._total_length = 0
+    
+    def _phrase_docs(self, phrase: List[str], candidates: Optional[set]) -> set:
+        """Documents containing the tokens of phrase at consecutive positions"""
+        postings = [self._postings.get(token) for token in phrase]
+        if not all(postings):
+            return set()
+        
+        # Start from the rarest token to keep the candidate set small
+        docs = set(min(postings, key=len))
+        if candidates is not None:
+            docs &= candidates
+        for token_postings in postings:
+            docs.intersection_update(token_postings)
+            if not docs:
+                return docs
+        if len(phrase) == 1:
+            return docs
+        
+        matches = set()
+        for doc_id in docs:
+            later = [set(token_postings[doc_id]) for token_postings in postings[1:]]
+            for start in postings[0][doc_id]:
+                if all(start + i in positions for i, positions in enumerate(later, start=1)):
+                    matches.add(doc_id)
+                    break
+        return matches
+    
+    def _score(self, doc_id: int, tokens: List[str]) -> float:
+        total_docs = len(self._doc_lengths)
+        avg_length = self._total_length / total_docs if total_docs else 0
+        length_norm = 1 - B + B * (self._doc_lengths[doc_id] / avg_length if avg_length else 0)
+        
+        score = 0.0
+        for token in tokens:
+            postings = self._postings[token]
+            term_freq = len(postings[doc_id])
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            score += idf * term_freq * (K1 + 1) / (term_freq + K1 * length_norm)
+        return score
+    
+    def search(self, query: str, offset: int = 0,
+               limit: Optional[int] = None) -> Tuple[int, List[Tuple[int, float]]]:
+        """Return (total hits, [(doc_id, score), ...]) for one page of results
+
+        Ties are broken in favour of the newer exchange.
+        """
+        phrases = parse_query(query)
+        if not phrases:
+            return 0, []
+        
+        # Evaluate the most selective phrase first
+        phrases.sort(key=lambda phrase: min(len(self._postings.get(t, ())) for t in phrase))
+        docs = None
+        for phrase in phrases:
+            docs = self._phrase_docs(phrase, docs)
+            if not docs:
+                return 0, []
+        
+        tokens = sorted({token for phrase in phrases for token in phrase})
+        scored = ((self._score(doc_id, tokens), doc_id) for doc_id in docs)
+        if limit is None:
+            ranked = sorted(scored, reverse=True)[offset:]
+        else:
+            ranked = heapq.nlargest(offset + limit, scored)[offset:]
+        return len(docs), [(doc_id, score) for score, doc_id in ranked]
+    
+    def to_dict(self) -> Dict:
+        """JSON-serializable snapshot of the index"""
+        return {
+            'version': 1,
+            'postings': {
+                token: {str(doc_id): positions for doc_id, positions in postings.items()}
+                for token, postings in self._postings.items()
+            },
+            'doc_lengths': {str(doc_id): length for doc_id, length in self._doc_lengths.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'InvertedIndex':
+        index = cls()
+        if data.get('version') != 1:
+            return index
+        index._postings = {
+            token: {int(doc_id): positions for doc_id, positions in postings.items()}
+            for token, postings in data['postings'].items()
+        }
+        index._doc_lengths = {int(doc_id): length for doc_id, length in data['doc_lengths'].items()}
+        index._total_length = sum(index._doc_lengths.values())
+        return index
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Session Store Module
+Keeps per-session conversation state within a bounded memory budget
+"""
+
+import asyncio
+import contextvars
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+import logging
+
+from conversation_manager import ConversationManager
+
+logger = logging.getLogger(__name__)
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+class SessionStore:
+    """LRU of hot per-session ConversationManagers backed by per-session files
+
+    Every session persists to its own journal under ``sessions_dir``, so
+    evicting a cold session only closes its files and drops it from memory;
+    the next request for it reloads the history from disk. Eviction happens
+    when either ``max_sessions`` hot sessions are loaded or their combined
+    approximate size exceeds ``max_memory_bytes``.
+
+    The LRU map is guarded by one short-lived store lock; each session's
+    history is guarded by its manager's own lock. Loading a cold session and
+    closing an evicted one happen outside the store lock, with the session
+    marked busy meanwhile: other requests for it wait for that load or close
+    to finish instead of starting their own. Sessions in use through
+    ``session()`` are pinned and never evicted. Together these mean two
+    managers never write to the same session's files at once.
+    """
+    
+    def __init__(self, sessions_dir: str = 'sessions', max_sessions: int = 256,
+                 max_memory_bytes: int = 64 * 1024 * 1024,
+                 max_history_length: int = 100):
+        self.sessions_dir = sessions_dir
+        self.max_sessions = max_sessions
+        self.max_memory_bytes = max_memory_bytes
+        self.max_history_length = max_history_length
+        
+        self._sessions: "OrderedDict[str, ConversationManager]" = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        self._busy: Set[str] = set()  # Sessions being loaded or closed
+        self._memory_usage = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        # Signalled whenever a session stops being busy
+        self._idle = threading.Condition(self._lock)
+        # Separate from _lock because managers report growth while holding
+        # their own lock, and eviction takes the store lock first.
+        self._usage_lock = threading.Lock()
+        
+        os.makedirs(self.sessions_dir, exist_ok=True)
+    
+    @staticmethod
+    def new_session_id() -> str:
+        """Generate a fresh random session id"""
+        return uuid.uuid4().hex
+    
+    @staticmethod
+    def is_valid_session_id(session_id: Optional[str]) -> bool:
+        """Session ids become file names, so only allow a safe alphabet"""
+        return bool(session_id) and bool(SESSION_ID_PATTERN.match(session_id))
+    
+    def _history_file(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{session_id}.json")
+    
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[ConversationManager]:
+        """Pin the session's manager for the duration of the block"""
+        manager = self._acquire(session_id)
+        try:
+            yield manager
+        finally:
+            self._unpin(session_id)
+    
+    def _acquire(self, session_id: str) -> ConversationManager:
+        """Return the session's pinned manager, loading it from disk if it is cold"""
+        if not self.is_valid_session_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        
+        with self._lock:
+            self._pins[session_id] = self._pins.get(session_id, 0) + 1
+            # Wait out another thread's load, or the close of an evicted manager
+            while session_id in self._busy:
+                self._idle.wait()
+            manager = self._sessions.get(session_id)
+            if manager is not None:
+                self._sessions.move_to_end(session_id)
+                return manager
+            self._busy.add(session_id)
+        
+        # Reading the journal is disk I/O, keep it outside the store lock
+        try:
+            manager = ConversationManager(
+                history_file=self._history_file(session_id),
+                max_history_length=self.max_history_length,
+                on_resize=self._account
+            )
+        except Exception:
+            with self._lock:
+                self._busy.discard(session_id)
+                self._idle.notify_all()
+            self._unpin(session_id)
+            raise
+        
+        with self._lock:
+            self._busy.discard(session_id)
+            self._idle.notify_all()
+            self._sessions[session_id] = manager
+            self._account(manager.memory_usage())
+            evicted = self._collect_evictions()
+        
+        # Flushing evicted sessions does disk I/O too
+        self._release_all(evicted)
+        return manager
+    
+    def _unpin(self, session_id: str) -> None:
+        with self._lock:
+            remaining = self._pins.get(session_id, 1) - 1
+            if remaining:
+                self._pins[session_id] = remaining
+            else:
+                self._pins.pop(session_id, None)
+            evicted = self._collect_evictions()
+        
+        self._release_all(evicted)
+    
+    def _account(self, delta: int) -> None:
+        with self._usage_lock:
+            self._memory_usage += delta
+    
+    def _collect_evictions(self) -> List[Tuple[str, ConversationManager]]:
+        """Unlink least recently used unpinned sessions until within both limits
+
+        Evicted sessions stay busy until ``_release_all`` has closed them.
+        """
+        evicted = []
+        for session_id in list(self._sessions):
+            if not (len(self._sessions) > self.max_sessions or
+                    self._memory_usage > self.max_memory_bytes):
+                break
+            if session_id in self._pins:
+                continue
+            manager = self._sessions.pop(session_id)
+            manager.on_resize = None
+            self._account(-manager.memory_usage())
+            self._evictions += 1
+            self._busy.add(session_id)
+            evicted.append((session_id, manager))
+            logger.debug(f"Evicted cold session {session_id}")
+        return evicted
+    
+    def _release_all(self, evicted: List[Tuple[str, ConversationManager]]) -> None:
+        """Close evicted managers, then let waiting requests reload their sessions"""
+        for session_id, manager in evicted:
+            try:
+                manager.close()
+            except Exception as e:
+                logger.error(f"Error closing session history: {str(e)}")
+            finally:
+                with self._lock:
+                    self._busy.discard(session_id)
+                    self._idle.notify_all()
+    
+    def close(self) -> None:
+        """Flush and drop every hot session"""
+        with self._lock:
+            managers = list(self._sessions.items())
+            self._sessions.clear()
+            self._pins.clear()
+            for session_id, manager in managers:
+                self._busy.add(session_id)
+                manager.on_resize = None
+                self._account(-manager.memory_usage())
+        
+        self._release_all(managers)
+    
+    def get_stats(self) -> Dict:
+        """Occupancy figures for monitoring"""
+        return {
+            'hot_sessions': len(self._sessions),
+            'pinned_sessions': len(self._pins),
+            'max_sessions': self.max_sessions,
+            'memory_usage_bytes': self._memory_usage,
+            'max_memory_bytes': self.max_memory_bytes,
+            'evictions': self._evictions
+        }
+
+class AsyncSessionStore:
+    """asyncio front for SessionStore
+
+    Loading, journaling and evicting sessions touch the disk and take locks,
+    so every call runs in ``executor`` (the loop's default if None). The
+    whole pin / work / unpin sequence is one executor hop.
+    """
+    
+    def __init__(self, store: SessionStore, executor: Optional[Executor] = None):
+        self.store = store
+        self.executor = executor
+    
+    async def call(self, session_id: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``func(conversation, *args, **kwargs)`` on the pinned session, off the event loop"""
+        def work():
+            with self.store.session(session_id) as conversation:
+                return func(conversation, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        # The caller's context variables (e.g. request timings) follow the work
+        return await loop.run_in_executor(self.executor, contextvars.copy_context().run, work)
+    
+    def get_stats(self) -> Dict:
+        return self.store.get_stats()
+    
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.store.close)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Single Flight Module
+Coalesces concurrent identical calls so only one of them does the work
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving meanwhile share its outcome
+
+    The first caller for a key (the leader) runs ``func`` on its own thread.
+    Callers with the same key that arrive before it finishes wait for and
+    receive the same result, or the same exception. Nothing is kept once
+    the call completes; that is the response cache's job.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'coalesced': 0}
+    
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._stats['calls'] += 1
+            else:
+                self._stats['coalesced'] += 1
+        
+        if not leader:
+            return future.result()
+        
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
+
+class AsyncSingleFlight:
+    """asyncio version of SingleFlight
+
+    The shared call runs as its own task, so a waiter that is cancelled
+    (say, its client disconnected) does not cancel the call for the others.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self._stats['calls'] += 1
+        else:
+            self._stats['coalesced'] += 1
+        return await asyncio.shield(task)
+    
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    def get_stats(self) -> Dict:
+        return dict(self._stats, in_flight=len(self._calls))
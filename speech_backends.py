@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Speech Backends Module
+Interchangeable speech-to-text engines behind one small interface
+"""
+
+import json
+from typing import Optional
+import logging
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+class RecognizerBackend:
+    """Turns mono PCM audio into text; returns None when nothing was understood"""
+    
+    name = 'base'
+    
+    def transcribe(self, frames: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        raise NotImplementedError
+
+class GoogleRecognizer(RecognizerBackend):
+    """Google Web Speech API via speech_recognition (needs internet access)"""
+    
+    name = 'google'
+    
+    def __init__(self, recognizer: Optional[sr.Recognizer] = None):
+        self.recognizer = recognizer or sr.Recognizer()
+    
+    def transcribe(self, frames: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        try:
+            return self.recognizer.recognize_google(sr.AudioData(frames, sample_rate, sample_width))
+        except sr.UnknownValueError:
+            return None
+
+class VoskRecognizer(RecognizerBackend):
+    """Offline Kaldi recognizer; the model is loaded once and shared by every request
+
+    Vosk's CPU API decodes one utterance per KaldiRecognizer, so there is
+    nothing to gain from batching. Each request builds its own recognizer
+    against the shared (thread-safe) model, and requests decode in parallel,
+    up to STT_MAX_CONCURRENT.
+    """
+    
+    name = 'vosk'
+    
+    def __init__(self, model_path: str):
+        try:
+            import vosk
+        except ImportError:
+            raise RuntimeError("STT_BACKEND=vosk needs the 'vosk' package (pip install vosk)")
+        if not model_path:
+            raise RuntimeError("STT_BACKEND=vosk needs VOSK_MODEL_PATH to point at a model directory")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+        logger.info(f"Loaded Vosk model from {model_path}")
+    
+    def transcribe(self, frames: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        recognizer = self._vosk.KaldiRecognizer(self.model, sample_rate)
+        recognizer.AcceptWaveform(frames)
+        return json.loads(recognizer.FinalResult()).get('text') or None
+
+class StubRecognizer(RecognizerBackend):
+    """Deterministic recognizer for tests and benchmarks; never touches a model"""
+    
+    name = 'stub'
+    
+    def __init__(self, transcript: Optional[str] = None):
+        self.transcript = transcript
+    
+    def transcribe(self, frames: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        if not frames:
+            return None
+        if self.transcript:
+            return self.transcript
+        seconds = len(frames) / (sample_rate * sample_width)
+        return f"stub transcription of {seconds:.2f} seconds of audio"
+
+def create_backend(name: str = 'google', model_path: Optional[str] = None,
+                   recognizer: Optional[sr.Recognizer] = None) -> RecognizerBackend:
+    """Backend for an STT_BACKEND setting: google, vosk or stub"""
+    name = (name or 'google').lower()
+    if name == 'google':
+        return GoogleRecognizer(recognizer)
+    if name == 'vosk':
+        return VoskRecognizer(model_path)
+    if name == 'stub':
+        return StubRecognizer()
+    raise ValueError(f"Unknown speech recognition backend: {name}")
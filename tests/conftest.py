@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test Configuration
+Makes the top-level modules importable and provides shared fixtures
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_openrouter import FakeOpenRouterServer  # noqa: E402
+from conversation_manager import ConversationManager  # noqa: E402
+
+@pytest.fixture
+def make_manager(tmp_path):
+    """Build ConversationManagers on a temporary history file; closed after the test"""
+    managers = []
+    
+    def make(name: str = 'history.json', **kwargs) -> ConversationManager:
+        manager = ConversationManager(history_file=str(tmp_path / name), **kwargs)
+        managers.append(manager)
+        return manager
+    
+    yield make
+    for manager in managers:
+        manager.close()
+
+@pytest.fixture
+def fake_server():
+    """Local OpenAI-compatible server on a free port; stopped after the test"""
+    server = FakeOpenRouterServer(reply='Hello from the fake server').start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def voice_env(tmp_path, monkeypatch):
+    """Environment for building the apps offline: stub STT, no TTS workers, state under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('SESSIONS_DIR', str(tmp_path / 'sessions'))
+    monkeypatch.setenv('TTS_CACHE_DIR', str(tmp_path / 'tts_cache'))
+    monkeypatch.setenv('TTS_WORKERS', '0')
+    monkeypatch.setenv('STT_BACKEND', 'stub')
+    monkeypatch.setenv('OPENROUTER_API_KEY', 'test-key')
+    return tmp_path
+
+@pytest.fixture
+def flask_bot(voice_env):
+    """A VoiceBotApp built from voice_env; its Flask test client is ``flask_bot.app.test_client()``"""
+    from app import VoiceBotApp
+    bot = VoiceBotApp()
+    yield bot
+    if 'voice_handler' in bot.__dict__:
+        bot.voice_handler.close()
+    bot.session_store.close()
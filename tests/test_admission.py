@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Admission Tests
+Upload checks, and queueing, shedding and cancellation in the stage limiters
+"""
+
+import asyncio
+import io
+import threading
+import time
+import wave
+
+import pytest
+
+from admission import (AdmissionError, AsyncStageLimiter, StageLimiter, check_audio_duration,
+                       check_upload_size, wav_duration)
+
+def _wav(seconds: float, sample_rate: int = 8000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b'\0\0' * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+def test_upload_size_checks():
+    check_upload_size(1024, 2048)
+    with pytest.raises(AdmissionError) as missing:
+        check_upload_size(None, 2048)
+    assert missing.value.status == 411
+    with pytest.raises(AdmissionError) as too_big:
+        check_upload_size(3 * 1024 * 1024, 2 * 1024 * 1024)
+    assert too_big.value.status == 413
+
+def test_audio_duration_checks():
+    assert wav_duration(_wav(1.5)) == pytest.approx(1.5)
+    assert wav_duration(b'not a wav file') is None
+    check_audio_duration(_wav(1), 2)
+    check_audio_duration(b'compressed audio', 2)  # Only bounded by size
+    with pytest.raises(AdmissionError) as too_long:
+        check_audio_duration(_wav(3), 2)
+    assert too_long.value.status == 413
+
+def test_retry_after_header():
+    assert AdmissionError(429, 'busy', retry_after=3).headers == {'Retry-After': '3'}
+    assert AdmissionError(413, 'too big').headers == {}
+
+def test_limiter_admits_up_to_max_concurrent_without_waiting():
+    limiter = StageLimiter('stt', max_concurrent=2, max_queue=0)
+    first = limiter.acquire()
+    second = limiter.acquire()
+    with pytest.raises(AdmissionError) as rejected:
+        limiter.acquire()
+    assert rejected.value.status == 429 and rejected.value.retry_after >= 1
+    limiter.release(first)
+    limiter.release(second)
+    assert limiter.get_stats()['admitted'] == 2 and limiter.get_stats()['rejected'] == 1
+
+def test_queued_request_gets_the_released_slot():
+    limiter = StageLimiter('stt', max_concurrent=1, max_queue=1, queue_timeout=5)
+    held = limiter.acquire()
+    admitted = threading.Event()
+    
+    def waiter() -> None:
+        limiter.release(limiter.acquire())
+        admitted.set()
+    
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while limiter.get_stats()['waiting'] == 0:
+        time.sleep(0.001)
+    # The queue is full now: the next request is shed at once
+    with pytest.raises(AdmissionError):
+        limiter.check_capacity()
+    assert not admitted.is_set()
+    
+    limiter.release(held)
+    thread.join(5)
+    assert admitted.is_set()
+    assert limiter.get_stats()['queued'] == 1 and limiter.get_stats()['active'] == 0
+
+def test_queue_wait_times_out_with_503():
+    limiter = StageLimiter('llm', max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    with limiter.slot():
+        with pytest.raises(AdmissionError) as timed_out:
+            limiter.acquire()
+    assert timed_out.value.status == 503
+    stats = limiter.get_stats()
+    assert stats['timed_out'] == 1 and stats['waiting'] == 0 and stats['active'] == 0
+
+def test_zero_max_concurrent_means_no_limit():
+    limiter = StageLimiter('tts', max_concurrent=0, max_queue=0)
+    tokens = [limiter.acquire() for _ in range(50)]
+    for token in tokens:
+        limiter.release(token)
+    assert limiter.get_stats()['rejected'] == 0
+
+def test_async_waiters_are_served_in_arrival_order():
+    async def scenario():
+        limiter = AsyncStageLimiter('llm', max_concurrent=1, max_queue=5, queue_timeout=5)
+        order = []
+        
+        async def request(name: str) -> None:
+            async with limiter.slot():
+                order.append(name)
+                await asyncio.sleep(0.01)
+        
+        held = await limiter.acquire()
+        tasks = [asyncio.create_task(request(name)) for name in 'abc']
+        await asyncio.sleep(0.01)
+        assert limiter.get_stats()['waiting'] == 3
+        limiter.release(held)
+        await asyncio.gather(*tasks)
+        return order, limiter.get_stats()
+    
+    order, stats = asyncio.run(scenario())
+    assert order == ['a', 'b', 'c']
+    assert stats['active'] == 0 and stats['waiting'] == 0
+
+def test_async_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = AsyncStageLimiter('llm', max_concurrent=1, max_queue=1, queue_timeout=5)
+        held = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # Its queue place is free again, and releasing frees the slot itself
+        assert limiter.get_stats()['waiting'] == 0
+        limiter.release(held)
+        return limiter.get_stats()
+    
+    assert asyncio.run(scenario())['active'] == 0
+
+def test_async_waiter_cancelled_as_the_slot_arrives_hands_it_back():
+    async def scenario():
+        limiter = AsyncStageLimiter('llm', max_concurrent=1, max_queue=2, queue_timeout=5)
+        held = await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire())
+        next_in_line = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        # Grant the slot to the first waiter, then cancel it before it runs
+        limiter.release(held)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        limiter.release(await asyncio.wait_for(next_in_line, 1))
+        return limiter.get_stats()
+    
+    stats = asyncio.run(scenario())
+    assert stats['active'] == 0 and stats['waiting'] == 0
+
+def test_async_queue_full_and_timeout():
+    async def scenario():
+        limiter = AsyncStageLimiter('stt', max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        held = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionError) as full:
+            await limiter.acquire()
+        with pytest.raises(AdmissionError) as timed_out:
+            await waiter
+        limiter.release(held)
+        return full.value.status, timed_out.value.status, limiter.get_stats()
+    
+    full, timed_out, stats = asyncio.run(scenario())
+    assert (full, timed_out) == (429, 503)
+    assert stats['active'] == 0 and stats['waiting'] == 0
+
+def test_voice_endpoint_rejects_oversized_and_overlong_uploads(voice_env, monkeypatch):
+    monkeypatch.setenv('MAX_UPLOAD_MB', '1')
+    monkeypatch.setenv('MAX_AUDIO_SECONDS', '2')
+    from app import VoiceBotApp
+    bot = VoiceBotApp()
+    client = bot.app.test_client()
+    try:
+        too_big = client.post('/api/voice-chat', data={'audio': (io.BytesIO(b'\0' * (2 * 1024 * 1024)), 'a.wav')})
+        assert too_big.status_code == 413
+        too_long = client.post('/api/voice-chat', data={'audio': (io.BytesIO(_wav(5)), 'a.wav')})
+        assert too_long.status_code == 413
+        assert 'seconds' in too_long.get_json()['error']
+        # Neither upload reached speech recognition
+        assert 'voice_handler' not in bot.__dict__
+    finally:
+        bot.session_store.close()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+ASGI App Tests
+The Starlette app end to end against the fake completion server
+"""
+
+import pytest
+from starlette.testclient import TestClient
+
+from app_common import SESSION_HEADER
+
+@pytest.fixture
+def asgi_client(voice_env, fake_server, monkeypatch):
+    monkeypatch.setenv('OPENROUTER_BASE_URL', fake_server.base_url)
+    from asgi_app import AsyncVoiceBotApp
+    bot = AsyncVoiceBotApp()
+    # Entering the client runs the lifespan, so shutdown closes what was built
+    with TestClient(bot.app) as client:
+        yield client
+
+def test_index_serves_the_page(asgi_client):
+    response = asgi_client.get('/')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/html')
+    assert '<html' in response.text.lower()
+
+def test_chat_replies_and_keeps_the_session(asgi_client, fake_server):
+    first = asgi_client.post('/api/chat', json={'message': 'Tell me about compilers please'})
+    assert first.status_code == 200
+    assert first.json()['response'] == 'Hello from the fake server'
+    session_id = first.headers[SESSION_HEADER]
+    
+    asgi_client.post('/api/chat', json={'message': 'And about linkers too'}, headers={SESSION_HEADER: session_id})
+    history = asgi_client.get('/api/conversation-history', headers={SESSION_HEADER: session_id}).json()
+    assert [exchange['user_message'] for exchange in history['history']] == \
+        ['Tell me about compilers please', 'And about linkers too']
+    assert fake_server.requests_served == 2
+
+def test_stream_sends_tokens_then_the_full_reply(asgi_client):
+    with asgi_client.stream('POST', '/api/chat/stream', json={'message': 'Stream a reply for me'}) as response:
+        assert response.headers['content-type'].startswith('text/event-stream')
+        body = ''.join(response.iter_text())
+    assert body.count('"token"') == 5
+    assert '"response": "Hello from the fake server"' in body
+
+def test_empty_message_is_rejected(asgi_client):
+    assert asgi_client.post('/api/chat', json={'message': ''}).status_code == 400
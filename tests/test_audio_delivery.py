@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Audio Delivery Tests
+Reply format negotiation and binary clips served from the TTS cache
+"""
+
+import audio_formats
+from app_common import negotiate_audio_format
+from tts_cache import TTSCache
+
+def _store_clip(bot, data: bytes, audio_format: str = 'wav') -> str:
+    key = TTSCache.make_key('hello there', 'default', 180, audio_format)
+    bot.voice_handler.tts_cache.put(key, data)
+    return f"{key}.{audio_format}"
+
+def test_explicit_format_wins_over_accept():
+    assert negotiate_audio_format('wav8k', 'audio/mpeg') == 'wav8k'
+    assert negotiate_audio_format(None, None) == 'wav'
+    assert negotiate_audio_format('flac', None) == 'wav'
+
+def test_accept_header_picks_the_best_producible_format(monkeypatch):
+    monkeypatch.setattr(audio_formats, '_ENCODER_AVAILABLE', True)
+    assert negotiate_audio_format(None, 'audio/mpeg;q=0.5, audio/ogg') == 'opus'
+    assert negotiate_audio_format('MP3', None) == 'mp3'
+    
+    monkeypatch.setattr(audio_formats, '_ENCODER_AVAILABLE', False)
+    # Without ffmpeg the compressed formats are never offered
+    assert negotiate_audio_format('mp3', 'audio/mpeg') == 'wav'
+
+def test_clip_is_served_as_immutable_binary(flask_bot):
+    clip_id = _store_clip(flask_bot, b'RIFF' + bytes(range(60)))
+    client = flask_bot.app.test_client()
+    
+    response = client.get(f"/api/audio/{clip_id}")
+    assert response.status_code == 200
+    assert response.mimetype == 'audio/wav'
+    assert response.data == b'RIFF' + bytes(range(60))
+    assert 'immutable' in response.headers['Cache-Control']
+    
+    revalidated = client.get(f"/api/audio/{clip_id}", headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+def test_range_request_returns_partial_content(flask_bot):
+    clip_id = _store_clip(flask_bot, bytes(range(64)))
+    response = flask_bot.app.test_client().get(f"/api/audio/{clip_id}", headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == bytes(range(10, 20))
+    assert response.headers['Content-Range'] == 'bytes 10-19/64'
+
+def test_unknown_or_malformed_clip_is_not_found(flask_bot):
+    client = flask_bot.app.test_client()
+    assert client.get(f"/api/audio/{'0' * 64}.wav").status_code == 404
+    assert client.get('/api/audio/..%2Fapp.py').status_code == 404
+
+def test_clip_written_by_another_worker_is_found(tmp_path):
+    serving = TTSCache(str(tmp_path))
+    # Another worker process shares the directory but not the in-memory index
+    TTSCache(str(tmp_path)).put('clip', b'audio from another worker')
+    assert serving.get('clip') == b'audio from another worker'
+    assert serving.get_stats()['disk_entries'] == 1
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Audio Utilities Tests
+In-memory WAV decoding, channel mixing and resampling for speech recognition
+"""
+
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from audio_utils import decode_audio, pcm_to_float, read_wav, resample, to_pcm16
+
+def _wav(samples: np.ndarray, sample_rate: int, sample_width: int = 2) -> bytes:
+    """Pack float samples of shape (frames, channels) into a PCM WAV"""
+    if sample_width == 1:
+        frames = (np.clip(samples, -1, 127 / 128) * 128 + 128).astype(np.uint8).tobytes()
+    else:
+        frames = to_pcm16(samples.ravel())
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+def _tone(frequency: float, seconds: float, sample_rate: int) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+def _peak_frequency(samples: np.ndarray, sample_rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(samples))
+    return np.argmax(spectrum) * sample_rate / samples.size
+
+def test_target_format_passes_through_untouched():
+    data = _wav(_tone(440, 0.5, 16000)[:, None], 16000)
+    frames, sample_rate, sample_width = decode_audio(data)
+    assert frames == read_wav(data)[0]
+    assert (sample_rate, sample_width) == (16000, 2)
+
+def test_stereo_8bit_upload_becomes_mono_16k():
+    tone = _tone(440, 1.0, 44100)
+    data = _wav(np.stack([tone, tone], axis=1), 44100, sample_width=1)
+    frames, sample_rate, sample_width = decode_audio(data)
+    
+    samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768
+    assert (sample_rate, sample_width) == (16000, 2)
+    assert samples.size == 16000
+    assert abs(_peak_frequency(samples, 16000) - 440) < 2
+    assert 0.4 < np.abs(samples).max() < 0.6
+
+def test_24bit_samples_keep_their_sign():
+    frames = b''.join(value.to_bytes(3, 'little', signed=True) for value in (2 ** 22, -(2 ** 22), 0))
+    assert pcm_to_float(frames, 1, 3).ravel().tolist() == [0.5, -0.5, 0.0]
+
+def test_unsupported_sample_width_is_rejected():
+    with pytest.raises(ValueError):
+        pcm_to_float(b'\x00' * 10, 1, 5)
+
+def test_downsampling_filters_tones_above_the_new_nyquist():
+    high = resample(_tone(7000, 1.0, 44100), 44100, 8000)
+    low = resample(_tone(300, 1.0, 44100), 44100, 8000)
+    assert np.abs(high).max() < 0.5 * np.abs(low).max()
+
+def test_non_wav_data_is_not_parsed_as_wav():
+    assert read_wav(b'OggS' + b'\x00' * 100) is None
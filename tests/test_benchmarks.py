@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite Tests
+Reproducible fixtures, load accounting and regression comparison of the benchmark suite
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+# The suite imports its sibling fake_openrouter as a top-level module, as when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import bench_suite  # noqa: E402
+from audio_utils import read_wav, trim_silence  # noqa: E402
+
+def _result(p95_ms: float, throughput: float, errors: int = 0) -> dict:
+    return {'scenario': 'chat', 'history': 10, 'concurrency': 8, 'errors': errors,
+            'p95_ms': p95_ms, 'throughput': throughput}
+
+def test_synthetic_wav_is_reproducible_and_trimmable():
+    wav = bench_suite.synthetic_wav(1.0, seed=3)
+    assert wav == bench_suite.synthetic_wav(1.0, seed=3)
+    assert wav != bench_suite.synthetic_wav(1.0, seed=4)
+    
+    frames, channels, sample_width, sample_rate = read_wav(wav)
+    assert (channels, sample_width, sample_rate) == (1, 2, 16000)
+    trimmed = trim_silence(frames, sample_rate)
+    # The speech survives, part of the padding silence does not
+    assert 0 < len(trimmed) < len(frames)
+    assert np.abs(np.frombuffer(trimmed, dtype='<i2')).max() > 5000
+
+def test_percentile_interpolates():
+    assert bench_suite.percentile([], 0.5) == 0.0
+    assert bench_suite.percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.5
+    assert bench_suite.percentile([1.0, 2.0, 3.0, 4.0], 1.0) == 4.0
+
+def test_run_load_counts_every_request_and_failure():
+    seen = []
+    result = bench_suite.run_load(lambda state, n: seen.append(n) or n % 10 != 0, total=50, concurrency=4)
+    assert sorted(seen) == list(range(50))
+    assert result['requests'] == 50 and result['errors'] == 5
+    assert result['p50_ms'] <= result['p95_ms'] <= result['p99_ms']
+
+def test_compare_reports_only_regressions_beyond_tolerance_and_noise(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'results': [_result(p95_ms=10.0, throughput=100.0)]}))
+    
+    assert bench_suite.compare([_result(11.0, 95.0)], str(baseline), 0.25, 0.5) == []
+    regressions = bench_suite.compare([_result(20.0, 50.0, errors=1)], str(baseline), 0.25, 0.5)
+    assert [line.split(': ')[1].split()[0] for line in regressions] == ['errors', 'p95', 'throughput']
+    # A 50% slowdown of a sub-millisecond operation is timer noise
+    baseline.write_text(json.dumps({'results': [_result(p95_ms=0.1, throughput=10000.0)]}))
+    assert bench_suite.compare([_result(0.15, 6000.0)], str(baseline), 0.25, 0.5) == []
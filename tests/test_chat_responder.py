@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Chat Responder Tests
+Context-aware reuse of cached and coalesced LLM replies
+"""
+
+import pytest
+
+from chat_responder import ChatResponder
+
+@pytest.fixture
+def responder_factory(fake_server, monkeypatch):
+    monkeypatch.setenv('OPENROUTER_API_KEY', 'test-key')
+    monkeypatch.setenv('OPENROUTER_BASE_URL', fake_server.base_url)
+    monkeypatch.setenv('OPENROUTER_MODEL', 'fake/model')
+    responders = []
+    
+    def make(**env) -> ChatResponder:
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        responder = ChatResponder()
+        responders.append(responder)
+        return responder
+    
+    yield make
+    for responder in responders:
+        responder.client.close()
+
+def _context(make_manager, name: str, *messages) -> dict:
+    manager = make_manager(name)
+    for message in messages:
+        manager.add_exchange(message, f"An answer about {message}")
+    return manager.get_context()
+
+def test_follow_up_is_not_answered_from_another_sessions_context(responder_factory, make_manager, fake_server):
+    responder = responder_factory()
+    context_a = _context(make_manager, 'a.json', 'Tell me about black holes')
+    context_b = _context(make_manager, 'b.json', 'Tell me about sourdough bread')
+    
+    responder.generate_response('tell me more', context_a)
+    responder.generate_response('Tell me more!', context_b)
+    assert fake_server.requests_served == 2
+    
+    # The same session asking again in the same state is still served from the cache
+    responder.generate_response('tell me more', context_a)
+    assert fake_server.requests_served == 2
+    assert responder._flight_key('tell me more', responder._cache_namespace(context_a)) != \
+        responder._flight_key('tell me more', responder._cache_namespace(context_b))
+
+def test_opening_questions_are_shared_across_sessions(responder_factory, make_manager, fake_server):
+    responder = responder_factory()
+    first = responder.generate_response('How far away is the moon', _context(make_manager, 'a.json'))
+    second = responder.generate_response('how far away is the moon?', _context(make_manager, 'b.json'))
+    assert first == second
+    assert fake_server.requests_served == 1
+
+def test_model_scope_shares_replies_whatever_the_context(responder_factory, make_manager, fake_server):
+    responder = responder_factory(RESPONSE_CACHE_SCOPE='model')
+    responder.generate_response('tell me more', _context(make_manager, 'a.json', 'Tell me about black holes'))
+    responder.generate_response('tell me more', _context(make_manager, 'b.json', 'Tell me about bread'))
+    assert fake_server.requests_served == 1
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Context Builder Tests
+Token budget, eviction into the topic summary and incremental syncing of ContextWindow
+"""
+
+from context_builder import MESSAGE_OVERHEAD_TOKENS, ContextWindow, estimate_tokens
+
+def _history(count: int, start: int = 1, words: int = 3) -> list:
+    return [{
+        'exchange_id': exchange_id,
+        'user_message': ' '.join([f"question{exchange_id}"] * words),
+        'assistant_response': 'short answer'
+    } for exchange_id in range(start, start + count)]
+
+def _user_messages(snapshot: dict) -> list:
+    return [message['content'] for message in snapshot['messages'] if message['role'] == 'user']
+
+def test_estimate_tokens_counts_words_symbols_and_long_words():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('hi there!') == 3
+    assert estimate_tokens('internationalization') == 1 + (20 - 1) // 6
+
+def test_window_keeps_the_most_recent_exchanges():
+    window = ContextWindow(max_tokens=10000, max_exchanges=3, summary_tokens=0)
+    window.sync(_history(5))
+    snapshot = window.snapshot()
+    assert [message['role'] for message in snapshot['messages']] == ['user', 'assistant'] * 3
+    assert _user_messages(snapshot)[0].startswith('question3')
+
+def test_window_stays_within_the_token_budget():
+    exchange_tokens = estimate_tokens('question1 question1 question1') + estimate_tokens('short answer') + \
+        2 * MESSAGE_OVERHEAD_TOKENS
+    window = ContextWindow(max_tokens=exchange_tokens * 2, max_exchanges=20, summary_tokens=0)
+    window.sync(_history(6))
+    snapshot = window.snapshot()
+    assert len(_user_messages(snapshot)) == 2
+    assert snapshot['tokens'] <= exchange_tokens * 2
+
+def test_evicted_exchanges_leave_a_capped_topic_summary():
+    window = ContextWindow(max_tokens=10000, max_exchanges=2, summary_tokens=12)
+    window.sync(_history(8))
+    summary, *rest = window.snapshot()['messages']
+    assert summary['role'] == 'system'
+    assert summary['content'].startswith('Earlier in this conversation the user asked about:')
+    # Oldest topics go first once the summary is over its budget
+    assert 'question6' in summary['content'] and 'question1' not in summary['content']
+    assert len(rest) == 4
+
+def test_sync_only_adds_new_exchanges():
+    window = ContextWindow(max_tokens=10000, max_exchanges=10, summary_tokens=0)
+    history = _history(3)
+    window.sync(history)
+    first = window.snapshot()
+    window.sync(history)
+    assert window.snapshot() is first  # Unchanged window, cached snapshot
+    
+    history.extend(_history(1, start=4))
+    window.sync(history)
+    assert _user_messages(window.snapshot())[-1].startswith('question4')
+    assert window.snapshot()['fingerprint'] != first['fingerprint']
+
+def test_trimmed_history_leaves_the_window():
+    window = ContextWindow(max_tokens=10000, max_exchanges=10, summary_tokens=0)
+    history = _history(5)
+    window.sync(history)
+    window.sync(history[2:] + _history(1, start=6))
+    assert [message.split()[0] for message in _user_messages(window.snapshot())] == \
+        ['question3', 'question4', 'question5', 'question6']
+
+def test_cleared_history_resets_the_window():
+    window = ContextWindow(max_tokens=10000, max_exchanges=10, summary_tokens=50)
+    window.sync(_history(5))
+    window.sync([])
+    assert window.snapshot() == {'messages': [], 'tokens': 0, 'fingerprint': ''}
+    
+    # Renumbered from 1 after a clear
+    window.sync(_history(5))
+    window.sync(_history(2))
+    assert len(_user_messages(window.snapshot())) == 2
+
+def test_manager_context_follows_the_conversation(make_manager):
+    manager = make_manager()
+    assert manager.get_context()['messages'] == []
+    manager.add_exchange('what is a black hole', 'a region of spacetime')
+    context = manager.get_context(max_tokens=1000, max_exchanges=5, summary_tokens=50)
+    assert context['messages'][0] == {'role': 'user', 'content': 'what is a black hole'}
+    manager.clear_history()
+    assert manager.get_context(max_tokens=1000, max_exchanges=5, summary_tokens=50)['messages'] == []
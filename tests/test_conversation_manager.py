@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Conversation Manager Tests
+Thread safety of one shared manager and its exchange ids
+"""
+
+import threading
+
+from conversation_manager import ConversationManager
+
+THREADS = 8
+TURNS = 50
+
+def _add_concurrently(manager: ConversationManager, threads: int = THREADS, turns: int = TURNS) -> None:
+    barrier = threading.Barrier(threads)
+    
+    def worker(worker_id: int) -> None:
+        barrier.wait()
+        for turn in range(turns):
+            manager.add_exchange(f"question {worker_id}-{turn}", f"answer {worker_id}-{turn}")
+    
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+def test_concurrent_adds_lose_and_duplicate_nothing(make_manager):
+    manager = make_manager(max_history_length=THREADS * TURNS)
+    _add_concurrently(manager)
+    
+    history = manager.conversation_history
+    ids = [exchange['exchange_id'] for exchange in history]
+    assert ids == list(range(1, THREADS * TURNS + 1))
+    assert len({exchange['user_message'] for exchange in history}) == THREADS * TURNS
+    assert manager.get_conversation_stats()['total_exchanges'] == THREADS * TURNS
+
+def test_concurrent_adds_survive_reload(make_manager):
+    manager = make_manager(max_history_length=THREADS * TURNS)
+    _add_concurrently(manager)
+    manager.close()
+    
+    reloaded = make_manager(max_history_length=THREADS * TURNS)
+    assert reloaded.conversation_history == manager.conversation_history
+
+def test_reads_during_writes_see_consistent_history(make_manager):
+    manager = make_manager(max_history_length=20)
+    stop = threading.Event()
+    errors = []
+    
+    def reader() -> None:
+        while not stop.is_set():
+            try:
+                ids = [exchange['exchange_id'] for exchange in manager.get_history(20)]
+                assert ids == sorted(ids) and len(ids) == len(set(ids))
+                manager.search_history('question')
+                manager.get_frequent_topics()
+            except Exception as e:  # Surfaced in the main thread below
+                errors.append(e)
+    
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    _add_concurrently(manager, threads=4, turns=25)
+    stop.set()
+    for thread in readers:
+        thread.join()
+    
+    assert errors == []
+    assert len(manager.conversation_history) == 20
+
+def test_exchange_ids_keep_increasing_after_trimming(make_manager):
+    manager = make_manager(max_history_length=3)
+    for turn in range(5):
+        manager.add_exchange(f"message {turn}", 'reply')
+    assert [exchange['exchange_id'] for exchange in manager.conversation_history] == [3, 4, 5]
+    manager.close()
+    
+    reloaded = make_manager(max_history_length=3)
+    reloaded.add_exchange('after reload', 'reply')
+    assert reloaded.conversation_history[-1]['exchange_id'] == 6
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Conversation Stats Tests
+Running aggregates and exact topic counts kept up to date through adds and trims
+"""
+
+import random
+from collections import Counter
+
+import conversation_stats
+from conversation_stats import ConversationStats, topic_words
+
+def _recount(history: list) -> Counter:
+    return Counter(word for exchange in history for word in topic_words(exchange['user_message']))
+
+def test_topic_words_skip_short_and_stop_words():
+    assert topic_words('What is Python with numpy arrays') == ['python', 'numpy', 'arrays']
+
+def test_averages_and_totals_follow_adds_and_removes():
+    stats = ConversationStats()
+    assert stats.averages() == (0, 0)
+    first = {'user_message': 'abcd', 'assistant_response': 'xy'}
+    second = {'user_message': 'ab', 'assistant_response': 'wxyz'}
+    stats.add(first)
+    stats.add(second)
+    assert stats.total_exchanges == 2 and stats.averages() == (3, 3)
+    stats.remove(first)
+    assert stats.total_exchanges == 1 and stats.averages() == (2, 4)
+
+def test_topic_counts_stay_exact_with_many_distinct_words(make_manager):
+    random.seed(5)
+    vocabulary = [f"word{i:04d}" for i in range(2000)]
+    manager = make_manager(max_history_length=100)
+    for _ in range(400):
+        manager.add_exchange(' '.join(random.choices(vocabulary[:30] + vocabulary, k=6)), 'reply')
+    
+    expected = _recount(manager.conversation_history)
+    assert len(expected) > 256
+    assert manager.stats.topics == expected
+    top = manager.get_frequent_topics(5)
+    assert [topic['count'] for topic in top] == [count for _, count in expected.most_common(5)]
+
+def test_reading_topics_does_not_rescan_history(make_manager, monkeypatch):
+    manager = make_manager(max_history_length=5)
+    for turn in range(20):
+        manager.add_exchange(f"topic{turn} python", 'reply')
+    
+    calls = []
+    real_topic_words = conversation_stats.topic_words
+    monkeypatch.setattr(conversation_stats, 'topic_words', lambda message: calls.append(message) or
+                        real_topic_words(message))
+    for turn in range(10):
+        manager.add_exchange(f"later{turn} python", 'reply')
+        manager.get_frequent_topics()
+    # One tokenization for the added exchange and one for the trimmed one, per turn
+    assert len(calls) == 20
+
+def test_trimmed_words_leave_the_counts(make_manager):
+    manager = make_manager(max_history_length=2)
+    for message in ('python python', 'python basics', 'rust ownership', 'rust lifetimes'):
+        manager.add_exchange(message, 'reply')
+    
+    topics = {topic['word']: topic['count'] for topic in manager.get_frequent_topics(10)}
+    assert topics == {'rust': 2, 'ownership': 1, 'lifetimes': 1}
+
+def test_manager_stats_survive_reload_and_clear(make_manager):
+    manager = make_manager(max_history_length=3)
+    for turn in range(5):
+        manager.add_exchange(f"message number {turn}", 'a reply')
+    manager.close()
+    
+    reloaded = make_manager(max_history_length=3)
+    stats = reloaded.get_conversation_stats()
+    assert stats['total_exchanges'] == 3
+    assert stats['avg_assistant_response_length'] == len('a reply')
+    assert reloaded.get_frequent_topics(1) == [{'word': 'message', 'count': 3}]
+    
+    reloaded.clear_history()
+    assert reloaded.get_conversation_stats()['total_exchanges'] == 0
+    assert reloaded.get_frequent_topics() == []
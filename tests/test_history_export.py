@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+History Export Tests
+Export formats, chunked streaming, gzip and the /api/export download
+"""
+
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app_common import SESSION_HEADER
+from history_export import gzip_chunks, iter_export
+
+EXCHANGES = [
+    {'timestamp': '2024-01-01T00:00:01', 'user_message': 'Hello, "bot"', 'assistant_response': 'Hi,\nthere',
+     'exchange_id': 1},
+    {'timestamp': '2024-01-01T00:00:02', 'user_message': 'Was ist 東京?', 'assistant_response': 'Die Hauptstadt',
+     'exchange_id': 2}
+]
+
+def _export(format_type: str, exchanges=EXCHANGES, **kwargs) -> str:
+    return ''.join(iter_export(iter(exchanges), format_type, **kwargs))
+
+def test_json_matches_a_whole_document_dump():
+    assert _export('json') == json.dumps(EXCHANGES, indent=2, ensure_ascii=False)
+    assert _export('json', []) == '[]'
+
+def test_jsonl_and_csv_round_trip():
+    assert [json.loads(line) for line in _export('jsonl').splitlines()] == EXCHANGES
+    rows = list(csv.DictReader(io.StringIO(_export('csv'))))
+    assert [row['user_message'] for row in rows] == ['Hello, "bot"', 'Was ist 東京?']
+    assert rows[0]['assistant_response'] == 'Hi,\nthere'
+    assert _export('csv', []) == 'exchange_id,timestamp,user_message,assistant_response\r\n'
+
+def test_text_formats_include_every_exchange():
+    assert _export('txt').count('-' * 50) == 2
+    markdown = _export('MARKDOWN')
+    assert markdown.startswith('# Conversation History\n')
+    assert '## Exchange 2' in markdown and '**User:** Was ist 東京?' in markdown
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        _export('xml')
+
+def test_chunks_are_bounded_and_exchanges_consumed_lazily():
+    consumed = []
+    
+    def exchanges():
+        for exchange_id in range(1, 101):
+            consumed.append(exchange_id)
+            yield dict(EXCHANGES[0], exchange_id=exchange_id)
+    
+    chunks = iter_export(exchanges(), 'jsonl', chunk_size=500)
+    first = next(chunks)
+    assert 500 <= len(first) < 700
+    assert len(consumed) < 10
+    rest = list(chunks)
+    assert len(consumed) == 100
+    assert len((first + ''.join(rest)).splitlines()) == 100
+
+def test_gzip_stream_decompresses_to_the_export():
+    compressed = b''.join(gzip_chunks(iter_export(iter(EXCHANGES * 50), 'jsonl', chunk_size=100)))
+    assert gzip.decompress(compressed).decode('utf-8') == _export('jsonl', EXCHANGES * 50)
+
+def test_download_is_gzipped_when_accepted(flask_bot):
+    with flask_bot.session_store.session('export-session-1') as conversation:
+        conversation.add_exchange('Was ist 東京?', 'Die Hauptstadt')
+    client = flask_bot.app.test_client()
+    headers = {SESSION_HEADER: 'export-session-1'}
+    
+    plain = client.get('/api/export?format=jsonl', headers=headers)
+    assert plain.headers['Content-Type'] == 'application/x-ndjson'
+    assert 'attachment' in plain.headers['Content-Disposition']
+    assert json.loads(plain.data)['user_message'] == 'Was ist 東京?'
+    
+    compressed = client.get('/api/export?format=jsonl', headers={**headers, 'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert client.get('/api/export?format=xml', headers=headers).status_code == 400
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+History Paging Tests
+Cursor pages, delta sync, clear detection and ETags of the conversation history
+"""
+
+from app_common import SESSION_HEADER
+
+def _fill(manager, count: int, prefix: str = 'message') -> None:
+    for turn in range(count):
+        manager.add_exchange(f"{prefix} {turn}", 'reply')
+
+def _ids(page: dict) -> list:
+    return [exchange['exchange_id'] for exchange in page['history']]
+
+def test_pages_walk_backwards_from_the_newest(make_manager):
+    manager = make_manager()
+    _fill(manager, 7)
+    
+    newest = manager.get_page(limit=3)
+    assert _ids(newest) == [5, 6, 7] and newest['has_more'] and newest['latest_id'] == 7
+    older = manager.get_page(before=5, limit=3)
+    assert _ids(older) == [2, 3, 4] and older['has_more']
+    assert _ids(manager.get_page(before=2, limit=3)) == [1]
+
+def test_since_returns_only_the_delta(make_manager):
+    manager = make_manager()
+    _fill(manager, 5)
+    page = manager.get_page(since=3)
+    assert _ids(page) == [4, 5] and not page['reset']
+    assert _ids(manager.get_page(since=5)) == []
+    limited = manager.get_page(since=1, limit=2)
+    assert _ids(limited) == [2, 3] and limited['has_more']
+
+def test_clear_is_detected_even_after_refilling_past_the_cursor(make_manager):
+    manager = make_manager()
+    _fill(manager, 3)
+    cursor = manager.get_page()['latest_id']
+    before_clear = manager.get_page(since=cursor)['version']
+    
+    manager.clear_history()
+    emptied = manager.get_page(since=cursor)
+    assert emptied['reset'] and emptied['history'] == []
+    assert emptied['version'] != before_clear
+    # The client starts over from the cursor it was given and is in sync again
+    assert not manager.get_page(since=emptied['latest_id'])['reset']
+    
+    _fill(manager, 5, 'after clear')
+    page = manager.get_page(since=cursor)
+    assert page['reset']
+    assert [exchange['user_message'] for exchange in page['history']][0] == 'after clear 0'
+    assert min(_ids(page)) > cursor
+
+def test_ids_keep_increasing_across_clear_and_reload(make_manager):
+    manager = make_manager()
+    _fill(manager, 3)
+    manager.clear_history()
+    manager.close()
+    
+    reloaded = make_manager()
+    reloaded.add_exchange('first after reload', 'reply')
+    assert _ids(reloaded.get_page()) == [5]
+    assert reloaded.get_page(since=3)['reset']
+
+def test_versions_differ_for_every_state(make_manager):
+    manager = make_manager(max_history_length=3)
+    versions = {manager.get_page()['version']}
+    for turn in range(6):
+        manager.add_exchange(f"message {turn}", 'reply')
+        versions.add(manager.get_page()['version'])
+    manager.clear_history()
+    versions.add(manager.get_page()['version'])
+    assert len(versions) == 8
+
+def test_endpoint_answers_unchanged_history_with_304(flask_bot):
+    client = flask_bot.app.test_client()
+    session = {SESSION_HEADER: 'paging-session-1'}
+    with flask_bot.session_store.session('paging-session-1') as conversation:
+        _fill(conversation, 3)
+    
+    first = client.get('/api/conversation-history?limit=2', headers=session)
+    assert [exchange['exchange_id'] for exchange in first.get_json()['history']] == [2, 3]
+    etag = first.headers['ETag']
+    assert client.get('/api/conversation-history?since=3',
+                      headers={**session, 'If-None-Match': etag}).status_code == 304
+    
+    client.post('/api/clear-history', headers=session)
+    with flask_bot.session_store.session('paging-session-1') as conversation:
+        _fill(conversation, 4)
+    after = client.get('/api/conversation-history?since=3', headers={**session, 'If-None-Match': etag})
+    assert after.status_code == 200 and after.get_json()['reset']
+    assert after.headers['ETag'] != etag
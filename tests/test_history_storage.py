@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+History Storage Tests
+Journal replay, torn-tail repair and compaction of JournalStorage
+"""
+
+import json
+import os
+
+from history_storage import JournalStorage
+
+def _exchange(exchange_id: int) -> dict:
+    return {
+        'timestamp': f"2024-01-01T00:00:{exchange_id:02d}",
+        'user_message': f"question {exchange_id}",
+        'assistant_response': f"answer {exchange_id}",
+        'exchange_id': exchange_id
+    }
+
+def _journal_with(tmp_path, count: int) -> JournalStorage:
+    storage = JournalStorage(str(tmp_path / 'history.json'), compact_every=1000)
+    storage.load()
+    for exchange_id in range(1, count + 1):
+        storage.append(_exchange(exchange_id))
+    storage.close()
+    return storage
+
+def test_journal_replays_appended_exchanges(tmp_path):
+    storage = _journal_with(tmp_path, 3)
+    
+    reloaded = JournalStorage(storage.path)
+    assert reloaded.load() == [_exchange(1), _exchange(2), _exchange(3)]
+    assert not os.path.exists(storage.path)  # Nothing compacted yet
+
+def test_torn_trailing_record_is_discarded_and_truncated(tmp_path):
+    storage = _journal_with(tmp_path, 2)
+    intact_size = os.path.getsize(storage.journal_path)
+    with open(storage.journal_path, 'ab') as f:
+        f.write(json.dumps(_exchange(3)).encode('utf-8')[:20])  # Crash mid-write
+    
+    reloaded = JournalStorage(storage.path)
+    assert reloaded.load() == [_exchange(1), _exchange(2)]
+    assert os.path.getsize(storage.journal_path) == intact_size
+    
+    # New records land after the repaired tail and replay cleanly
+    reloaded.append(_exchange(3))
+    reloaded.close()
+    assert JournalStorage(storage.path).load() == [_exchange(1), _exchange(2), _exchange(3)]
+
+def test_corrupt_record_drops_it_and_everything_after(tmp_path):
+    storage = _journal_with(tmp_path, 1)
+    with open(storage.journal_path, 'ab') as f:
+        f.write(b'{"not json\n')
+        f.write((json.dumps(_exchange(2)) + '\n').encode('utf-8'))
+    
+    assert JournalStorage(storage.path).load() == [_exchange(1)]
+
+def test_compaction_writes_snapshot_and_empties_journal(tmp_path):
+    storage = JournalStorage(str(tmp_path / 'history.json'), compact_every=3)
+    history = storage.load()
+    for exchange_id in range(1, 4):
+        exchange = _exchange(exchange_id)
+        history.append(exchange)
+        storage.append(exchange)
+        assert storage.needs_compaction() == (exchange_id == 3)
+    storage.compact(history[1:])  # The manager passes the already trimmed history
+    storage.close()
+    
+    with open(storage.path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == [_exchange(2), _exchange(3)]
+    assert not os.path.exists(storage.journal_path)
+    assert not storage.needs_compaction()
+    assert JournalStorage(storage.path).load() == [_exchange(2), _exchange(3)]
+
+def test_records_in_snapshot_and_journal_are_not_replayed_twice(tmp_path):
+    # A compaction interrupted after replacing the snapshot but before removing the journal
+    storage = _journal_with(tmp_path, 2)
+    with open(storage.path, 'w', encoding='utf-8') as f:
+        json.dump([_exchange(1), _exchange(2)], f)
+    
+    assert JournalStorage(storage.path).load() == [_exchange(1), _exchange(2)]
+
+def test_leftover_compaction_temp_file_is_ignored(tmp_path):
+    storage = _journal_with(tmp_path, 1)
+    tmp_snapshot = storage.path + '.tmp'
+    with open(tmp_snapshot, 'w', encoding='utf-8') as f:
+        f.write('[{"half written')
+    
+    assert JournalStorage(storage.path).load() == [_exchange(1)]
+    assert not os.path.exists(tmp_snapshot)
+
+def test_manager_compacts_and_reloads_trimmed_history(make_manager):
+    manager = make_manager(max_history_length=5)
+    manager.storage.compact_every = 4
+    for turn in range(10):
+        manager.add_exchange(f"message {turn}", 'reply')
+    manager.close()
+    
+    reloaded = make_manager(max_history_length=5)
+    assert [exchange['exchange_id'] for exchange in reloaded.conversation_history] == [6, 7, 8, 9, 10]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Intent Matcher Tests
+Whole-word phrase matching and priority order of the compiled intent table
+"""
+
+import json
+
+import pytest
+
+from intent_matcher import IntentMatcher, load_intents
+
+@pytest.fixture
+def matcher():
+    return IntentMatcher([
+        ('life_story', ['life story', 'who are you']),
+        ('pushing_boundaries', ['limits', 'push boundaries']),
+        ('greeting', ['hello', 'hi', 'hey']),
+        ('capabilities', ['what can you do', 'help with'])
+    ])
+
+@pytest.mark.parametrize('message', ['Is this working?', 'show my history', 'limitless ideas', 'heyday'])
+def test_phrases_only_match_whole_words(matcher, message):
+    assert matcher.match(message) is None
+
+@pytest.mark.parametrize('message, intent', [
+    ('hi', 'greeting'),
+    ('Hi there!', 'greeting'),
+    ('HELLO, bot', 'greeting'),
+    ('What are your limits?', 'pushing_boundaries'),
+    ('So... who   are you?', 'life_story'),
+    ('what can you do for me', 'capabilities')
+])
+def test_phrases_match_case_and_punctuation_insensitively(matcher, message, intent):
+    assert matcher.match(message) == intent
+
+def test_multi_word_phrases_need_every_word_in_order(matcher):
+    assert matcher.match('tell me your story of life') is None
+    assert matcher.match('can you do what') is None
+
+def test_earlier_intents_win_regardless_of_position(matcher):
+    assert matcher.match('hi, what can you do? who are you?') == 'life_story'
+    assert matcher.match('hey, can you help with my limits') == 'pushing_boundaries'
+
+def test_phrase_inside_a_longer_partial_match_is_found():
+    # "who are you" fails after "who are", and the failure link must still find "are you"
+    matcher = IntentMatcher([('first', ['who are we']), ('second', ['are you'])])
+    assert matcher.match('who are you') == 'second'
+
+def test_phrase_listed_under_two_intents_goes_to_the_first():
+    matcher = IntentMatcher([('a', ['shared phrase']), ('b', ['shared phrase', 'other'])])
+    assert matcher.match('a shared phrase here') == 'a'
+
+def test_load_intents_reads_groups(tmp_path):
+    path = tmp_path / 'intents.json'
+    path.write_text(json.dumps({'fallback': [{'intent': 'greeting', 'phrases': ['hi']}]}), encoding='utf-8')
+    assert load_intents(str(path)) == {'fallback': [{'intent': 'greeting', 'phrases': ['hi']}]}
+
+def test_load_intents_rejects_entries_without_phrases(tmp_path):
+    path = tmp_path / 'intents.json'
+    path.write_text(json.dumps({'fallback': [{'intent': 'greeting'}]}), encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_intents(str(path))
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Lazy Components Tests
+Voice and LLM components are built on first use, once, and never for text-only traffic
+"""
+
+import threading
+import time
+
+from app_common import lazy_component
+
+def test_component_is_built_once_under_concurrent_access():
+    built = []
+    
+    class Holder:
+        @lazy_component
+        def thing(self):
+            built.append(True)
+            time.sleep(0.05)  # Other threads arrive while the first build runs
+            return object()
+    
+    holder = Holder()
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(holder.thing)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1
+    assert all(thing is seen[0] for thing in seen)
+
+def test_app_starts_without_voice_or_llm_components(flask_bot):
+    assert 'voice_handler' not in flask_bot.__dict__
+    assert 'chat_responder' not in flask_bot.__dict__
+    assert not any(thread.name == 'tts-prewarm' for thread in threading.enumerate())
+
+def test_history_requests_do_not_build_voice_components(flask_bot):
+    client = flask_bot.app.test_client()
+    assert client.get('/api/conversation-history').status_code == 200
+    assert client.get('/api/stats').status_code == 200
+    assert client.get('/metrics').status_code == 200
+    assert 'voice_handler' not in flask_bot.__dict__
+    assert 'tts_cache' not in flask_bot.__dict__
+
+def test_first_use_builds_the_configured_component(flask_bot):
+    assert flask_bot.voice_handler.stt_backend.name == 'stub'
+    assert flask_bot.voice_handler is flask_bot.voice_handler
+    assert flask_bot.__dict__['tts_cache'] is flask_bot.voice_handler.tts_cache
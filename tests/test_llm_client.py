@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+LLM Client Tests
+Pooled sync and async completion clients against the local fake server
+"""
+
+import asyncio
+import socket
+
+import pytest
+
+from async_llm_client import AsyncOpenRouterClient
+from llm_client import LLMAPIError, OpenRouterClient
+
+PAYLOAD = {'model': 'fake/model', 'messages': [{'role': 'user', 'content': 'hi'}]}
+
+def _closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/api/v1"
+
+def test_completion_reuses_one_pooled_connection(fake_server):
+    client = OpenRouterClient('test-key', base_url=fake_server.base_url)
+    for _ in range(3):
+        reply = client.chat_completion(PAYLOAD)
+        assert reply['choices'][0]['message']['content'] == 'Hello from the fake server'
+    
+    pool = client.session.get_adapter(client.completions_url).poolmanager.connection_from_url(client.completions_url)
+    assert pool.num_connections == 1
+    assert client.get_stats()['requests'] == 3
+
+def test_retryable_status_is_retried_then_surfaced(fake_server):
+    fake_server.error_rate = 1.0
+    client = OpenRouterClient('test-key', base_url=fake_server.base_url, max_retries=2, backoff_base=0)
+    with pytest.raises(LLMAPIError) as error:
+        client.chat_completion(PAYLOAD)
+    assert error.value.status_code in (429, 503)
+    assert fake_server.requests_served == 3
+    assert client.get_stats()['retries'] == 2
+
+def test_refused_connection_is_retried():
+    client = OpenRouterClient('test-key', base_url=_closed_port_url(), max_retries=2, backoff_base=0)
+    with pytest.raises(LLMAPIError):
+        client.chat_completion(PAYLOAD)
+    assert client.get_stats()['retries'] == 2
+
+def test_read_timeout_is_not_retried(fake_server):
+    fake_server.latency = 0.5
+    client = OpenRouterClient('test-key', base_url=fake_server.base_url, max_retries=2,
+                              timeout=0.1, backoff_base=0)
+    with pytest.raises(LLMAPIError):
+        client.chat_completion(PAYLOAD)
+    assert fake_server.requests_served == 1
+    assert client.get_stats()['retries'] == 0
+
+def test_async_read_timeout_is_not_retried(fake_server):
+    fake_server.latency = 0.5
+    
+    async def call() -> None:
+        client = AsyncOpenRouterClient('test-key', base_url=fake_server.base_url, max_retries=2,
+                                       timeout=0.1, backoff_base=0)
+        try:
+            with pytest.raises(LLMAPIError):
+                await client.chat_completion(PAYLOAD)
+            assert client.get_stats()['retries'] == 0
+        finally:
+            await client.aclose()
+    
+    asyncio.run(call())
+    assert fake_server.requests_served == 1
+
+def test_async_refused_connection_is_retried():
+    async def call() -> int:
+        client = AsyncOpenRouterClient('test-key', base_url=_closed_port_url(), max_retries=2, backoff_base=0)
+        try:
+            with pytest.raises(LLMAPIError):
+                await client.chat_completion(PAYLOAD)
+            return client.get_stats()['retries']
+        finally:
+            await client.aclose()
+    
+    assert asyncio.run(call()) == 2
+
+def test_stream_yields_deltas_in_order(fake_server):
+    client = OpenRouterClient('test-key', base_url=fake_server.base_url)
+    deltas = list(client.stream_chat_completion(PAYLOAD))
+    assert len(deltas) == 5
+    assert ''.join(deltas) == 'Hello from the fake server'
+
+def test_stream_decodes_raw_utf8(fake_server):
+    fake_server.reply = 'Café — naïve 東京 😀'
+    client = OpenRouterClient('test-key', base_url=fake_server.base_url)
+    assert ''.join(client.stream_chat_completion(PAYLOAD)) == 'Café — naïve 東京 😀'
+
+def test_async_stream_decodes_raw_utf8(fake_server):
+    fake_server.reply = 'Café — naïve 東京 😀'
+    
+    async def collect() -> str:
+        client = AsyncOpenRouterClient('test-key', base_url=fake_server.base_url)
+        try:
+            return ''.join([delta async for delta in client.stream_chat_completion(PAYLOAD)])
+        finally:
+            await client.aclose()
+    
+    assert asyncio.run(collect()) == 'Café — naïve 東京 😀'
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Metrics Tests
+Prometheus exposition of counters, histograms, collectors and stage timings
+"""
+
+import pytest
+
+from metrics import (STAGE_ERRORS, MetricsRegistry, server_timing_header, span, start_request_timing,
+                     stats_families)
+
+def test_counter_renders_labels_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter('test_events_total', 'Events', ['kind'])
+    counter.inc(kind='a "quoted" kind')
+    counter.inc(2, kind='plain')
+    text = registry.render()
+    assert '# TYPE test_events_total counter' in text
+    assert 'test_events_total{kind="a \\"quoted\\" kind"} 1' in text
+    assert 'test_events_total{kind="plain"} 2' in text
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('test_seconds', 'Durations', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value)
+    lines = registry.render().splitlines()
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+    assert 'test_seconds_count 4' in lines
+
+def test_registering_a_name_twice_shares_the_series():
+    registry = MetricsRegistry()
+    assert registry.counter('test_total', 'x') is registry.counter('test_total', 'x')
+
+def test_stats_families_split_counters_from_gauges():
+    families = list(stats_families('test_cache', 'Cache', {'hits': 3, 'entries': 7, 'hit_rate': 0.5,
+                                                           'enabled': True, 'voice': 'espeak'},
+                                   counters=('hits',)))
+    assert families == [
+        ('test_cache', 'Cache', 'gauge', [({'field': 'entries'}, 7), ({'field': 'hit_rate'}, 0.5)]),
+        ('test_cache_total', 'Cache', 'counter', [({'field': 'hits'}, 3)])
+    ]
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.set_collector('broken', lambda: 1 / 0)
+    registry.set_collector('working', lambda: stats_families('test_pool', 'Pool', {'busy': 2}))
+    assert 'test_pool{field="busy"} 2' in registry.render()
+
+def test_spans_feed_server_timing_and_count_errors():
+    timings = start_request_timing()
+    with span('test_stage'):
+        pass
+    with pytest.raises(ValueError):
+        with span('test_stage'):
+            raise ValueError('bad input')
+    
+    assert [stage for stage, _ in timings] == ['test_stage', 'test_stage']
+    assert STAGE_ERRORS.value(stage='test_stage', error='ValueError') >= 1
+    assert server_timing_header([('stt', 0.25), ('stt', 0.25), ('llm', 1.0)], total=2.0) == \
+        'stt;dur=500.0, llm;dur=1000.0, total;dur=2000.0'
+
+def test_app_exposes_component_metrics(flask_bot):
+    flask_bot.voice_handler.tts_cache.get('missing')
+    text = flask_bot.app.test_client().get('/metrics').get_data(as_text=True)
+    assert '# TYPE voicebot_tts_cache_total counter' in text
+    assert 'voicebot_tts_cache_total{field="misses"} 1' in text
+    assert '# TYPE voicebot_stage_seconds histogram' in text
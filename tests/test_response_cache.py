@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Response Cache Tests
+Message normalization, exact and similar lookups, namespaces, expiry and eviction
+"""
+
+import time
+
+from response_cache import ResponseCache, normalize_message
+
+def test_normalization_ignores_case_punctuation_and_spacing():
+    assert normalize_message("  What's   the WEATHER like?! ") == "what's the weather like"
+    assert normalize_message('Straße') == normalize_message('STRASSE')
+
+def test_non_latin_text_is_kept():
+    assert normalize_message('What is 東京?') == 'what is 東京'
+    assert normalize_message('café') == 'café'
+    assert normalize_message('Что такое Python?') == 'что такое python'
+
+def test_different_non_latin_questions_do_not_collide():
+    cache = ResponseCache()
+    cache.put('What is 東京?', 'Tokyo is the capital of Japan.')
+    assert cache.get('What is 大阪?') is None
+    assert cache.get('what is 東京') == 'Tokyo is the capital of Japan.'
+    
+    cache.put('café', 'A small restaurant.')
+    assert cache.get('caf') is None
+
+def test_punctuation_only_messages_are_never_cached():
+    cache = ResponseCache()
+    cache.put('???', 'no')
+    assert cache.get('???') is None and cache.get_stats()['entries'] == 0
+
+def test_namespaces_keep_replies_apart():
+    cache = ResponseCache()
+    cache.put('tell me more', 'About compilers.', namespace='model:a')
+    assert cache.get('tell me more', namespace='model:b') is None
+    assert cache.get('tell me more', namespace='model:a') == 'About compilers.'
+
+def test_similar_messages_hit_when_a_threshold_is_set():
+    cache = ResponseCache(similarity_threshold=0.5)
+    cache.put('how do I reverse a list in python', 'Use reversed() or slicing.')
+    assert cache.get('how do I reverse a list in python please') == 'Use reversed() or slicing.'
+    assert cache.get('how do I sort a dictionary in rust') is None
+    assert cache.get_stats()['similar_hits'] == 1
+
+def test_short_messages_only_match_exactly():
+    cache = ResponseCache(similarity_threshold=0.1)
+    cache.put('hello there', 'Hi!')
+    assert cache.get('hello where') is None
+
+def test_entries_expire_and_oldest_are_evicted():
+    cache = ResponseCache(max_entries=2, ttl=0.05)
+    for message in ('first question', 'second question', 'third question'):
+        cache.put(message, f"answer to {message}")
+    assert cache.get('first question') is None
+    assert cache.get_stats()['evictions'] == 1
+    
+    time.sleep(0.06)
+    assert cache.get('third question') is None
+    assert cache.get_stats()['expirations'] == 1
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Search Index Tests
+BM25 ranking, phrase queries, AND semantics and index maintenance
+"""
+
+from search_index import InvertedIndex, parse_query
+
+def _index(*documents) -> InvertedIndex:
+    index = InvertedIndex()
+    for doc_id, (user_message, assistant_response) in enumerate(documents, start=1):
+        index.add(doc_id, user_message, assistant_response)
+    return index
+
+def _ids(index: InvertedIndex, query: str, **kwargs) -> list:
+    return [doc_id for doc_id, _ in index.search(query, **kwargs)[1]]
+
+def test_parse_query_splits_quoted_phrases_and_words():
+    assert parse_query('"black holes" stars') == [['black', 'holes'], ['stars']]
+    assert parse_query('well-known ""') == [['well', 'known']]
+
+def test_more_occurrences_rank_higher():
+    index = _index(('python', 'a language'),
+                   ('python python python', 'a language'),
+                   ('java', 'another language'))
+    assert _ids(index, 'python') == [2, 1]
+
+def test_rarer_terms_weigh_more():
+    index = _index(('common rare', ''),
+                   ('common common', ''),
+                   ('common', 'filler words'),
+                   ('common', 'more filler'))
+    total, hits = index.search('common rare')
+    assert total == 1 and hits[0][0] == 1
+    assert index.search('rare')[1][0][1] > index.search('common')[1][0][1]
+
+def test_all_query_terms_must_match():
+    index = _index(('cats and dogs', ''), ('cats only', ''), ('dogs only', ''))
+    assert _ids(index, 'cats dogs') == [1]
+    assert _ids(index, 'cats birds') == []
+
+def test_phrases_match_consecutive_words_only():
+    index = _index(('black holes are strange', ''),
+                   ('holes in a black sweater', ''),
+                   ('a black hole', ''))
+    assert _ids(index, '"black holes"') == [1]
+    assert sorted(_ids(index, 'black holes')) == [1, 2]
+
+def test_phrases_do_not_span_message_and_response():
+    index = _index(('tell me about black', 'holes are regions of spacetime'))
+    assert _ids(index, '"black holes"') == []
+    assert _ids(index, 'black holes') == [1]
+
+def test_ties_favour_the_newer_exchange():
+    index = _index(('same words', ''), ('same words', ''), ('same words', ''))
+    assert _ids(index, 'same') == [3, 2, 1]
+
+def test_pagination_returns_total_and_one_page():
+    index = _index(*[(f"topic number {i}", '') for i in range(10)])
+    total, hits = index.search('topic', offset=4, limit=3)
+    assert total == 10
+    assert [doc_id for doc_id, _ in hits] == [6, 5, 4]
+
+def test_removed_exchanges_no_longer_match():
+    index = _index(('apples', ''), ('apples and pears', ''))
+    index.remove(1, 'apples', '')
+    assert _ids(index, 'apples') == [2]
+    index.remove(2)  # Without text: scans the vocabulary
+    assert _ids(index, 'pears') == [] and len(index) == 0
+
+def test_round_trip_through_dict_keeps_results():
+    index = _index(('black holes', 'gravity'), ('white dwarfs', 'stars'))
+    restored = InvertedIndex.from_dict(index.to_dict())
+    for query in ('"black holes"', 'stars', 'gravity black'):
+        assert restored.search(query) == index.search(query)
+
+def test_manager_search_skips_ids_missing_from_history(make_manager):
+    manager = make_manager()
+    manager.add_exchange('apples and pears', 'fruit')
+    manager.search_index.add(99, 'apples that were trimmed', '')
+    
+    assert [exchange['exchange_id'] for exchange in manager.search_history('apples')] == [1]
+    assert [result['exchange_id'] for result in manager.search('apples')['results']] == [1]
+
+def test_manager_search_pages_and_phrases(make_manager):
+    manager = make_manager()
+    for turn in range(5):
+        manager.add_exchange(f"black holes part {turn}", 'gravity')
+    manager.add_exchange('holes in a black sweater', 'fashion')
+    
+    page = manager.search('"black holes"', page=2, per_page=2)
+    assert page['total'] == 5
+    assert [result['exchange_id'] for result in page['results']] == [3, 2]
+    assert all('score' in result for result in page['results'])
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Session Store Tests
+LRU eviction, pinning and reloading of per-session conversation state
+"""
+
+import threading
+import time
+
+import pytest
+
+import session_store
+from session_store import SessionStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions'), max_sessions=2)
+    yield store
+    store.close()
+
+def _talk(store: SessionStore, session_id: str, message: str = 'hello there') -> None:
+    with store.session(session_id) as conversation:
+        conversation.add_exchange(message, 'reply')
+
+def test_least_recently_used_session_is_evicted(store):
+    _talk(store, 'session-a')
+    _talk(store, 'session-b')
+    _talk(store, 'session-a')  # b is now the least recently used
+    _talk(store, 'session-c')
+    
+    assert list(store._sessions) == ['session-a', 'session-c']
+    assert store.get_stats()['evictions'] == 1
+
+def test_evicted_session_reloads_from_disk(store):
+    _talk(store, 'session-a', 'first message')
+    _talk(store, 'session-b')
+    _talk(store, 'session-c')
+    assert 'session-a' not in store._sessions
+    
+    with store.session('session-a') as conversation:
+        assert [exchange['user_message'] for exchange in conversation.conversation_history] == ['first message']
+
+def test_pinned_session_is_never_evicted(store):
+    with store.session('session-a') as pinned:
+        _talk(store, 'session-b')
+        _talk(store, 'session-c')
+        _talk(store, 'session-d')
+        assert store._sessions['session-a'] is pinned
+        assert store.get_stats()['pinned_sessions'] == 1
+    # The unpinned sessions made room instead
+    assert list(store._sessions) == ['session-a', 'session-d']
+    assert store.get_stats()['pinned_sessions'] == 0
+
+def test_memory_budget_evicts_sessions(tmp_path):
+    store = SessionStore(str(tmp_path / 'sessions'), max_sessions=100, max_memory_bytes=3000)
+    for index in range(5):
+        _talk(store, f"session-{index}", 'x' * 500)
+    stats = store.get_stats()
+    assert stats['memory_usage_bytes'] <= 3000
+    assert stats['evictions'] > 0
+    store.close()
+
+def test_invalid_session_ids_are_rejected(store):
+    for session_id in ('../etc/passwd', 'short', '', None):
+        assert not SessionStore.is_valid_session_id(session_id)
+    with pytest.raises(ValueError):
+        with store.session('../escape'):
+            pass
+
+def test_concurrent_first_requests_share_one_manager(store, monkeypatch):
+    built = []
+    real_manager = session_store.ConversationManager
+    
+    def slow_manager(**kwargs):
+        built.append(kwargs['history_file'])
+        time.sleep(0.05)  # Keep the load in progress while the other threads arrive
+        return real_manager(**kwargs)
+    
+    monkeypatch.setattr(session_store, 'ConversationManager', slow_manager)
+    seen = []
+    barrier = threading.Barrier(4)
+    
+    def request() -> None:
+        barrier.wait()
+        with store.session('session-a') as conversation:
+            seen.append(conversation)
+    
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(built) == 1
+    assert all(conversation is seen[0] for conversation in seen)
+
+def test_cold_load_does_not_block_other_sessions(store, monkeypatch):
+    _talk(store, 'session-hot')
+    real_manager = session_store.ConversationManager
+    loading = threading.Event()
+    release = threading.Event()
+    
+    def blocked_manager(**kwargs):
+        loading.set()
+        release.wait(5)
+        return real_manager(**kwargs)
+    
+    monkeypatch.setattr(session_store, 'ConversationManager', blocked_manager)
+    cold = threading.Thread(target=_talk, args=(store, 'session-cold'))
+    cold.start()
+    assert loading.wait(5)
+    try:
+        started = time.perf_counter()
+        _talk(store, 'session-hot')
+        assert time.perf_counter() - started < 1
+    finally:
+        release.set()
+        cold.join()
+
+def test_reload_waits_for_eviction_to_finish_closing(store):
+    _talk(store, 'session-a', 'kept message')
+    closing = threading.Event()
+    finish_close = threading.Event()
+    manager_a = store._sessions['session-a']
+    real_close = manager_a.close
+    
+    def slow_close():
+        closing.set()
+        finish_close.wait(5)
+        real_close()
+    
+    manager_a.close = slow_close
+    _talk(store, 'session-b')
+    evictor = threading.Thread(target=_talk, args=(store, 'session-c'))  # Evicts session-a
+    evictor.start()
+    assert closing.wait(5)
+    
+    reloaded = []
+    reloader = threading.Thread(target=lambda: _talk(store, 'session-a', 'second message') or reloaded.append(True))
+    reloader.start()
+    reloader.join(0.2)
+    assert not reloaded  # Still waiting for the old manager to close
+    
+    finish_close.set()
+    evictor.join()
+    reloader.join()
+    with store.session('session-a') as conversation:
+        assert [exchange['user_message'] for exchange in conversation.conversation_history] == \
+            ['kept message', 'second message']
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Single Flight Tests
+Coalescing of concurrent identical calls, sync and async
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+def _run_together(flight: SingleFlight, key, func, count: int) -> tuple:
+    """Start count callers of flight.do and wait until all of them have joined the call"""
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do(key, func))) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    _wait_for_callers(flight, count)
+    return threads, results
+
+def _wait_for_callers(flight: SingleFlight, count: int) -> None:
+    while flight.get_stats()['calls'] + flight.get_stats()['coalesced'] < count:
+        time.sleep(0.001)
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    
+    def slow_call():
+        calls.append(True)
+        release.wait(5)
+        return 'reply'
+    
+    threads, results = _run_together(flight, 'key', slow_call, 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert results == ['reply'] * 5
+    assert flight.get_stats() == {'calls': 1, 'coalesced': 4, 'in_flight': 0}
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.do('a', lambda: 3) == 3  # Nothing is kept after a call completes
+    assert flight.get_stats()['calls'] == 3
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+    
+    def failing_call():
+        release.wait(5)
+        raise RuntimeError('upstream down')
+    
+    def caller():
+        try:
+            flight.do('key', failing_call)
+        except RuntimeError as e:
+            errors.append(str(e))
+    
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    _wait_for_callers(flight, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert errors == ['upstream down'] * 3
+    assert flight.get_stats()['in_flight'] == 0
+
+def test_async_callers_share_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+    
+    async def slow_call():
+        calls.append(True)
+        await asyncio.sleep(0.02)
+        return 'reply'
+    
+    async def main() -> list:
+        return await asyncio.gather(*(flight.do('key', slow_call) for _ in range(5)))
+    
+    assert asyncio.run(main()) == ['reply'] * 5
+    assert len(calls) == 1
+    assert flight.get_stats() == {'calls': 1, 'coalesced': 4, 'in_flight': 0}
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = AsyncSingleFlight()
+    
+    async def slow_call():
+        await asyncio.sleep(0.05)
+        return 'reply'
+    
+    async def main() -> str:
+        first = asyncio.ensure_future(flight.do('key', slow_call))
+        second = asyncio.ensure_future(flight.do('key', slow_call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+    
+    assert asyncio.run(main()) == 'reply'
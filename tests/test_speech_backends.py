@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Speech Backends Tests
+Backend selection from STT_BACKEND and the deterministic stub recognizer
+"""
+
+import pytest
+
+from speech_backends import GoogleRecognizer, StubRecognizer, create_backend
+
+def test_backend_names_select_their_engine():
+    assert isinstance(create_backend(), GoogleRecognizer)
+    assert isinstance(create_backend('STUB'), StubRecognizer)
+    with pytest.raises(ValueError):
+        create_backend('whisper')
+
+def test_vosk_without_a_model_fails_with_a_setup_hint():
+    with pytest.raises(RuntimeError, match='vosk'):
+        create_backend('vosk', model_path=None)
+
+def test_stub_reports_audio_length_or_fixed_transcript():
+    one_second = b'\x00\x00' * 16000
+    assert StubRecognizer().transcribe(one_second, 16000, 2) == 'stub transcription of 1.00 seconds of audio'
+    assert StubRecognizer('hello there').transcribe(one_second, 16000, 2) == 'hello there'
+    assert StubRecognizer().transcribe(b'', 16000, 2) is None
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+TTS Cache Tests
+Content-addressed keys and the memory and disk tiers of TTSCache
+"""
+
+import os
+
+from tts_cache import TTSCache
+
+def test_key_covers_every_synthesis_parameter():
+    key = TTSCache.make_key('Hello there', 'en', 180, 'wav')
+    assert key == TTSCache.make_key('Hello there', 'en', 180, 'wav')
+    assert len({key,
+                TTSCache.make_key('Hello there!', 'en', 180, 'wav'),
+                TTSCache.make_key('Hello there', 'de', 180, 'wav'),
+                TTSCache.make_key('Hello there', 'en', 150, 'wav'),
+                TTSCache.make_key('Hello there', 'en', 180, 'mp3')}) == 5
+
+def test_memory_hit_then_disk_hit_after_restart(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    cache.put('clip', b'audio bytes')
+    assert cache.get('clip') == b'audio bytes'
+    assert cache.get('missing') is None
+    stats = cache.get_stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 0, 1)
+    
+    restarted = TTSCache(str(tmp_path))
+    assert restarted.get_stats()['disk_entries'] == 1
+    assert restarted.get('clip') == b'audio bytes'
+    assert restarted.get('clip') == b'audio bytes'  # Promoted to memory by the first read
+    stats = restarted.get_stats()
+    assert (stats['memory_hits'], stats['disk_hits']) == (1, 1)
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TTSCache(None, max_memory_bytes=20)
+    cache.put('a', b'x' * 8)
+    cache.put('b', b'x' * 8)
+    cache.get('a')
+    cache.put('c', b'x' * 8)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.get_stats()['memory_bytes'] == 16
+
+def test_disk_tier_is_bounded_by_bytes(tmp_path):
+    cache = TTSCache(str(tmp_path), max_memory_bytes=0, max_disk_bytes=25)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, b'x' * 10)
+    assert sorted(os.listdir(tmp_path)) == ['b.audio', 'c.audio']
+    assert cache.get_stats()['disk_bytes'] == 20
+    assert cache.get('a') is None
+
+def test_memory_only_cache_writes_nothing(tmp_path):
+    cache = TTSCache(None)
+    cache.put('clip', b'audio')
+    assert cache.get('clip') == b'audio'
+    assert cache.get_stats()['disk_entries'] == 0
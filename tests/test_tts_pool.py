@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+TTS Worker Pool Tests
+Handshake, health checks, restarts and backpressure of TTSWorkerPool
+"""
+
+import pytest
+
+from tts_pool import TTSWorkerPool
+
+@pytest.fixture
+def pool():
+    # espeak skips loading pyttsx3 in the workers; whether espeak itself exists doesn't matter here
+    pool = TTSWorkerPool(size=1, engine='espeak', timeout=10, health_interval=60).start()
+    yield pool
+    pool.close()
+
+def test_workers_start_from_a_clean_process(pool):
+    assert pool._context.get_start_method() in ('forkserver', 'spawn')
+    worker = pool._workers[0]
+    assert worker.ready and worker.voice == 'espeak'
+    assert pool._healthy(worker)
+
+def test_dead_worker_is_replaced_on_next_request(pool):
+    dead = pool._workers[0]
+    dead.process.kill()
+    dead.process.join(5)
+    
+    assert pool.synthesize('hello') is None
+    assert pool.get_stats()['restarts'] == 1
+    replacement = pool._workers[0]
+    assert replacement is not dead and pool._healthy(replacement)
+
+def test_saturated_pool_rejects_without_waiting():
+    pool = TTSWorkerPool(size=1, engine='espeak', max_pending=0)
+    assert pool.synthesize('hello') is None
+    stats = pool.get_stats()
+    assert stats['rejected'] == 1 and stats['requests'] == 0
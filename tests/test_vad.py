@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Voice Activity Detection Tests
+Silence trimming and empty-upload detection ahead of speech recognition
+"""
+
+import numpy as np
+
+from audio_utils import to_pcm16, trim_silence
+
+SAMPLE_RATE = 16000
+
+def _noise(seconds: float, level: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (level * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+def _speech(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    # A 200 Hz voice-like tone whose loudness rises and falls like syllables
+    return (0.3 * np.sin(2 * np.pi * 200 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+
+def test_silent_upload_has_no_speech():
+    assert trim_silence(to_pcm16(np.zeros(SAMPLE_RATE, dtype=np.float32)), SAMPLE_RATE) == b''
+    assert trim_silence(to_pcm16(_noise(2.0, 0.001)), SAMPLE_RATE) == b''
+
+def test_too_short_upload_has_no_speech():
+    assert trim_silence(to_pcm16(_speech(0.01)), SAMPLE_RATE) == b''
+
+def test_leading_and_trailing_silence_is_cut_with_padding():
+    audio = np.concatenate([_noise(1.0, 0.001, 1), _speech(1.0), _noise(1.0, 0.001, 2)])
+    trimmed = trim_silence(to_pcm16(audio), SAMPLE_RATE)
+    seconds = len(trimmed) / 2 / SAMPLE_RATE
+    # The speech plus up to 240 ms of padding on each side
+    assert 1.0 <= seconds <= 1.5
+
+def test_long_pause_is_shortened():
+    audio = np.concatenate([_speech(0.5), _noise(2.0, 0.001), _speech(0.5)])
+    trimmed = trim_silence(to_pcm16(audio), SAMPLE_RATE)
+    assert len(trimmed) / 2 / SAMPLE_RATE < 1.7
+
+def test_continuous_speech_is_returned_unchanged():
+    frames = to_pcm16(_speech(1.0))
+    assert trim_silence(frames, SAMPLE_RATE) is frames
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Voice Pipeline Tests
+Streaming sentence splitting and in-order, overlapped per-sentence synthesis
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from voice_pipeline import SentenceSplitter, pipeline_speech, pipeline_speech_async, split_sentences
+
+TEXT = "Dr. Smith is here today. The weather looks fine! Shall we take a walk later?"
+
+def test_short_fragments_merge_into_the_next_sentence():
+    assert split_sentences(TEXT) == ["Dr. Smith is here today.", "The weather looks fine!",
+                                     "Shall we take a walk later?"]
+
+def test_streamed_text_splits_like_the_whole_text():
+    splitter = SentenceSplitter()
+    sentences = []
+    for char in TEXT:
+        sentences.extend(splitter.feed(char))
+    sentences.append(splitter.flush())
+    assert sentences == split_sentences(TEXT)
+
+def test_trailing_punctuation_waits_for_more_text():
+    splitter = SentenceSplitter()
+    assert splitter.feed("This sentence is long enough. ") == []
+    assert splitter.feed("Next") == ["This sentence is long enough."]
+    assert splitter.flush() == "Next"
+
+def test_synthesis_starts_before_the_stream_ends():
+    started = threading.Event()
+    
+    def pieces():
+        yield "The first sentence is here. "
+        yield "And then"
+        # The first sentence was already handed to the executor
+        assert started.wait(5)
+        yield " the second one arrives."
+    
+    def synthesize(sentence: str) -> str:
+        started.set()
+        return sentence.upper()
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(pipeline_speech(pieces(), synthesize, executor))
+    assert results == [(0, "The first sentence is here.", "THE FIRST SENTENCE IS HERE."),
+                       (1, "And then the second one arrives.", "AND THEN THE SECOND ONE ARRIVES.")]
+
+def test_results_stay_in_order_when_later_sentences_finish_first():
+    first_may_finish = threading.Event()
+    
+    def synthesize(sentence: str) -> str:
+        if sentence.startswith('Dr.'):
+            first_may_finish.wait(5)
+        else:
+            first_may_finish.set()
+        return sentence
+    
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        indices = [index for index, _, _ in pipeline_speech([TEXT], synthesize, executor)]
+    assert indices == [0, 1, 2]
+
+def test_async_pipeline_matches_the_sync_one():
+    async def pieces():
+        for word in TEXT.split(' '):
+            yield word + ' '
+    
+    async def collect() -> list:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return [result async for result in pipeline_speech_async(pieces(), len, executor)]
+    
+    expected = [(index, sentence, len(sentence)) for index, sentence in enumerate(split_sentences(TEXT))]
+    assert asyncio.run(collect()) == expected
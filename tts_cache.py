@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+TTS Cache Module
+Content-addressed, two-tier (memory + disk) cache of synthesized audio
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TTSCache:
+    """LRU cache of audio bytes keyed by a hash of (text, voice, rate, format)
+
+    Lookups hit an in-memory LRU first, then a directory of files on disk.
+    Both tiers are bounded by size in bytes and evict least recently used
+    entries. Disk hits are promoted to memory.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = 'tts_cache',
+                 max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk()
+    
+    @staticmethod
+    def make_key(text: str, voice: str, rate: int, audio_format: str) -> str:
+        """Stable content hash for one synthesis request"""
+        material = json.dumps([text, voice, rate, audio_format], ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.audio")
+    
+    def _scan_disk(self) -> None:
+        """Index files left by earlier runs, oldest access first"""
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith('.audio'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, file_name))
+            entries.append((stat.st_mtime, file_name[:-len('.audio')], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+    
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return data
+        
+        # Looked up even when the index doesn't list it: other worker processes
+        # sharing the directory write files this process never indexed
+        if self.cache_dir:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+                os.utime(self._path(key))  # mtime doubles as last access across restarts
+            except OSError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    else:
+                        self._disk[key] = len(data)
+                        self._disk_bytes += len(data)
+                    self._put_memory(key, data)
+                return data
+        
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+    
+    def put(self, key: str, data: bytes) -> None:
+        if not data:
+            return
+        with self._lock:
+            self._put_memory(key, data)
+        if self.cache_dir:
+            self._put_disk(key, data)
+    
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+    
+    def _put_disk(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_disk_bytes:
+            return
+        try:
+            tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry: {str(e)}")
+            return
+        
+        to_remove = []
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            while self._disk_bytes > self.max_disk_bytes:
+                evicted_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                to_remove.append(evicted_key)
+        
+        for evicted_key in to_remove:
+            try:
+                os.remove(self._path(evicted_key))
+            except OSError:
+                pass
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats,
+                        memory_entries=len(self._memory),
+                        memory_bytes=self._memory_bytes,
+                        disk_entries=len(self._disk),
+                        disk_bytes=self._disk_bytes)
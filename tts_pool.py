@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+TTS Worker Pool Module
+Long-lived speech synthesis processes with bounded concurrency and restart on hang
+"""
+
+import multiprocessing
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _WorkerSynthesizer:
+    """Synthesis state owned by one worker process, created once at startup"""
+    
+    def __init__(self, rate: int, engine: str):
+        self.rate = rate
+        self.voice = 'espeak'
+        self.engine = self._init_engine() if engine in ('auto', 'pyttsx3') else None
+        self.output_path = os.path.join(tempfile.gettempdir(), f"tts-worker-{os.getpid()}.wav")
+    
+    def _init_engine(self):
+        """Load a pyttsx3 engine (libespeak, SAPI5 or NSSS) into this process"""
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+            voices = engine.getProperty('voices')
+            if voices:
+                # Same preference as VoiceHandler: a female voice, else the first one
+                voice = next((v for v in voices
+                              if 'female' in v.name.lower() or 'zira' in v.name.lower()), voices[0])
+                engine.setProperty('voice', voice.id)
+                self.voice = voice.id
+            engine.setProperty('rate', self.rate)
+            engine.setProperty('volume', 0.8)
+            return engine
+        except Exception as e:
+            logger.warning(f"TTS worker could not load pyttsx3, using espeak: {str(e)}")
+            return None
+    
+    def synthesize(self, text: str) -> Optional[bytes]:
+        if self.engine:
+            audio_data = self._engine_synthesize(text)
+            if audio_data:
+                return audio_data
+        return self._espeak_synthesize(text)
+    
+    def _engine_synthesize(self, text: str) -> Optional[bytes]:
+        try:
+            self.engine.save_to_file(text, self.output_path)
+            self.engine.runAndWait()
+            with open(self.output_path, 'rb') as audio_file:
+                return audio_file.read() or None
+        except Exception as e:
+            logger.warning(f"TTS worker engine error: {str(e)}")
+            return None
+        finally:
+            if os.path.exists(self.output_path):
+                os.unlink(self.output_path)
+    
+    def _espeak_synthesize(self, text: str) -> Optional[bytes]:
+        result = subprocess.run(['espeak', '--stdout', '-s', str(self.rate), text],
+                                capture_output=True, timeout=30)
+        if result.returncode != 0 or not result.stdout:
+            logger.error(f"Espeak command failed: {result.stderr.decode('utf-8', 'replace')}")
+            return None
+        return result.stdout
+
+def _worker_main(conn, rate: int, engine: str) -> None:
+    """Worker loop: answer ping / synth / stop messages until told to stop"""
+    synthesizer = _WorkerSynthesizer(rate, engine)
+    conn.send(('ready', synthesizer.voice))
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        command = message[0]
+        if command == 'stop':
+            break
+        if command == 'ping':
+            conn.send(('pong', None))
+        elif command == 'synth':
+            try:
+                conn.send(('ok', synthesizer.synthesize(message[1])))
+            except Exception as e:
+                conn.send(('error', str(e)))
+
+class _Worker:
+    """Parent-side handle on one worker process"""
+    
+    __slots__ = ('process', 'conn', 'ready', 'voice')
+    
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.ready = False
+        self.voice = None
+
+class TTSWorkerPool:
+    """Fixed set of synthesis processes shared by all request threads
+
+    Each worker loads its engine once and serves one text at a time, so at
+    most ``size`` syntheses run concurrently and callers queue for a free
+    worker. No more than ``max_pending`` callers may be queued or running;
+    beyond that ``synthesize`` returns None straight away. A worker that
+    takes longer than ``timeout`` or dies is killed and replaced, and idle
+    workers are pinged every ``health_interval`` seconds.
+    """
+    
+    def __init__(self, size: Optional[int] = None, rate: int = 180, engine: str = 'auto',
+                 timeout: float = 30.0, max_pending: int = 64,
+                 health_interval: float = 30.0, startup_timeout: float = 15.0):
+        self.size = size or min(4, os.cpu_count() or 1)
+        self.rate = rate
+        self.engine = engine
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.health_interval = health_interval
+        self.startup_timeout = startup_timeout
+        self.voice = 'espeak'
+        
+        # The pool starts and restarts workers from a threaded server, where a plain fork
+        # can copy a lock some other thread holds. forkserver forks from a clean
+        # single-threaded process instead (and preloads this module so restarts stay
+        # cheap); spawn is the fallback where forkserver isn't available (Windows)
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context('forkserver')
+            self._context.set_forkserver_preload([__name__])
+        else:
+            self._context = multiprocessing.get_context('spawn')
+        self._workers = []
+        self._idle = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._stats = {'requests': 0, 'errors': 0, 'timeouts': 0, 'restarts': 0, 'rejected': 0}
+    
+    def start(self) -> 'TTSWorkerPool':
+        """Launch the workers and wait for the first one to report its voice"""
+        self._workers = [self._spawn() for _ in range(self.size)]
+        if self._wait_ready(self._workers[0]):
+            self.voice = self._workers[0].voice
+        for worker in self._workers:
+            self._idle.put(worker)
+        threading.Thread(target=self._monitor, name='tts-pool-monitor', daemon=True).start()
+        logger.info(f"Started {self.size} TTS workers (voice: {self.voice})")
+        return self
+    
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, name='tts-worker', daemon=True,
+                                        args=(child_conn, self.rate, self.engine))
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+    
+    def _wait_ready(self, worker: _Worker) -> bool:
+        """Consume the worker's startup handshake if it hasn't been read yet"""
+        if worker.ready:
+            return True
+        try:
+            if worker.conn.poll(self.startup_timeout):
+                status, voice = worker.conn.recv()
+                if status == 'ready':
+                    worker.ready = True
+                    worker.voice = voice
+        except (EOFError, OSError):
+            pass
+        return worker.ready
+    
+    def _request(self, worker: _Worker, message: tuple, timeout: float) -> tuple:
+        worker.conn.send(message)
+        if not worker.conn.poll(timeout):
+            raise TimeoutError(f"no reply within {timeout:.0f}s")
+        return worker.conn.recv()
+    
+    def _restart(self, worker: _Worker) -> _Worker:
+        """Kill a hung or dead worker and put a fresh one in its place"""
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=1)
+        worker.conn.close()
+        
+        replacement = self._spawn()
+        with self._lock:
+            self._workers[self._workers.index(worker)] = replacement
+            self._stats['restarts'] += 1
+        return replacement
+    
+    def synthesize(self, text: str) -> Optional[bytes]:
+        """WAV bytes for text, or None if synthesis failed or the pool is saturated"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats['rejected'] += 1
+                logger.warning("TTS pool saturated, dropping synthesis request")
+                return None
+            self._pending += 1
+            self._stats['requests'] += 1
+        
+        try:
+            try:
+                worker = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                logger.warning("Timed out waiting for a free TTS worker")
+                return None
+            
+            try:
+                if not self._wait_ready(worker):
+                    raise RuntimeError("worker did not start")
+                status, payload = self._request(worker, ('synth', text), self.timeout)
+                if status == 'ok':
+                    return payload
+                logger.error(f"TTS worker error: {payload}")
+                with self._lock:
+                    self._stats['errors'] += 1
+                return None
+            except TimeoutError as e:
+                logger.error(f"TTS worker hung ({str(e)}), restarting it")
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                worker = self._restart(worker)
+                return None
+            except (EOFError, OSError, RuntimeError) as e:
+                logger.error(f"TTS worker died ({str(e)}), restarting it")
+                worker = self._restart(worker)
+                return None
+            finally:
+                self._idle.put(worker)
+        finally:
+            with self._lock:
+                self._pending -= 1
+    
+    def _healthy(self, worker: _Worker) -> bool:
+        try:
+            return (worker.process.is_alive() and self._wait_ready(worker)
+                    and self._request(worker, ('ping',), 5.0)[0] == 'pong')
+        except (TimeoutError, EOFError, OSError):
+            return False
+    
+    def _monitor(self) -> None:
+        """Ping idle workers periodically and replace any that don't answer"""
+        while not self._closed.wait(self.health_interval):
+            for _ in range(self.size):
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if not self._healthy(worker):
+                    logger.warning("TTS worker failed health check, restarting it")
+                    worker = self._restart(worker)
+                self._idle.put(worker)
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats,
+                        workers=self.size,
+                        busy=self.size - self._idle.qsize(),
+                        pending=self._pending,
+                        voice=self.voice)
+    
+    def close(self) -> None:
+        """Stop all workers, killing any that don't exit promptly"""
+        self._closed.set()
+        for worker in list(self._workers):
+            try:
+                worker.conn.send(('stop',))
+            except (EOFError, OSError):
+                pass
+        for worker in list(self._workers):
+            worker.process.join(timeout=2)
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.conn.close()
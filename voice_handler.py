@@ -6,26 +6,52 @@ Handles speech-to-text and text-to-speech functionality
 
 import os
 import io
+import re
 import base64
 import tempfile
 import logging
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 import speech_recognition as sr
 import pyttsx3
 import threading
-from pydub import AudioSegment
 import subprocess
 import platform
 
+from audio_formats import AUDIO_FORMATS
+from audio_utils import TARGET_SAMPLE_RATE, TARGET_SAMPLE_WIDTH, decode_audio, encode_audio, trim_silence
+from metrics import TTS_REQUESTS, record_error, span, timed
+from speech_backends import create_backend
+from tts_cache import TTSCache
+from tts_pool import TTSWorkerPool
+
 logger = logging.getLogger(__name__)
 
+# "<cache key>.<format>", as handed out by VoiceHandler.synthesize_clip
+CLIP_ID_PATTERN = re.compile(r'^([0-9a-f]{64})\.(' + '|'.join(AUDIO_FORMATS) + r')$')
+
 class VoiceHandler:
     """Handles voice input and output operations"""
     
-    def __init__(self):
+    def __init__(self, tts_cache: Optional[TTSCache] = None, tts_workers: int = 0,
+                 stt_backend: str = 'google', stt_model_path: Optional[str] = None,
+                 vad: bool = True):
         self.recognizer = sr.Recognizer()
-        self.tts_engine = self._initialize_tts()
-        self.microphone = sr.Microphone() if self._check_microphone_available() else None
+        self.vad = vad
+        self.stt_backend = create_backend(stt_backend, stt_model_path, self.recognizer)
+        self.tts_voice = 'default'  # Replaced by the pyttsx3 voice id when an engine is used
+        self.tts_rate = 180
+        self.tts_cache = tts_cache
+        # With worker processes, synthesis never runs in this process
+        self.tts_pool = TTSWorkerPool(size=tts_workers, rate=self.tts_rate).start() if tts_workers > 0 else None
+        if self.tts_pool:
+            self.tts_engine = None
+            self.tts_voice = self.tts_pool.voice
+        else:
+            self.tts_engine = self._initialize_tts()
+        # pyttsx3 engines are not re-entrant; pipelined replies call TTS from several threads
+        self._tts_engine_lock = threading.Lock()
+        # Opened by listen_from_microphone when first needed; a server never has one
+        self.microphone = None
         
     def _initialize_tts(self) -> Optional[pyttsx3.Engine]:
         """Initialize text-to-speech engine with fallbacks"""
@@ -77,13 +103,15 @@ class VoiceHandler:
                 for voice in voices:
                     if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
                         engine.setProperty('voice', voice.id)
+                        self.tts_voice = voice.id
                         break
                 else:
                     # Use the first available voice
                     engine.setProperty('voice', voices[0].id)
+                    self.tts_voice = voices[0].id
             
             # Set speech rate and volume
-            engine.setProperty('rate', 180)  # Speed of speech
+            engine.setProperty('rate', self.tts_rate)  # Speed of speech
             engine.setProperty('volume', 0.8)  # Volume level (0.0 to 1.0)
             
             return engine
@@ -101,38 +129,32 @@ class VoiceHandler:
             logger.warning(f"Microphone not available: {str(e)}")
             return False
     
+    @timed('stt')
     def speech_to_text(self, audio_file) -> Optional[str]:
         """Convert speech to text from audio file"""
         try:
-            # Save uploaded file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-                audio_file.save(temp_file.name)
-                temp_path = temp_file.name
+            # Decode straight from the upload stream to 16 kHz mono PCM in memory
+            with span('stt_decode'):
+                frames, sample_rate, sample_width = decode_audio(audio_file.read())
+            if self.vad:
+                # Only speech goes to the recognizer; silent uploads stop here
+                with span('stt_vad'):
+                    trimmed = trim_silence(frames, sample_rate)
+                if not trimmed:
+                    logger.info("No speech detected in upload")
+                    return None
+                logger.debug(f"Silence trimming kept {len(trimmed)} of {len(frames)} bytes")
+                frames = trimmed
+            
+            with span('stt_recognize'):
+                text = self._recognize(frames, sample_rate, sample_width)
+            if not text:
+                logger.error("Could not understand audio")
+                return None
+            
+            logger.info(f"Transcribed text: {text}")
+            return text
             
-            try:
-                # Convert audio file to the right format if needed
-                audio = AudioSegment.from_file(temp_path)
-                audio = audio.set_frame_rate(16000).set_channels(1)
-                
-                # Save converted audio
-                converted_path = temp_path.replace('.wav', '_converted.wav')
-                audio.export(converted_path, format='wav')
-                
-                # Perform speech recognition
-                with sr.AudioFile(converted_path) as source:
-                    audio_data = self.recognizer.record(source)
-                    text = self.recognizer.recognize_google(audio_data)
-                    
-                logger.info(f"Transcribed text: {text}")
-                return text
-                
-            finally:
-                # Clean up temporary files
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                if os.path.exists(converted_path):
-                    os.unlink(converted_path)
-                    
         except sr.UnknownValueError:
             logger.error("Could not understand audio")
             return None
@@ -143,6 +165,10 @@ class VoiceHandler:
             logger.error(f"Speech to text error: {str(e)}")
             return None
     
+    def _recognize(self, frames: bytes, sample_rate: int, sample_width: int) -> Optional[str]:
+        """Run the configured STT backend"""
+        return self.stt_backend.transcribe(frames, sample_rate, sample_width)
+    
     def _test_espeak_command(self) -> bool:
         """Test if espeak command line tool works"""
         try:
@@ -152,8 +178,79 @@ class VoiceHandler:
         except Exception:
             return False
     
-    def text_to_speech(self, text: str) -> Optional[str]:
+    def text_to_speech(self, text: str, audio_format: str = 'wav') -> Optional[str]:
         """Convert text to speech and return base64 encoded audio"""
+        audio_data = self.synthesize(text, audio_format)
+        if not audio_data:
+            return None
+        return base64.b64encode(audio_data).decode('utf-8')
+    
+    def synthesize(self, text: str, audio_format: str = 'wav') -> Optional[bytes]:
+        """Convert text to audio bytes, serving repeated texts from the TTS cache"""
+        cache_key = None
+        if self.tts_cache:
+            cache_key = TTSCache.make_key(text, self.tts_voice, self.tts_rate, audio_format)
+            cached = self.tts_cache.get(cache_key)
+            if cached:
+                TTS_REQUESTS.inc(source='cache')
+                return cached
+        
+        if audio_format == 'wav':
+            with span('tts'):
+                audio_data = self._synthesize_uncached(text)
+            if not audio_data:
+                TTS_REQUESTS.inc(source='failed')
+        else:
+            # Other formats are encoded from the (cached) WAV rendering
+            wav_data = self.synthesize(text)
+            try:
+                with span('tts_encode'):
+                    audio_data = encode_audio(wav_data, audio_format) if wav_data else None
+            except Exception as e:
+                logger.error(f"Audio encoding error ({audio_format}): {str(e)}")
+                audio_data = None
+        
+        if audio_data and cache_key:
+            self.tts_cache.put(cache_key, audio_data)
+        return audio_data
+    
+    def synthesize_clip(self, text: str, audio_format: str = 'wav') -> Optional[str]:
+        """Synthesize into the cache and return a clip id for fetching it separately"""
+        if not self.tts_cache or not self.synthesize(text, audio_format):
+            return None
+        return f"{TTSCache.make_key(text, self.tts_voice, self.tts_rate, audio_format)}.{audio_format}"
+    
+    def get_clip(self, clip_id: str) -> Optional[Tuple[bytes, str]]:
+        """Audio bytes and MIME type for a clip id from synthesize_clip"""
+        match = CLIP_ID_PATTERN.match(clip_id)
+        if not match or not self.tts_cache:
+            return None
+        audio_data = self.tts_cache.get(match.group(1))
+        if audio_data is None:
+            return None
+        return audio_data, AUDIO_FORMATS[match.group(2)]
+    
+    def prewarm(self, texts) -> int:
+        """Synthesize texts into the cache ahead of time; returns how many were new"""
+        if not self.tts_cache:
+            return 0
+        
+        synthesized = 0
+        for text in texts:
+            cache_key = TTSCache.make_key(text, self.tts_voice, self.tts_rate, 'wav')
+            if self.tts_cache.get(cache_key) is None and self.synthesize(text):
+                synthesized += 1
+        logger.info(f"Pre-warmed TTS cache with {synthesized} new clips")
+        return synthesized
+    
+    def _synthesize_uncached(self, text: str) -> Optional[bytes]:
+        """Run the TTS engine (or espeak fallback) and return WAV bytes"""
+        if self.tts_pool:
+            audio_data = self.tts_pool.synthesize(text)
+            if audio_data:
+                TTS_REQUESTS.inc(source='pool')
+            return audio_data
+        
         # Try command-line first (more reliable in containers)
         if platform.system() == 'Linux':
             result = self._fallback_tts(text)
@@ -170,8 +267,9 @@ class VoiceHandler:
                 temp_path = temp_file.name
             
             # Generate speech
-            self.tts_engine.save_to_file(text, temp_path)
-            self.tts_engine.runAndWait()
+            with self._tts_engine_lock:
+                self.tts_engine.save_to_file(text, temp_path)
+                self.tts_engine.runAndWait()
             
             # Check if file was created and has content
             if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
@@ -179,45 +277,48 @@ class VoiceHandler:
                 os.unlink(temp_path) if os.path.exists(temp_path) else None
                 return self._fallback_tts(text)
             
-            # Read the audio file and encode to base64
+            # Read the audio file
             with open(temp_path, 'rb') as audio_file:
                 audio_data = audio_file.read()
-                audio_base64 = base64.b64encode(audio_data).decode('utf-8')
             
             # Clean up
             os.unlink(temp_path)
             
-            return audio_base64
+            TTS_REQUESTS.inc(source='pyttsx3')
+            return audio_data
             
         except Exception as e:
             logger.error(f"Text to speech error: {str(e)}")
+            record_error('tts_pyttsx3', e)
             return self._fallback_tts(text)
     
-    def _fallback_tts(self, text: str) -> Optional[str]:
+    def _fallback_tts(self, text: str) -> Optional[bytes]:
         """Fallback TTS using command line espeak"""
         try:
             with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
                 temp_path = temp_file.name
             
             # Try espeak command line
-            cmd = ['espeak', '-w', temp_path, '-s', '180', text]
+            cmd = ['espeak', '-w', temp_path, '-s', str(self.tts_rate), text]
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
             
             if result.returncode == 0 and os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
                 with open(temp_path, 'rb') as audio_file:
                     audio_data = audio_file.read()
-                    audio_base64 = base64.b64encode(audio_data).decode('utf-8')
                 
                 os.unlink(temp_path)
                 logger.info("Used espeak command line fallback successfully")
-                return audio_base64
+                TTS_REQUESTS.inc(source='espeak')
+                return audio_data
             else:
                 logger.error(f"Espeak command failed: {result.stderr}")
                 
-        except subprocess.TimeoutExpired:
+        except subprocess.TimeoutExpired as e:
             logger.error("Espeak command timed out")
+            record_error('tts_espeak', e)
         except Exception as e:
             logger.error(f"Fallback TTS error: {str(e)}")
+            record_error('tts_espeak', e)
         
         finally:
             if os.path.exists(temp_path):
@@ -227,6 +328,8 @@ class VoiceHandler:
     
     def listen_from_microphone(self, timeout: int = 5) -> Optional[str]:
         """Listen for speech from microphone (for future use)"""
+        if not self.microphone and self._check_microphone_available():
+            self.microphone = sr.Microphone()
         if not self.microphone:
             logger.error("Microphone not available")
             return None
@@ -240,7 +343,11 @@ class VoiceHandler:
                 audio = self.recognizer.listen(source, timeout=timeout)
                 
             # Recognize speech
-            text = self.recognizer.recognize_google(audio)
+            text = self._recognize(audio.get_raw_data(TARGET_SAMPLE_RATE, TARGET_SAMPLE_WIDTH),
+                                   TARGET_SAMPLE_RATE, TARGET_SAMPLE_WIDTH)
+            if not text:
+                logger.error("Could not understand audio")
+                return None
             logger.info(f"Recognized: {text}")
             return text
             
@@ -260,13 +367,14 @@ class VoiceHandler:
     def test_audio_capabilities(self) -> dict:
         """Test audio input/output capabilities"""
         results = {
-            'microphone_available': self.microphone is not None,
-            'tts_available': self.tts_engine is not None,
-            'speech_recognition_available': True
+            'microphone_available': self.microphone is not None or self._check_microphone_available(),
+            'tts_available': self.tts_engine is not None or self.tts_pool is not None,
+            'speech_recognition_available': True,
+            'speech_recognition_backend': self.stt_backend.name
         }
         
         # Test TTS
-        if self.tts_engine:
+        if self.tts_engine or self.tts_pool:
             try:
                 test_audio = self.text_to_speech("Testing audio capabilities")
                 results['tts_test'] = test_audio is not None
@@ -283,4 +391,9 @@ class VoiceHandler:
                 results['tts_test'] = False
                 results['tts_error'] = str(e)
         
-        return results
\ No newline at end of file
+        return results
+    
+    def close(self) -> None:
+        """Shut down the TTS worker processes, if any"""
+        if self.tts_pool:
+            self.tts_pool.close()
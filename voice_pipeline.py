@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Voice Pipeline Module
+Overlaps response generation with sentence-by-sentence speech synthesis
+"""
+
+import asyncio
+import itertools
+import re
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple
+
+# End of a sentence: terminal punctuation (plus closing quotes/brackets)
+# followed by whitespace, or a blank line
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+|\n\s*\n')
+
+class SentenceSplitter:
+    """Incrementally cuts streamed text into sentences
+
+    Sentences shorter than ``min_length`` are held back and merged with the
+    next one, so abbreviations and list numbers ("Dr.", "1.") don't turn into
+    tiny audio clips.
+    """
+    
+    def __init__(self, min_length: int = 20):
+        self.min_length = min_length
+        self._buffer = ''
+    
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; return the sentences it completed"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self._buffer):
+            if match.end() >= len(self._buffer):
+                # Whitespace at the very end may still grow into more punctuation
+                break
+            if match.end() - start < self.min_length:
+                continue
+            sentence = self._buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+    
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the stream has ended"""
+        remainder = self._buffer.strip()
+        self._buffer = ''
+        return remainder or None
+
+def split_sentences(text: str) -> List[str]:
+    """Cut a complete text into the same sentences the streaming pipeline would"""
+    splitter = SentenceSplitter()
+    sentences = splitter.feed(text)
+    tail = splitter.flush()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+def pipeline_speech(pieces: Iterable[str], synthesize: Callable[[str], Any],
+                    executor: Executor) -> Iterator[Tuple[int, str, Any]]:
+    """Synthesize sentences while the text is still streaming in
+
+    Each completed sentence is submitted to ``executor`` right away. Results
+    are yielded as ``(index, sentence, audio)`` strictly in sentence order,
+    as soon as the head of the queue is ready, so playback can start while
+    later sentences are still being generated or synthesized.
+    """
+    splitter = SentenceSplitter()
+    pending = deque()
+    indices = itertools.count()
+    
+    def submit(sentence: str) -> None:
+        pending.append((next(indices), sentence, executor.submit(synthesize, sentence)))
+    
+    def ready() -> Iterator[Tuple[int, str, Any]]:
+        while pending and pending[0][2].done():
+            index, sentence, future = pending.popleft()
+            yield index, sentence, future.result()
+    
+    for piece in pieces:
+        for sentence in splitter.feed(piece):
+            submit(sentence)
+        yield from ready()
+    
+    tail = splitter.flush()
+    if tail:
+        submit(tail)
+    
+    # Generation is over; wait for the remaining sentences in order
+    while pending:
+        index, sentence, future = pending.popleft()
+        yield index, sentence, future.result()
+
+async def pipeline_speech_async(pieces: AsyncIterator[str], synthesize: Callable[[str], Any],
+                                executor: Executor) -> AsyncIterator[Tuple[int, str, Any]]:
+    """asyncio version of pipeline_speech: same ordering, synthesis runs in ``executor``"""
+    loop = asyncio.get_running_loop()
+    splitter = SentenceSplitter()
+    pending = deque()
+    indices = itertools.count()
+    
+    def submit(sentence: str) -> None:
+        pending.append((next(indices), sentence, loop.run_in_executor(executor, synthesize, sentence)))
+    
+    async for piece in pieces:
+        for sentence in splitter.feed(piece):
+            submit(sentence)
+        while pending and pending[0][2].done():
+            index, sentence, future = pending.popleft()
+            yield index, sentence, future.result()
+    
+    tail = splitter.flush()
+    if tail:
+        submit(tail)
+    
+    while pending:
+        index, sentence, future = pending.popleft()
+        yield index, sentence, await future